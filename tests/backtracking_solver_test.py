@@ -0,0 +1,22 @@
+import pytest
+from backtracking_solver import solve_with_backtracking
+from preprocessing import create_clauses
+
+
+def test_solve_with_backtracking():
+    ## Given
+    m, true_p, true_q = 42781, 239, 179
+    p_dict, q_dict, z_dict, clauses = create_clauses(m, true_p, true_q, verbose=False)
+    ## When
+    factors = solve_with_backtracking(clauses, p_dict, q_dict, z_dict)
+    ## Then
+    assert factors == [(true_p, true_q)]
+
+    ## Given
+    m = 143
+    p_dict, q_dict, z_dict, clauses = create_clauses(m, verbose=False)
+    ## When
+    factors = solve_with_backtracking(clauses, p_dict, q_dict, z_dict)
+    ## Then
+    assert sorted(factors) == [(11, 13), (13, 11), (143, 1)]
+    assert len(solve_with_backtracking(clauses, p_dict, q_dict, z_dict, max_solutions=1)) == 1
@@ -0,0 +1,53 @@
+import pytest
+from batch import create_clauses_batch
+from preprocessing import create_clauses
+
+
+def test_create_clauses_batch_keeps_input_order():
+    ## Given
+    ms = [15, 21, 35, 143]
+    ## When
+    results = list(create_clauses_batch(ms, processes=2))
+    ## Then
+    assert [result.index for result in results] == [0, 1, 2, 3]
+    assert [result.m for result in results] == ms
+    for result in results:
+        assert result.error is None
+        p_dict, q_dict, z_dict, clauses = create_clauses(result.m, verbose=False)
+        assert result.p_dict == p_dict
+        assert result.q_dict == q_dict
+        assert result.clauses == clauses
+
+
+def test_create_clauses_batch_unordered():
+    ## Given
+    ms = [15, 21, 35, 143]
+    ## When
+    results = list(create_clauses_batch(ms, processes=2, chunksize=2, ordered=False))
+    ## Then
+    assert sorted(result.index for result in results) == [0, 1, 2, 3]
+
+
+def test_create_clauses_batch_isolates_failures():
+    ## Given
+    ms = [15, -5, 21]
+    ## When
+    results = list(create_clauses_batch(ms, processes=1))
+    ## Then
+    assert results[0].error is None
+    assert results[1].error is not None
+    assert results[1].clauses is None
+    assert results[2].error is None
+
+
+def test_create_clauses_batch_timeout():
+    ## Given
+    ms = [15, 291311]
+    ## When
+    results = list(create_clauses_batch(ms, true_ps=[None, 557], true_qs=[None, 523], processes=1, timeout=0.001))
+    ## Then
+    assert results[1].error.startswith("ItemTimeoutError")
+
+    ## When/Then
+    with pytest.raises(ValueError):
+        list(create_clauses_batch(ms, true_ps=[3]))
@@ -0,0 +1,27 @@
+import pytest
+from benchmark import create_benchmark_corpus, run_benchmark, compare_with_baseline
+
+
+def test_create_benchmark_corpus():
+    ## When
+    cases = create_benchmark_corpus()
+    ## Then
+    assert len(cases) == 36
+    assert len(set(case.name for case in cases)) == len(cases)
+    for case in cases:
+        assert case.m.bit_length() == case.bits
+        assert case.p * case.q == case.m
+
+
+def test_compare_with_baseline():
+    ## Given
+    cases = create_benchmark_corpus(bit_lengths=[8])[:2]
+    baseline = run_benchmark(cases, repeats=1, verbose=False)
+    results = [dict(result) for result in baseline]
+    results[0]['time'] = baseline[0]['time'] + 1
+    results[1]['unknowns'] = baseline[1]['unknowns'] + 1
+    ## When
+    regressions = compare_with_baseline(results, baseline)
+    ## Then
+    assert [name for name, _ in regressions] == [cases[0].name, cases[1].name]
+    assert compare_with_baseline(baseline, baseline) == []
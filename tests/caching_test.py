@@ -0,0 +1,64 @@
+import pytest
+import os
+from caching import LRUCache, DiskCache
+
+
+def test_lru_cache():
+    ## Given
+    cache = LRUCache(max_size=2)
+    ## When
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    ## Then
+    assert 'a' in cache
+    assert 'b' not in cache
+    assert cache.get('c') == 3
+    assert cache.get('b') is None
+    statistics = cache.statistics()
+    assert statistics['hits'] == 2
+    assert statistics['misses'] == 1
+    assert statistics['evictions'] == 1
+    assert statistics['size'] == 2
+
+    ## When
+    cache.resize(1)
+    ## Then
+    assert len(cache) == 1
+    assert 'c' in cache
+
+
+def test_disk_cache(tmp_path):
+    ## Given
+    cache = DiskCache(str(tmp_path))
+    ## When
+    cache.put((15, None, None), {'clauses': [1, 2]})
+    ## Then
+    assert (15, None, None) in cache
+    assert DiskCache(str(tmp_path)).get((15, None, None)) == {'clauses': [1, 2]}
+    assert cache.get((21, None, None)) is None
+
+    ## Given
+    for path in cache._entry_paths():
+        with open(path, 'wb') as cache_file:
+            cache_file.write(b'corrupted')
+    ## When/Then
+    assert cache.get((15, None, None)) is None
+    assert len(cache) == 0
+
+
+def test_disk_cache_eviction(tmp_path):
+    ## Given
+    cache = DiskCache(str(tmp_path), max_size_bytes=None)
+    cache.put('a', list(range(100)))
+    cache.put('b', list(range(100)))
+    os.utime(cache._path('a'), (1, 1))
+    ## When
+    cache.max_size_bytes = cache.size_bytes() - 1
+    cache.put('c', 1)
+    ## Then
+    assert 'a' not in cache
+    assert 'b' in cache
+    assert 'c' in cache
+    assert cache.statistics()['evictions'] == 1
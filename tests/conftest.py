@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Modules in the vqf directory import each other directly (e.g. `from polynomial import Polynomial`),
+# since they are also meant to be run as scripts from within that directory.
+# Tests import them the same way (never through `vqf.`), so that every module is loaded only once
+# and e.g. there is a single Polynomial class with a single registry of variable ids.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vqf'))
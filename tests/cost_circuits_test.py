@@ -0,0 +1,39 @@
+import numpy as np
+from sympy import symbols
+import cost_circuits
+from cost_hamiltonian import IsingHamiltonian, create_cost_diagonal
+
+
+def apply_gates(state, gates):
+    # Qubit i corresponds to the i-th bit of the index of the amplitude.
+    indices = np.arange(len(state))
+    state = state.copy()
+    for name, angle, qubits in gates:
+        if name == 'RZ':
+            bit = (indices >> qubits[0]) & 1
+            state *= np.exp(-0.5j * angle * (1 - 2 * bit))
+        else:
+            control, target = qubits
+            flipped = np.where((indices >> control) & 1, indices ^ (1 << target), indices)
+            state = state[flipped]
+    return state
+
+
+def test_create_cost_layer_gates():
+    ## Given
+    p_1, p_2, q_1, q_2, z_1_2 = symbols('p_1 p_2 q_1 q_2 z_1_2')
+    clauses = [p_1 + q_1 - 1, p_1*q_1 + p_2*q_2 - 2*z_1_2, p_2*q_1*p_1 - z_1_2]
+    mapping = {'q_1': 0, 'p_1': 1, 'p_2': 2, 'q_2': 3, 'z_1_2': 4}
+    hamiltonian = IsingHamiltonian.from_clauses(clauses, mapping)
+    diagonal = create_cost_diagonal(clauses, mapping)
+    gamma = 0.37
+    state = np.exp(1j * np.arange(32)) / np.sqrt(32)
+    ## When
+    gates = cost_circuits.create_cost_layer_gates(hamiltonian, gamma)
+    ## Then
+    expected_state = np.exp(-1j * gamma * (diagonal - hamiltonian.constant)) * state
+    assert np.allclose(apply_gates(state, gates), expected_state)
+    counts = cost_circuits.count_gates(gates)
+    assert counts['RZ'] == len(hamiltonian.terms()) - 1
+    # Separate ladders for every term would need 2 * (k - 1) CNOTs for a k-qubit term.
+    assert counts['CNOT'] < 2 * sum(len(qubits) - 1 for qubits, _ in hamiltonian.terms())
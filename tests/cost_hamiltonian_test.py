@@ -0,0 +1,90 @@
+import itertools
+import json
+import pytest
+from sympy import symbols
+import cost_hamiltonian
+
+
+def test_create_mapping():
+    ## Given
+    p_1, q_1, z_1_2 = symbols('p_1 q_1 z_1_2')
+    clauses = [q_1 + p_1 - 1, z_1_2 * p_1, 0]
+    ## When
+    mapping = cost_hamiltonian.create_mapping(clauses)
+    ## Then
+    assert mapping == {'p_1': 0, 'q_1': 1, 'z_1_2': 2}
+
+
+def test_create_cost_diagonal():
+    ## Given
+    p_1, p_2, q_1, z_1_2 = symbols('p_1 p_2 q_1 z_1_2')
+    clauses = [p_1 + q_1 - 1, p_1*q_1 + p_2 - 2*z_1_2, 0, p_2*q_1 - z_1_2]
+    mapping = {'q_1': 0, 'p_1': 1, 'p_2': 2, 'z_1_2': 3}
+    ## When
+    diagonal = cost_hamiltonian.create_cost_diagonal(clauses, mapping)
+    ## Then
+    assert len(diagonal) == 16
+    for values in itertools.product([0, 1], repeat=4):
+        assignment = dict(zip([q_1, p_1, p_2, z_1_2], values))
+        index = sum(value * 2**qubit for value, qubit in zip(values, range(4)))
+        expected_energy = sum(clause.subs(assignment)**2 for clause in clauses if clause != 0)
+        assert diagonal[index] == expected_energy
+
+
+def test_get_ground_states():
+    ## Given
+    p_1, q_1 = symbols('p_1 q_1')
+    clauses = [p_1 + q_1 - 1]
+    mapping = cost_hamiltonian.create_mapping(clauses)
+    ## When
+    diagonal = cost_hamiltonian.create_cost_diagonal(clauses, mapping)
+    ground_states, energy = cost_hamiltonian.get_ground_states(diagonal, mapping)
+    ## Then
+    assert energy == 0
+    assert ground_states == [{'p_1': 1, 'q_1': 0}, {'p_1': 0, 'q_1': 1}]
+
+
+def test_ising_hamiltonian_from_clauses():
+    ## Given
+    p_1, q_1 = symbols('p_1 q_1')
+    clauses = [p_1 + q_1 - 1]
+    mapping = {'p_1': 0, 'q_1': 1}
+    ## When
+    hamiltonian = cost_hamiltonian.IsingHamiltonian.from_clauses(clauses, mapping)
+    ## Then
+    # (p_1 + q_1 - 1)**2 = (1 + Z_0*Z_1) / 2
+    assert hamiltonian.terms() == [((), 0.5), ((0, 1), 0.5)]
+
+
+def test_ising_hamiltonian_to_diagonal():
+    ## Given
+    p_1, p_2, q_1, z_1_2 = symbols('p_1 p_2 q_1 z_1_2')
+    clauses = [p_1 + q_1 - 1, p_1*q_1 + p_2 - 2*z_1_2, p_2*q_1*p_1 - z_1_2, 3*p_2 - 1]
+    mapping = {'q_1': 0, 'p_1': 1, 'p_2': 2, 'z_1_2': 3}
+    ## When
+    hamiltonian = cost_hamiltonian.IsingHamiltonian.from_clauses(clauses, mapping)
+    ## Then
+    assert max(hamiltonian.couplings) == 4
+    assert (hamiltonian.to_diagonal() == cost_hamiltonian.create_cost_diagonal(clauses, mapping)).all()
+
+
+def test_ising_hamiltonian_to_dict():
+    ## Given
+    p_1, p_2, q_1 = symbols('p_1 p_2 q_1')
+    hamiltonian = cost_hamiltonian.IsingHamiltonian.from_clauses([p_1*q_1 + p_2 - 1, p_1 - q_1])
+    ## When
+    data = json.loads(json.dumps(hamiltonian.to_dict()))
+    loaded_hamiltonian = cost_hamiltonian.IsingHamiltonian.from_dict(data)
+    ## Then
+    assert loaded_hamiltonian.terms() == hamiltonian.terms()
+
+
+def test_ising_hamiltonian_to_pauli_sum():
+    pytest.importorskip('pyquil')
+    ## Given
+    p_1, q_1 = symbols('p_1 q_1')
+    hamiltonian = cost_hamiltonian.IsingHamiltonian.from_clauses([p_1 + q_1 - 1], {'p_1': 0, 'q_1': 1})
+    ## When
+    pauli_sum = hamiltonian.to_pauli_sum()
+    ## Then
+    assert len(pauli_sum.terms) == 2
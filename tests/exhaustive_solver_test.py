@@ -0,0 +1,40 @@
+import pytest
+from sympy import symbols
+from exhaustive_solver import solve_exhaustively, decode_solutions
+from preprocessing import create_clauses
+
+
+def test_solve_exhaustively():
+    ## Given
+    p_1, q_1 = symbols('p_1 q_1')
+    p_dict = {0: 1, 1: p_1, 2: 1}
+    q_dict = {0: 1, 1: q_1, 2: 1}
+    clauses = [p_1 + q_1 - 1]
+    ## When
+    solutions, cost = solve_exhaustively(clauses, p_dict, q_dict)
+    ## Then
+    assert cost == 0
+    assert sorted(decode_solutions(solutions, p_dict, q_dict)) == [(5, 7), (7, 5)]
+
+    ## Given
+    clauses = [p_1 + q_1 - 1, p_1*q_1 - 1]
+    ## When
+    solutions, cost = solve_exhaustively(clauses, p_dict, q_dict)
+    ## Then
+    assert cost == 1
+    assert len(solutions) == 3
+
+    ## When/Then
+    with pytest.raises(ValueError):
+        solve_exhaustively(clauses, p_dict, q_dict, max_unknowns=1)
+
+
+def test_solve_exhaustively_after_preprocessing():
+    ## Given
+    m, true_p, true_q = 2773, 59, 47
+    p_dict, q_dict, z_dict, clauses = create_clauses(m, true_p, true_q, verbose=False)
+    ## When
+    solutions, cost = solve_exhaustively(clauses, p_dict, q_dict, z_dict, block_size=2**12)
+    ## Then
+    assert cost == 0
+    assert decode_solutions(solutions, p_dict, q_dict) == [(true_p, true_q)]
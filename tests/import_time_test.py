@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+
+VQF_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vqf')
+
+# Maximum time (in seconds) of importing preprocessing in a fresh interpreter.
+# Most of it is the import of sympy.
+PREPROCESSING_IMPORT_TIME_BUDGET = 1.0
+
+HEAVY_MODULES = ['pyquil', 'grove', 'networkx', 'scipy', 'matplotlib']
+
+
+def measure_import(module_name, repeats=3):
+    """
+    Imports the module in a fresh interpreter.
+
+    Returns:
+        import_time (float): Shortest import time in seconds.
+        loaded_modules (set): Names of the top-level modules loaded by the import.
+    """
+    code = ("import sys, time\n"
+            "start_time = time.perf_counter()\n"
+            "import " + module_name + "\n"
+            "print(time.perf_counter() - start_time)\n"
+            "print(' '.join(sorted({name.split('.')[0] for name in sys.modules})))\n")
+    import_time = None
+    for _ in range(repeats):
+        output = subprocess.check_output([sys.executable, '-c', code], cwd=VQF_DIRECTORY, universal_newlines=True)
+        lines = output.strip().split('\n')
+        if import_time is None or float(lines[0]) < import_time:
+            import_time = float(lines[0])
+        loaded_modules = set(lines[1].split())
+    return import_time, loaded_modules
+
+
+def test_preprocessing_import_time():
+    ## Given
+    module_name = 'preprocessing'
+    ## When
+    import_time, loaded_modules = measure_import(module_name)
+    ## Then
+    assert import_time < PREPROCESSING_IMPORT_TIME_BUDGET
+    assert loaded_modules.isdisjoint(HEAVY_MODULES + ['numpy'])
+
+
+def test_optimization_imports_heavy_dependencies_lazily():
+    ## Given
+    module_name = 'optimization'
+    ## When
+    _, loaded_modules = measure_import(module_name, repeats=1)
+    ## Then
+    assert loaded_modules.isdisjoint(HEAVY_MODULES)
@@ -0,0 +1,123 @@
+import pytest
+import polynomial
+from polynomial import Polynomial, symbol_to_id, id_to_symbol
+from sympy import symbols, expand
+
+
+def test_multiplication_is_idempotent():
+    ## Given
+    p, q = symbols('p q')
+    polynomial_p = Polynomial.from_sympy(p)
+    polynomial_q = Polynomial.from_sympy(q)
+    ## When
+    result = (polynomial_p * polynomial_q) * (polynomial_p + 1)
+    ## Then
+    assert result.to_sympy() == 2*p*q
+
+
+def test_sympy_round_trip():
+    ## Given
+    p, q, z = symbols('p q z')
+    clause = 3*p*q - 2*z + q - 5
+    ## When
+    polynomial = Polynomial.from_sympy(clause)
+    ## Then
+    assert polynomial.to_sympy() == clause
+    assert Polynomial.from_sympy(p**2*q + (1 - q)**2).to_sympy() == p*q - q + 1
+
+    ## Given
+    p, q = symbols('p q')
+    ## When/Then
+    with pytest.raises(ValueError):
+        Polynomial.from_sympy(p / q)
+
+
+def test_substitute():
+    ## Given
+    p, q, z, x = symbols('p q z x')
+    polynomial = Polynomial.from_sympy(-3*p*q*z + 2*q + p*q - 1)
+    ## When
+    monomial = tuple(sorted([symbol_to_id(p), symbol_to_id(q)]))
+    result = polynomial.substitute(monomial, Polynomial.from_sympy(1 - x))
+    ## Then
+    assert result.to_sympy() == expand(-3*(1 - x)*z + 2*q + (1 - x) - 1)
+
+    ## Given
+    polynomial = Polynomial.from_sympy(-2*q + p*q + p)
+    ## When
+    # Same as sympy's (-2*q + p*q + p).subs(-q, x)
+    result = polynomial.substitute((symbol_to_id(q),), Polynomial.from_sympy(x), coefficient=-1)
+    ## Then
+    assert result.to_sympy() == 2*x + p*q + p
+
+
+def test_subs():
+    ## Given
+    p, q, z = symbols('p q z')
+    polynomial = Polynomial.from_sympy(p*q + z - 1)
+    known_values = {symbol_to_id(p): 1 - Polynomial.from_sympy(q), symbol_to_id(z): 0}
+    ## When
+    result = polynomial.subs(known_values)
+    ## Then
+    assert result.to_sympy() == -1
+
+
+def test_content_and_leading_coefficient():
+    ## Given
+    p_2, p_10, q_1 = symbols('p_2 p_10 q_1')
+    polynomial = Polynomial.from_sympy(4*p_10*q_1 - 6*p_2 + 2)
+    ## When/Then
+    assert polynomial.content() == 2
+    # Variables are ordered by name, i.e. p_10 goes before p_2
+    assert polynomial.leading_coefficient() == 4
+
+
+def test_leading_coefficient_with_mixed_variables():
+    ## Given
+    p_1, p_2, q_1, q_2, z_1_2, z_2_3 = symbols('p_1 p_2 q_1 q_2 z_1_2 z_2_3')
+    clauses = [-p_1 + q_1 - 2*z_1_2,
+               q_2 - p_2*q_1 + 1,
+               2*z_2_3 - q_1*z_1_2 - p_2,
+               -z_1_2 + z_2_3 + 3,
+               -2*q_2*z_2_3 + p_2*z_1_2]
+    expected_signs = [-1, -1, -1, -1, 1]
+    ## When
+    leading_coefficients = [Polynomial.from_sympy(clause).leading_coefficient() for clause in clauses]
+    ## Then
+    assert [1 if c > 0 else -1 for c in leading_coefficients] == expected_signs
+
+
+def test_is_reducible():
+    ## Given
+    p_0, p_1, q_0, q_1 = symbols('p_0 p_1 q_0 q_1')
+    ## When/Then
+    assert Polynomial.from_sympy((p_0 + 2*p_1 - 1) * (q_0*q_1 - 3)).is_reducible()
+    assert Polynomial.from_sympy(p_0*q_0 - p_0).is_reducible()
+    assert not Polynomial.from_sympy(p_0*q_0 - 1).is_reducible()
+    assert not Polynomial.from_sympy(p_0*q_0 + p_1*q_1).is_reducible()
+
+
+def test_interrupted_registration_leaves_registry_consistent():
+    ## Given
+    class InterruptedList(list):
+        interrupted = False
+
+        def append(self, item):
+            if not self.interrupted:
+                self.interrupted = True
+                raise KeyboardInterrupt()
+            super().append(item)
+
+    symbol = symbols('interrupted_variable')
+    original_id_symbols = polynomial._id_symbols
+    polynomial._id_symbols = InterruptedList(original_id_symbols)
+    try:
+        ## When
+        with pytest.raises(KeyboardInterrupt):
+            symbol_to_id(symbol)
+        var_id = symbol_to_id(symbol)
+    finally:
+        original_id_symbols[:] = polynomial._id_symbols
+        polynomial._id_symbols = original_id_symbols
+    ## Then
+    assert id_to_symbol(var_id) == symbol
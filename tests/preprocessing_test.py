@@ -1,6 +1,8 @@
 import pytest
-from vqf import preprocessing
+import preprocessing
 from sympy import symbols
+from polynomial import Polynomial
+from union_find import ParityUnionFind
 import pdb
 
 
@@ -196,13 +198,13 @@ def test_apply_rule_1():
 def test_apply_rule_2():
     ## Given
     known_expressions = {}
-    p, q = symbols('p q')
-    clause = p + q - 1
+    p_1, q_1 = symbols('p_1 q_1')
+    clause = p_1 + q_1 - 1
     ## When
     known_expressions = preprocessing.apply_rule_2(clause, known_expressions)
     ## Then
-    assert known_expressions[p*q] == 0
-    assert known_expressions[p] == 1 - q
+    assert known_expressions[p_1*q_1] == 0
+    assert known_expressions[p_1] == 1 - q_1
 
 
 def test_apply_rule_3():
@@ -262,3 +264,284 @@ def test_apply_rules_4_and_5():
     # assert known_expressions[q_0] == 1
     # assert known_expressions[q_1] == 1
     # assert known_expressions[q_2] == 1
+
+
+def test_simplify_clauses():
+    ## Given
+    p_0, q_0, p_1, q_1 = symbols('p_0 q_0 p_1 q_1')
+    clauses = [p_0 + q_0 - 1, p_1 + q_1 - 2, q_0 - q_1]
+    ## When
+    simplified_clauses, known_expressions = preprocessing.simplify_clauses(clauses, verbose=False)
+    ## Then
+    assert simplified_clauses == [0, 0, 0]
+    assert known_expressions[q_0] == 1
+    assert known_expressions[p_0] == 0
+
+
+def test_simplify_clauses_inconsistent():
+    ## Given
+    p_1, q_1, p_2 = symbols('p_1 q_1 p_2')
+    clauses = [p_1 - q_1, p_1 + q_1 - 1, p_2*q_1 - 1]
+    ## When
+    simplified_clauses, _ = preprocessing.simplify_clauses(clauses, verbose=False)
+    ## Then
+    assert 1 in simplified_clauses
+
+
+def test_are_new_expressions_consistent():
+    ## Given
+    p_1, q_1 = symbols('p_1 q_1')
+    equalities = ParityUnionFind()
+    equalities.add_equality(p_1, q_1)
+    ## When
+    consistent = preprocessing.are_new_expressions_consistent({p_1: q_1}, {}, equalities)
+    equalities.add_equality(p_1, 1 - q_1)
+    conflicting = preprocessing.are_new_expressions_consistent({p_1: 1 - q_1}, {}, equalities)
+    ## Then
+    assert consistent
+    assert not conflicting
+    assert not preprocessing.are_new_expressions_consistent({2*q_1: 1}, {}, ParityUnionFind())
+
+
+def test_select_relevant_expressions():
+    ## Given
+    p_0, q_0, p_1, q_1, z = symbols('p_0 q_0 p_1 q_1 z')
+    clause = p_0 + q_0 - 1
+    known_expressions = {p_0: 1 - p_1, p_1: q_1, z: 0, p_0*z: 0}
+    ## When
+    relevant_expressions = preprocessing.select_relevant_expressions(clause, known_expressions)
+    ## Then
+    assert relevant_expressions == {p_0: 1 - p_1, p_1: q_1, p_0*z: 0}
+
+
+def test_simplify_clause_cache():
+    ## Given
+    preprocessing.clear_simplification_cache()
+    p_0, q_0, q_1, z = symbols('p_0 q_0 q_1 z')
+    clause = 2*p_0*q_0 + 2*z - 2
+    ## When
+    first_result = preprocessing.simplify_clause(clause, {z: 0})
+    second_result = preprocessing.simplify_clause(clause, {z: 0, q_1: 1})
+    ## Then
+    assert first_result == second_result == p_0*q_0 - 1
+    statistics = preprocessing.get_simplification_cache_statistics()
+    assert statistics['misses'] == 1
+    assert statistics['hits'] == 1
+
+
+def test_normalize_content():
+    ## Given
+    p, q, z = symbols('p q z')
+    clauses = [-2*p - 2*q + 2, -p*q + p, -p*q + 1, 4*p*q + 2*z]
+    ## When
+    normalized_clauses = [preprocessing.normalize_content(Polynomial.from_sympy(clause)).to_sympy() for clause in clauses]
+    ## Then
+    assert normalized_clauses == [p + q - 1, p*q - p, -p*q + 1, 2*p*q + z]
+
+
+def test_get_clause_shape():
+    ## Given
+    p, q, z = symbols('p q z')
+    clause = p*q + 2*p - 4*z - 1
+    ## When
+    shape = preprocessing.get_clause_shape(clause)
+    ## Then
+    assert shape.number_of_terms == 4
+    assert shape.constant == -1
+    assert shape.terms == ((1, -4), (1, 2), (2, 1))
+
+
+def test_preprocessing_rule():
+    ## Given
+    p, q = symbols('p q')
+    number_of_rules = len(preprocessing.PREPROCESSING_RULES)
+    applied_clauses = []
+    def apply_test_rule(clause, known_expressions, verbose=False):
+        applied_clauses.append(clause)
+        return known_expressions
+    ## When
+    preprocessing.preprocessing_rule(order=-1, condition=lambda shape: shape.constant == 5)(apply_test_rule)
+    try:
+        preprocessing.apply_rules_to_clause(p + q + 5, {}, verbose=False)
+        preprocessing.apply_rules_to_clause(p + q + 3, {}, verbose=False)
+    finally:
+        preprocessing.PREPROCESSING_RULES.pop(0)
+    ## Then
+    assert applied_clauses == [p + q + 5]
+    assert len(preprocessing.PREPROCESSING_RULES) == number_of_rules
+
+
+def test_create_clauses_uses_cache(tmp_path):
+    ## Given
+    from caching import DiskCache
+    cache = DiskCache(str(tmp_path))
+    expected_result = preprocessing.create_clauses(2893, 263, 11, verbose=False)
+    ## When
+    first_result = preprocessing.create_clauses(2893, 263, 11, verbose=False, cache=cache)
+    second_result = preprocessing.create_clauses(2893, 257, 13, verbose=False, cache=cache)
+    ## Then
+    assert first_result == expected_result
+    assert second_result == expected_result
+    assert cache.hits == 1
+    key = preprocessing.get_create_clauses_cache_key(2893, 263, 11)
+    assert key[:4] == (2893, 9, 4, True)
+    assert key[4] == preprocessing.get_rule_set_version()
+
+
+def test_profiling():
+    ## Given
+    preprocessing.clear_simplification_cache()
+    preprocessing.enable_profiling()
+    ## When
+    try:
+        preprocessing.create_clauses(2893, 263, 11, verbose=False)
+    finally:
+        preprocessing.disable_profiling()
+    statistics = preprocessing.get_profiling_statistics()
+    ## Then
+    steps = {entry['name']: entry for entry in statistics['steps']}
+    assert steps['apply_z_rule']['calls'] > 0
+    assert steps['simplify_clause']['calls'] > 0
+    assert sum(entry['eliminated_variables'] for entry in statistics['steps']) > 0
+    assert statistics['iterations'][0]['iteration'] == 0
+    assert 'apply_z_rule' in preprocessing.preprocessing_profiler.to_table()
+    assert '"steps"' in preprocessing.preprocessing_profiler.to_json()
+
+    ## When
+    preprocessing.create_clauses(2893, 263, 11, verbose=False)
+    ## Then
+    assert preprocessing.get_profiling_statistics() == statistics
+
+
+def test_create_symmetry_breaking_clause():
+    ## Given
+    x, p_1, q_1 = symbols('x p_1 q_1')
+    p_dict = {0: 1, 1: x, 2: 1}
+    q_dict = {0: 1, 1: 1 - x, 2: 1}
+    ## When
+    bit_index, clause = preprocessing.create_symmetry_breaking_clause(p_dict, q_dict)
+    ## Then
+    assert bit_index == 1
+    assert clause == 1 - x
+
+    ## Given
+    p_dict = {0: 1, 1: p_1, 2: 1}
+    q_dict = {0: 1, 1: q_1, 2: 1}
+    ## When
+    bit_index, clause = preprocessing.create_symmetry_breaking_clause(p_dict, q_dict)
+    ## Then
+    assert bit_index == 1
+    assert clause == q_1 - p_1*q_1
+
+    ## When/Then
+    assert preprocessing.create_symmetry_breaking_clause({0: 1, 1: 1}, {0: 1, 1: q_1}) == (None, None)
+    assert preprocessing.create_symmetry_breaking_clause({0: 1, 1: p_1}, {0: 1}) == (None, None)
+
+
+def test_create_clauses_symmetric_case():
+    ## Given
+    m, p, q = 69169, 263, 263
+    ## When
+    p_dict, q_dict, z_dict, clauses = preprocessing.create_clauses(m, p, q, verbose=False)
+    ## Then
+    assert preprocessing.calculate_number_of_unknowns(p_dict, q_dict, z_dict)[0] == 0
+    assert sum(value * 2**key for key, value in p_dict.items()) == p
+    assert sum(value * 2**key for key, value in q_dict.items()) == q
+
+
+def test_propagate_carry_bounds():
+    ## Given
+    m, p, q = 143, 13, 11
+    m_dict, p_dict, q_dict, z_dict = preprocessing.create_initial_dicts(m, p, q)
+    preprocessing.create_basic_clauses(m_dict, p_dict, q_dict, z_dict, apply_preprocessing=False)
+    for key in p_dict:
+        p_dict[key] = (p >> key) & 1
+    for key in q_dict:
+        q_dict[key] = (q >> key) & 1
+    ## When
+    carry_values = preprocessing.propagate_carry_bounds(m_dict, p_dict, q_dict, z_dict)
+    ## Then
+    carry_in = 0
+    for i in range(len(m_dict)):
+        column_sum = sum(p_dict[j] * q_dict[i - j] for j in p_dict if i - j in q_dict) + carry_in
+        carry_out = sum(carry_values[key] * 2**(key[1] - key[0]) for key in z_dict if key[0] == i)
+        assert column_sum - m_dict.get(i, 0) == carry_out
+        carry_in = sum(carry_values[key] for key in z_dict if key[1] == i + 1)
+    assert set(carry_values.keys()) == set(z_dict.keys())
+
+
+def test_get_bounds():
+    ## Given
+    p_1, q_1, z_1_2 = symbols('p_1 q_1 z_1_2')
+    expression = p_1*q_1 + 2*q_1 - 2*z_1_2 + 1
+    ## When
+    sympy_bounds = preprocessing.get_bounds(expression)
+    polynomial_bounds = preprocessing.get_bounds(Polynomial.from_sympy(expression))
+    ## Then
+    assert sympy_bounds == (-1, 4)
+    assert polynomial_bounds == sympy_bounds
+
+
+def test_create_clauses_carry_bounds(monkeypatch):
+    ## Given
+    m, p, q = 551, 29, 19
+    ## When
+    p_dict, q_dict, z_dict, clauses = preprocessing.create_clauses(m, p, q, verbose=False)
+    _, carry_bits = preprocessing.calculate_number_of_unknowns(p_dict, q_dict, z_dict)
+    monkeypatch.setattr(preprocessing, 'create_carry_bound_clauses', lambda *dicts: [])
+    p_dict, q_dict, z_dict, clauses = preprocessing.create_clauses(m, p, q, verbose=False)
+    _, carry_bits_without_bounds = preprocessing.calculate_number_of_unknowns(p_dict, q_dict, z_dict)
+    ## Then
+    assert carry_bits_without_bounds == 10
+    assert carry_bits == 8
+
+
+def test_create_basic_clauses_creates_only_possible_carries():
+    ## Given
+    m, p, q = 143, 13, 11
+    m_dict, p_dict, q_dict, z_dict = preprocessing.create_initial_dicts(m, p, q)
+    ## When
+    clauses = preprocessing.create_basic_clauses(m_dict, p_dict, q_dict, z_dict)
+    all_carries = {}
+    preprocessing.create_basic_clauses(m_dict, p_dict, q_dict, all_carries, apply_preprocessing=False)
+    ## Then
+    assert len(z_dict) < len(all_carries)
+    assert set(z_dict.keys()) <= set(all_carries.keys())
+    assert all(key[0] != 0 and key[1] < len(m_dict) for key in all_carries)
+    clause_symbols = set().union(*[clause.free_symbols for clause in clauses])
+    assert set(z_dict.values()) <= clause_symbols
+
+
+def test_contains_q_variable():
+    ## Given
+    p_1, q_2, z_1_2, x = symbols('p_1 q_2 z_1_2 x')
+    ## When / Then
+    assert preprocessing.contains_q_variable(-q_2)
+    assert preprocessing.contains_q_variable(p_1*q_2)
+    assert not preprocessing.contains_q_variable(2*p_1 + z_1_2)
+    assert not preprocessing.contains_q_variable(x)
+
+
+def test_variable_values_update():
+    ## Given
+    p_0, p_1, q_0, q_1, z_1_2 = symbols('p_0 p_1 q_0 q_1 z_1_2')
+    variable_values = preprocessing.VariableValues({0: 1, 1: p_1}, {0: q_0, 1: q_1}, {(1, 2): z_1_2})
+    ## When
+    variable_values.update({p_1: 1 - q_1, z_1_2: 0})
+    variable_values.update({q_1: 1})
+    p_dict, q_dict, z_dict = variable_values.to_dicts()
+    ## Then
+    assert p_dict == {0: 1, 1: 0}
+    assert q_dict == {0: q_0, 1: 1}
+    assert z_dict == {(1, 2): 0}
+    assert variable_values.known_symbols() == {p_0: 1, p_1: 0, q_1: 1, z_1_2: 0}
+
+
+def test_can_be_zero():
+    ## Given
+    p, q, z = symbols('p q z')
+    ## When/Then
+    assert preprocessing.can_be_zero(p + q - 1)
+    assert not preprocessing.can_be_zero(p + q + 1)
+    assert not preprocessing.can_be_zero(p + q - 3)
+    assert not preprocessing.can_be_zero(2*p - 2*z + 1)
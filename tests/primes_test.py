@@ -0,0 +1,42 @@
+import pytest
+import numpy as np
+from primes import get_primes_lower_than_n, get_primes_in_range, generate_biprimes
+
+
+def is_prime(n):
+    return n >= 2 and all(n % divisor != 0 for divisor in range(2, int(n**0.5) + 1))
+
+
+def test_get_primes_lower_than_n():
+    ## Given
+    expected_primes = [n for n in range(1000) if is_prime(n)]
+    ## When/Then
+    assert get_primes_lower_than_n(1000).tolist() == expected_primes
+    assert get_primes_lower_than_n(998).tolist() == expected_primes
+    assert get_primes_lower_than_n(2).tolist() == []
+    assert get_primes_lower_than_n(3).tolist() == [2]
+
+
+def test_get_primes_in_range():
+    ## Given
+    expected_primes = [n for n in range(900, 5000) if is_prime(n)]
+    ## When
+    primes = get_primes_in_range(900, 5000, segment_size=97)
+    ## Then
+    assert primes.tolist() == expected_primes
+    assert get_primes_in_range(0, 10).tolist() == [2, 3, 5, 7]
+
+
+def test_generate_biprimes():
+    ## Given
+    min_m, max_m = 100, 2000
+    expected_biprimes = []
+    for m in range(min_m, max_m + 1):
+        for q in range(3, int(m**0.5) + 1):
+            if m % q == 0 and is_prime(q) and is_prime(m // q):
+                expected_biprimes.append((m // q, q, m))
+    ## When
+    biprimes = list(generate_biprimes(max_m, min_m, window_size=64))
+    ## Then
+    assert biprimes == expected_biprimes
+    assert list(generate_biprimes(10, include_even=True)) == [(2, 2, 4), (3, 2, 6), (3, 3, 9), (5, 2, 10)]
@@ -0,0 +1,106 @@
+from functools import reduce
+import numpy as np
+import pytest
+from sympy import symbols
+import statevector_simulator
+import walsh_hadamard
+from cost_hamiltonian import create_cost_diagonal
+
+
+def calculate_state_with_matrices(diagonal, betas, gammas):
+    number_of_qubits = len(diagonal).bit_length() - 1
+    pauli_x = np.array([[0, 1], [1, 0]])
+    state = np.full(len(diagonal), 1 / np.sqrt(len(diagonal)), dtype=complex)
+    for beta, gamma in zip(betas, gammas):
+        state = np.exp(-1j * gamma * diagonal) * state
+        rotation = np.cos(beta) * np.eye(2) + 1j * np.sin(beta) * pauli_x
+        # Qubit 0 is the least significant bit, so it's the last factor of the Kronecker product.
+        mixer = reduce(np.kron, [rotation] * number_of_qubits)
+        state = mixer.dot(state)
+    return state
+
+
+def test_get_state():
+    ## Given
+    diagonal = np.array([3., 0., 1., 4., 1., 5., 9., 2.])
+    betas, gammas = [0.3, 1.1], [0.7, 2.5]
+    qaoa = statevector_simulator.StatevectorQAOA(diagonal, steps=2)
+    ## When
+    state = qaoa.get_state(np.hstack((betas, gammas)))
+    ## Then
+    assert np.allclose(state, calculate_state_with_matrices(diagonal, betas, gammas))
+    expected_energy = np.dot(np.abs(state)**2, diagonal)
+    assert np.isclose(qaoa.expectation(np.hstack((betas, gammas))), expected_energy)
+
+
+def test_apply_x_mixer_single_qubit():
+    ## Given
+    state = np.array([1, 0, 0, 0], dtype=complex)
+    ## When
+    statevector_simulator.apply_x_mixer(state, np.pi / 2)
+    ## Then
+    # exp(i*pi/2*X) = iX on both qubits
+    assert np.allclose(state, [0, 0, 0, -1])
+
+
+def test_phases_are_applied_to_all_blocks():
+    ## Given
+    random_state = np.random.RandomState(0)
+    number_of_qubits = 16
+    diagonal = random_state.randint(0, 20, 2**number_of_qubits).astype(float)
+    state = random_state.normal(size=2**number_of_qubits) + 1j * random_state.normal(size=2**number_of_qubits)
+    weights = walsh_hadamard.hamming_weights(number_of_qubits)
+    ## When
+    cost_state = state.copy()
+    statevector_simulator.apply_cost_layer(cost_state, 0.4, diagonal)
+    mixed_state = state.copy()
+    statevector_simulator.apply_x_mixer(mixed_state, 0.4)
+    ## Then
+    assert 2**number_of_qubits > walsh_hadamard.DEFAULT_BLOCK_SIZE
+    assert np.allclose(cost_state, state * np.exp(-0.4j * diagonal))
+    expected_state = walsh_hadamard.fast_walsh_hadamard_transform(state.copy())
+    expected_state *= np.exp(0.4j * (number_of_qubits - 2 * weights.astype(float))) / 2**number_of_qubits
+    walsh_hadamard.fast_walsh_hadamard_transform(expected_state)
+    assert np.allclose(mixed_state, expected_state)
+
+
+def test_get_string():
+    ## Given
+    p_1, q_1 = symbols('p_1 q_1')
+    diagonal = create_cost_diagonal([p_1 + q_1 - 1, p_1 - 1], {'p_1': 0, 'q_1': 1})
+    qaoa = statevector_simulator.StatevectorQAOA(diagonal, rand_seed=0)
+    ## When
+    most_frequent_bit_string, sampling_results = qaoa.get_string([np.pi / 8], [np.pi / 2], samples=1000)
+    ## Then
+    assert sum(sampling_results.values()) == 1000
+    assert most_frequent_bit_string == (1, 0)
+
+
+def test_optimization_engine_with_numpy_backend():
+    ## Given
+    from optimization import OptimizationEngine
+    p_1, q_1 = symbols('p_1 q_1')
+    clauses = [p_1 + q_1 - 1, p_1 - 1]
+    engine = OptimizationEngine(clauses, grid_size=8, backend='numpy')
+    ## When
+    betas, gammas = engine.step_by_step_grid_search_angles()
+    _, sampling_results = engine.qaoa_inst.get_string(betas, gammas, samples=1000)
+    ## Then
+    best_bit_string = max(sampling_results, key=lambda x: sampling_results[x])
+    assert best_bit_string[engine.mapping['p_1']] == 1
+    assert best_bit_string[engine.mapping['q_1']] == 0
+
+
+def test_optimization_engine_perform_qaoa_with_numpy_backend():
+    pytest.importorskip('scipy')
+    ## Given
+    from optimization import OptimizationEngine
+    p_1, q_1 = symbols('p_1 q_1')
+    clauses = [p_1 + q_1 - 1, p_1 - 1]
+    engine = OptimizationEngine(clauses, grid_size=8, backend='numpy')
+    ## When
+    sampling_results, mapping = engine.perform_qaoa()
+    ## Then
+    best_bit_string = max(sampling_results, key=lambda x: sampling_results[x])
+    assert best_bit_string[mapping['p_1']] == 1
+    assert best_bit_string[mapping['q_1']] == 0
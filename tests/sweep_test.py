@@ -0,0 +1,39 @@
+import os
+import pytest
+from sweep import run_sweep, read_sweep_results, load_checkpoint
+from primes import generate_biprimes
+
+
+def test_run_sweep_resumes_from_checkpoint(tmp_path):
+    ## Given
+    store_path = str(tmp_path / "results.csv")
+    pairs = list(generate_biprimes(150))
+    expected_results = list(run_sweep(pairs, str(tmp_path / "reference.csv"), block_size=4, processes=1))
+    ## When
+    sweep = run_sweep(pairs, store_path, block_size=4, processes=1)
+    for _ in range(6):
+        next(sweep)
+    sweep.close()
+    # Rows after the checkpoint are lost when the sweep is interrupted.
+    assert load_checkpoint(store_path + '.checkpoint')['completed'] == 4
+    resumed_results = list(run_sweep(pairs, store_path, block_size=4, processes=1))
+    ## Then
+    assert len(resumed_results) == len(pairs) - 4
+    stored_results = list(read_sweep_results(store_path))
+    assert [result[:5] for result in stored_results] == [result[:5] for result in expected_results]
+    assert all(result.error == '' for result in stored_results)
+
+
+def test_run_sweep_without_store_starts_over(tmp_path):
+    ## Given
+    store_path = str(tmp_path / "results.csv")
+    pairs = list(generate_biprimes(60))
+    list(run_sweep(pairs[:4], store_path, block_size=2, processes=1))
+    os.remove(store_path)
+    ## When
+    with pytest.warns(UserWarning):
+        results = list(run_sweep(pairs, store_path, block_size=2, processes=1))
+    ## Then
+    assert len(results) == len(pairs)
+    assert [result[:5] for result in read_sweep_results(store_path)] == [result[:5] for result in results]
+    assert load_checkpoint(store_path + '.checkpoint')['completed'] == len(pairs)
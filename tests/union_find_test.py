@@ -0,0 +1,42 @@
+import pytest
+from union_find import ParityUnionFind
+from sympy import symbols
+
+
+def test_parity_union_find():
+    ## Given
+    equalities = ParityUnionFind()
+    p_1, p_2, q_1, z_1_2 = symbols('p_1 p_2 q_1 z_1_2')
+    ## When
+    equalities.add_equality(z_1_2, p_1)
+    equalities.add_equality(p_1, 1 - p_2)
+    equalities.add_equality(p_2, q_1)
+    ## Then
+    assert equalities.resolve(z_1_2) == 1 - q_1
+    assert equalities.resolve(p_1) == 1 - q_1
+    assert equalities.resolve(p_2) == q_1
+    assert equalities.resolve(q_1) == q_1
+
+    ## When
+    equalities.add_equality(p_2, 0)
+    ## Then
+    assert equalities.resolve(z_1_2) == 1
+    assert equalities.resolve(q_1) == 0
+
+
+def test_parity_union_find_conflicts():
+    ## Given
+    equalities = ParityUnionFind()
+    p, q = symbols('p q')
+    equalities.add_equality(p, q)
+    ## When
+    stored = equalities.add_equality(p, 1 - q)
+    ## Then
+    assert stored
+    assert equalities.resolve(p) == q
+    assert equalities.conflicts == [(p, 1 - q)]
+
+    ## When
+    stored = equalities.add_equality(p, q*p)
+    ## Then
+    assert not stored
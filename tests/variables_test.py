@@ -0,0 +1,27 @@
+from sympy import Symbol
+from polynomial import symbol_to_id
+import variables
+
+
+def test_get_variable_symbol():
+    ## Given
+    kind, indices = 'z', (2, 4)
+    ## When
+    symbol = variables.get_variable_symbol(kind, *indices)
+    ## Then
+    assert symbol == Symbol('z_2_4')
+    assert variables.get_variable_symbol(kind, *indices) is symbol
+    assert variables.get_variable_id(kind, *indices) == symbol_to_id(symbol)
+
+
+def test_get_variable_info():
+    ## Given
+    p_3 = Symbol('p_3')
+    z_1_3 = variables.get_variable_symbol('z', 1, 3)
+    ## When / Then
+    assert variables.get_variable_info(p_3) == ('p', (3,))
+    assert variables.get_variable_info(z_1_3) == ('z', (1, 3))
+    assert variables.get_variable_info(symbol_to_id(z_1_3)) == ('z', (1, 3))
+    assert variables.get_variable_info(Symbol('x')) is None
+    assert variables.get_variable_info(Symbol('p_x')) is None
+    assert variables.get_variable_info(Symbol('z_1')) is None
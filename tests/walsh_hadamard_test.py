@@ -0,0 +1,35 @@
+from functools import reduce
+import numpy as np
+import pytest
+import walsh_hadamard
+
+
+def hadamard_matrix(number_of_bits):
+    return reduce(np.kron, [np.array([[1, 1], [1, -1]])] * number_of_bits, np.ones((1, 1)))
+
+
+@pytest.mark.parametrize("block_size, threads", [(2**14, 1), (4, 1), (4, 3), (1, 2)])
+def test_fast_walsh_hadamard_transform(block_size, threads):
+    ## Given
+    number_of_bits = 7
+    vector = np.random.RandomState(0).normal(size=2**number_of_bits) * (1 + 0.5j)
+    expected_vector = hadamard_matrix(number_of_bits).dot(vector)
+    ## When
+    result = walsh_hadamard.fast_walsh_hadamard_transform(vector, block_size=block_size, threads=threads)
+    ## Then
+    assert result is vector
+    assert np.allclose(vector, expected_vector)
+
+
+def test_fast_walsh_hadamard_transform_wrong_length():
+    with pytest.raises(ValueError):
+        walsh_hadamard.fast_walsh_hadamard_transform(np.zeros(12))
+
+
+def test_hamming_weights():
+    ## Given
+    number_of_bits = 5
+    ## When
+    weights = walsh_hadamard.hamming_weights(number_of_bits)
+    ## Then
+    assert weights.tolist() == [bin(index).count('1') for index in range(2**number_of_bits)]
@@ -0,0 +1,144 @@
+import itertools
+from collections import Counter
+
+from sympy import Symbol, sympify, default_sort_key
+
+from polynomial import Polynomial, symbol_to_id
+from preprocessing import simplify_clauses, can_be_zero
+
+"""
+Classical solver for the problems which are too large for the exhaustive search.
+
+It's a DPLL-style search: after each decision (setting a single variable to 0 or 1)
+preprocessing rules are applied to the clauses (see simplify_clauses in preprocessing.py),
+which usually determines many other variables. Branches where some clause can't be
+equal to 0 anymore are abandoned. Variables which appear in the highest number of clauses
+are chosen first.
+"""
+
+
+def solve_with_backtracking(clauses, p_dict, q_dict, z_dict=None, max_solutions=None):
+    """
+    Finds all the assignments of p and q consistent with the clauses.
+
+    Args:
+        clauses (list): See module documentation in preprocessing.py.
+        p_dict, q_dict, z_dict: See module documentation in preprocessing.py. z_dict is optional.
+        max_solutions (int, optional): Search stops after finding this number of solutions.
+            If None, all the solutions are found. Default: None
+
+    Returns:
+        factors (list): List of tuples (p, q), without duplicates.
+    """
+    clauses = [sympify(clause) for clause in clauses]
+    solutions = []
+    _search(clauses, {}, clauses, p_dict, q_dict, solutions, max_solutions)
+    return solutions
+
+
+def _search(clauses, substitutions, original_clauses, p_dict, q_dict, solutions, max_solutions):
+    if max_solutions is not None and len(solutions) >= max_solutions:
+        return
+
+    # Propagation - preprocessing rules derive values of variables from the clauses.
+    simplified_clauses, known_expressions = simplify_clauses(clauses, verbose=False)
+    known_variables = {}
+    # Facts about products of variables (e.g. p_1*q_1 = 0) are constraints on their own.
+    remaining_clauses = list(simplified_clauses)
+    for key, value in known_expressions.items():
+        if isinstance(key, Symbol):
+            known_variables[key] = value
+        else:
+            remaining_clauses.append(key - value)
+    substitutions = compose_substitutions(substitutions, known_variables)
+    remaining_clauses = [substitute(clause, known_variables) for clause in remaining_clauses]
+    remaining_clauses = [clause for clause in remaining_clauses if clause != 0]
+    if any(not can_be_zero(clause) for clause in remaining_clauses):
+        return
+
+    if len(remaining_clauses) == 0:
+        _add_solutions(substitutions, original_clauses, p_dict, q_dict, solutions, max_solutions)
+        return
+
+    variable = choose_variable(remaining_clauses)
+    for value in [0, 1]:
+        decision = {variable: value}
+        branch_clauses = [substitute(clause, decision) for clause in remaining_clauses]
+        if any(not can_be_zero(clause) for clause in branch_clauses):
+            continue
+        branch_clauses = [clause for clause in branch_clauses if clause != 0]
+        _search(branch_clauses, compose_substitutions(substitutions, decision),
+                original_clauses, p_dict, q_dict, solutions, max_solutions)
+
+
+def _add_solutions(substitutions, original_clauses, p_dict, q_dict, solutions, max_solutions):
+    # Variables which are not constrained by any clause can take any value.
+    p_values = [substitute(value, substitutions) for value in p_dict.values()]
+    q_values = [substitute(value, substitutions) for value in q_dict.values()]
+    free_variables = set()
+    for value in p_values + q_values:
+        free_variables |= value.free_symbols
+    free_variables = sorted(free_variables, key=default_sort_key)
+
+    for free_values in itertools.product([0, 1], repeat=len(free_variables)):
+        assignment = dict(zip(free_variables, free_values))
+        full_substitutions = compose_substitutions(substitutions, assignment)
+        # Makes sure that propagation hasn't accepted an inconsistent assignment.
+        if any(substitute(clause, full_substitutions) != 0 for clause in original_clauses):
+            continue
+        p = sum(int(substitute(value, assignment)) * 2**key for key, value in zip(p_dict.keys(), p_values))
+        q = sum(int(substitute(value, assignment)) * 2**key for key, value in zip(q_dict.keys(), q_values))
+        if (p, q) not in solutions:
+            solutions.append((p, q))
+        if max_solutions is not None and len(solutions) >= max_solutions:
+            return
+
+
+def substitute(expression, values):
+    """
+    Substitutes values of the variables into the expression.
+
+    Args:
+        expression: sympy expression or integer.
+        values (dict): Maps sympy Symbols to sympy expressions or integers.
+
+    Returns:
+        expression: sympy expression.
+    """
+    expression = sympify(expression)
+    values = {variable: value for variable, value in values.items() if variable in expression.free_symbols}
+    if len(values) == 0:
+        return expression
+    try:
+        polynomial = Polynomial.from_sympy(expression)
+        polynomial_values = {symbol_to_id(variable): Polynomial.from_sympy(value) for variable, value in values.items()}
+    except ValueError:
+        return expression.subs(values, simultaneous=True).expand()
+    return polynomial.subs(polynomial_values).to_sympy()
+
+
+def compose_substitutions(substitutions, new_values):
+    """
+    Adds new values to the substitutions, updating the old ones.
+
+    Args:
+        substitutions (dict): Maps sympy Symbols to expressions which don't contain any of the new variables.
+        new_values (dict): Maps sympy Symbols to expressions.
+
+    Returns:
+        substitutions (dict): Composed substitutions.
+    """
+    composed = {variable: substitute(value, new_values) for variable, value in substitutions.items()}
+    composed.update(new_values)
+    return composed
+
+
+def choose_variable(clauses):
+    """
+    Chooses variable which appears in the highest number of clauses.
+    Ties are resolved by the name of the variable, so the search is deterministic.
+    """
+    occurrences = Counter()
+    for clause in clauses:
+        occurrences.update(clause.free_symbols)
+    return min(occurrences, key=lambda variable: (-occurrences[variable], default_sort_key(variable)))
@@ -0,0 +1,117 @@
+import multiprocessing
+import signal
+import threading
+import time
+from collections import namedtuple
+
+from preprocessing import create_clauses
+from caching import DiskCache
+
+"""
+Batch preprocessing of many numbers at once.
+
+create_clauses_batch spreads create_clauses calls across a pool of processes.
+Each item is isolated - if preprocessing of one number raises an exception
+(e.g. "All clauses equal to 0, but unknowns still exist.") or exceeds the timeout,
+it is reported in the result for that number and the batch goes on.
+"""
+
+
+# Result of preprocessing a single number.
+# index - position of the number in the input list.
+# m, true_p, true_q - input values.
+# p_dict, q_dict, z_dict, clauses - output of create_clauses, None if it failed.
+# error - None if preprocessing succeeded, otherwise description of the exception.
+# time - time of preprocessing in seconds.
+BatchResult = namedtuple('BatchResult', ['index', 'm', 'true_p', 'true_q', 'p_dict', 'q_dict', 'z_dict', 'clauses', 'error', 'time'])
+
+
+class ItemTimeoutError(Exception):
+    """
+    Raised when preprocessing of a single item takes longer than the timeout.
+    """
+    pass
+
+
+def create_clauses_batch(ms, true_ps=None, true_qs=None, apply_preprocessing=True, processes=None,
+                         chunksize=1, ordered=True, timeout=None, cache_directory=None):
+    """
+    Runs create_clauses for many numbers, using a pool of processes.
+
+    Results are yielded as soon as they are available - in the input order if ordered is True,
+    otherwise in the order of completion.
+
+    Args:
+        ms (list): Numbers to be factored.
+        true_ps, true_qs (list, optional): Factors of the numbers, used to determine their lengths
+            (see create_clauses). Elements might be None. Default: None
+        apply_preprocessing (bool, optional): See create_clauses. Default: True
+        processes (int, optional): Number of worker processes. If None, number of CPUs is used.
+            If 1, everything is calculated in the current process. Default: None
+        chunksize (int, optional): Number of items sent to a worker at once. Default: 1
+        ordered (bool, optional): If True, results are yielded in the input order. Default: True
+        timeout (float, optional): Time limit for a single item in seconds.
+            Works only on systems supporting SIGALRM. Default: None
+        cache_directory (str, optional): If provided, results are read from and stored in
+            a DiskCache in this directory, shared by all the workers. Default: None
+
+    Yields:
+        result (BatchResult): See BatchResult.
+    """
+    ms = list(ms)
+    if true_ps is None:
+        true_ps = [None] * len(ms)
+    if true_qs is None:
+        true_qs = [None] * len(ms)
+    if len(true_ps) != len(ms) or len(true_qs) != len(ms):
+        raise ValueError("true_ps and true_qs must have the same length as ms.")
+
+    tasks = [(index, m, true_p, true_q, apply_preprocessing, timeout, cache_directory)
+             for index, (m, true_p, true_q) in enumerate(zip(ms, true_ps, true_qs))]
+
+    if processes == 1:
+        for task in tasks:
+            yield _create_clauses_worker(task)
+        return
+
+    with multiprocessing.Pool(processes=processes) as pool:
+        if ordered:
+            results = pool.imap(_create_clauses_worker, tasks, chunksize)
+        else:
+            results = pool.imap_unordered(_create_clauses_worker, tasks, chunksize)
+        for result in results:
+            yield result
+
+
+def _create_clauses_worker(task):
+    index, m, true_p, true_q, apply_preprocessing, timeout, cache_directory = task
+    start_time = time.time()
+    try:
+        cache = None if cache_directory is None else DiskCache(cache_directory)
+        p_dict, q_dict, z_dict, clauses = _run_with_timeout(timeout, create_clauses, m, true_p, true_q,
+                                                            apply_preprocessing, False, cache)
+        error = None
+    except Exception as exception:
+        p_dict, q_dict, z_dict, clauses = None, None, None, None
+        error = type(exception).__name__ + ": " + str(exception)
+    return BatchResult(index, m, true_p, true_q, p_dict, q_dict, z_dict, clauses, error, time.time() - start_time)
+
+
+def _run_with_timeout(timeout, function, *args):
+    can_use_alarm = hasattr(signal, 'SIGALRM') and threading.current_thread() is threading.main_thread()
+    if timeout is None or not can_use_alarm:
+        return function(*args)
+
+    # The alarm can interrupt the function anywhere, so the global registries of variables
+    # (see symbol_to_id in polynomial.py and variables.py) are updated in an order which keeps them
+    # consistent after an interruption, and the worker can go on with the next items.
+    def handle_timeout(signum, frame):
+        raise ItemTimeoutError("Preprocessing took longer than " + str(timeout) + " s.")
+
+    previous_handler = signal.signal(signal.SIGALRM, handle_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return function(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
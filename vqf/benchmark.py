@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+
+from sympy import nextprime
+
+from preprocessing import create_clauses, calculate_number_of_unknowns, clear_simplification_cache
+
+"""
+Benchmark of create_clauses scaling with the bit length of m.
+
+It runs a fixed corpus of biprimes (balanced and unbalanced factors, with and without
+known lengths of p and q) and records time, peak memory, number of unknowns
+and number of carry bits for every case. Results can be stored as a baseline
+and later runs are compared against it, so performance changes in the preprocessing
+can be judged quantitatively.
+
+Usage:
+    python vqf/benchmark.py                      # compare with the stored baseline
+    python vqf/benchmark.py --save-baseline      # store new baseline
+"""
+
+
+DEFAULT_BASELINE_PATH = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                                                      'benchmarks', 'create_clauses_baseline.json'))
+
+# Single benchmark case.
+# name - unique identifier, e.g. "24_balanced_known".
+# known_lengths - if True, lengths of p and q are passed to create_clauses.
+BenchmarkCase = namedtuple('BenchmarkCase', ['name', 'bits', 'm', 'p', 'q', 'known_lengths'])
+
+
+def create_benchmark_corpus(bit_lengths=range(8, 41, 4)):
+    """
+    Creates fixed corpus of benchmark cases.
+
+    For every bit length there are balanced (q has half of the bits of m) and unbalanced
+    (q has a quarter of the bits of m) cases, each with and without known lengths of the factors.
+
+    Args:
+        bit_lengths (iterable, optional): Bit lengths of m. Default: 8, 12, ..., 40
+
+    Returns:
+        cases (list): List of BenchmarkCase.
+    """
+    cases = []
+    for bits in bit_lengths:
+        for factors_type, q_bits in [('balanced', bits // 2), ('unbalanced', max(bits // 4, 2))]:
+            q = nextprime(max(int(2**(q_bits - 1) * 1.37), 2))
+            p = nextprime(int(2**(bits - 1) * 1.3) // q)
+            m = p * q
+            for known_lengths in [True, False]:
+                name = str(bits) + "_" + factors_type + "_" + ("known" if known_lengths else "unknown")
+                cases.append(BenchmarkCase(name, bits, m, p, q, known_lengths))
+    return cases
+
+
+def run_benchmark_case(case, measure_memory=True, repeats=3):
+    """
+    Runs create_clauses for a single case.
+
+    Time is the minimum over several runs, to reduce the noise.
+    It's measured separately from memory, since tracing memory allocations slows down the execution.
+    Caches of the preprocessing are cleared before each run.
+
+    Args:
+        case (BenchmarkCase): case to run.
+        measure_memory (bool, optional): If True, peak memory is measured. Default: True
+        repeats (int, optional): Number of runs used to measure time. Default: 3
+
+    Returns:
+        result (dict): Contains name, bits, m, time (in seconds), peak_memory (in bytes, None if not measured),
+            unknowns, carry_bits and error (None if create_clauses succeeded).
+    """
+    true_p = case.p if case.known_lengths else None
+    true_q = case.q if case.known_lengths else None
+    result = {'name': case.name, 'bits': case.bits, 'm': case.m, 'time': None, 'peak_memory': None,
+              'unknowns': None, 'carry_bits': None, 'error': None}
+    for _ in range(repeats):
+        clear_simplification_cache()
+        start_time = time.perf_counter()
+        try:
+            p_dict, q_dict, z_dict, _ = create_clauses(case.m, true_p, true_q, verbose=False)
+        except Exception as exception:
+            result['error'] = str(exception)
+            return result
+        elapsed_time = time.perf_counter() - start_time
+        if result['time'] is None or elapsed_time < result['time']:
+            result['time'] = elapsed_time
+    result['unknowns'], result['carry_bits'] = calculate_number_of_unknowns(p_dict, q_dict, z_dict)
+
+    if measure_memory:
+        clear_simplification_cache()
+        tracemalloc.start()
+        try:
+            create_clauses(case.m, true_p, true_q, verbose=False)
+            _, result['peak_memory'] = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_benchmark(cases=None, measure_memory=True, repeats=3, verbose=True):
+    """
+    Runs all the benchmark cases.
+
+    Args:
+        cases (list, optional): List of BenchmarkCase. If None, create_benchmark_corpus is used.
+        measure_memory, repeats (optional): See run_benchmark_case.
+        verbose (bool, optional): If True, results are printed. Default: True
+
+    Returns:
+        results (list): List of results, see run_benchmark_case.
+    """
+    if cases is None:
+        cases = create_benchmark_corpus()
+    results = []
+    for case in cases:
+        result = run_benchmark_case(case, measure_memory, repeats)
+        results.append(result)
+        if verbose:
+            print(format_result(result))
+    return results
+
+
+def compare_with_baseline(results, baseline, time_tolerance=0.25, memory_tolerance=0.25, min_time_difference=0.05):
+    """
+    Compares benchmark results with the baseline.
+
+    Case is flagged as a regression if:
+    - it fails, while it succeeded in the baseline,
+    - it has more unknowns or carry bits than in the baseline,
+    - its time exceeds the baseline by more than time_tolerance (relative) and min_time_difference (absolute),
+    - its peak memory exceeds the baseline by more than memory_tolerance (relative).
+
+    Args:
+        results (list): Results of run_benchmark.
+        baseline (list): Results of run_benchmark stored earlier.
+        time_tolerance, memory_tolerance (float, optional): Allowed relative increase. Default: 0.25
+        min_time_difference (float, optional): Time increases smaller than this (in seconds) are ignored. Default: 0.05
+
+    Returns:
+        regressions (list): List of tuples (name, description).
+    """
+    baseline_by_name = {entry['name']: entry for entry in baseline}
+    regressions = []
+    for result in results:
+        reference = baseline_by_name.get(result['name'])
+        if reference is None:
+            continue
+        name = result['name']
+        if result['error'] is not None:
+            if reference['error'] is None:
+                regressions.append((name, "fails: " + result['error']))
+            continue
+        if reference['error'] is not None:
+            continue
+        for field in ['unknowns', 'carry_bits']:
+            if result[field] > reference[field]:
+                regressions.append((name, field + " increased from " + str(reference[field]) + " to " + str(result[field])))
+        time_difference = result['time'] - reference['time']
+        if time_difference > min_time_difference and time_difference > time_tolerance * reference['time']:
+            regressions.append((name, "time increased from {:.3f} s to {:.3f} s".format(reference['time'], result['time'])))
+        if result['peak_memory'] is not None and reference['peak_memory'] is not None:
+            if result['peak_memory'] > (1 + memory_tolerance) * reference['peak_memory']:
+                regressions.append((name, "peak memory increased from {} B to {} B".format(reference['peak_memory'], result['peak_memory'])))
+    return regressions
+
+
+def save_results(results, path):
+    """
+    Saves benchmark results to a JSON file, together with information about the environment.
+    """
+    data = {'python': platform.python_version(), 'machine': platform.machine(), 'results': results}
+    with open(path, 'w') as results_file:
+        json.dump(data, results_file, indent=2)
+
+
+def load_results(path):
+    """
+    Loads benchmark results saved with save_results.
+    """
+    with open(path) as results_file:
+        return json.load(results_file)['results']
+
+
+def format_result(result):
+    if result['error'] is not None:
+        return "{:<24} m={:<14} error: {}".format(result['name'], result['m'], result['error'])
+    peak_memory = "-" if result['peak_memory'] is None else "{:.1f} MB".format(result['peak_memory'] / 1024**2)
+    return "{:<24} m={:<14} time={:>8.3f} s  memory={:>9}  unknowns={:<4} carry_bits={}".format(
+        result['name'], result['m'], result['time'], peak_memory, result['unknowns'], result['carry_bits'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of create_clauses scaling with the bit length of m.")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH, help="Path to the baseline file.")
+    parser.add_argument('--save-baseline', action='store_true', help="Store results as a new baseline.")
+    parser.add_argument('--no-memory', action='store_true', help="Don't measure peak memory.")
+    parser.add_argument('--repeats', type=int, default=3, help="Number of runs used to measure time.")
+    parser.add_argument('--time-tolerance', type=float, default=0.25)
+    parser.add_argument('--memory-tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = run_benchmark(measure_memory=not args.no_memory, repeats=args.repeats)
+    if args.save_baseline:
+        save_results(results, args.baseline)
+        print("Baseline saved to", args.baseline)
+        return
+    if not os.path.exists(args.baseline):
+        print("No baseline found in", args.baseline)
+        return
+    regressions = compare_with_baseline(results, load_results(args.baseline),
+                                        args.time_tolerance, args.memory_tolerance)
+    if len(regressions) == 0:
+        print("No regressions found.")
+    else:
+        print("Regressions:")
+        for name, description in regressions:
+            print(name, "-", description)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import zlib
+from collections import OrderedDict
+
+"""
+Caches used to avoid repeating expensive computations in the VQF algorithm.
+"""
+
+
+class LRUCache(object):
+    """
+    In-memory cache with a size limit and least-recently-used eviction.
+
+    Args:
+        max_size (int, optional): Maximum number of stored entries. If None, size is not limited. Default: 10000
+
+    Attributes:
+        max_size (int): See Args.
+        hits (int): Number of lookups which found a value.
+        misses (int): Number of lookups which didn't find a value.
+        evictions (int): Number of entries removed because of the size limit.
+
+    """
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """
+        Returns value stored for given key and marks it as recently used.
+
+        Args:
+            key: hashable key.
+            default (optional): Value returned if key is not in the cache. Default: None
+
+        Returns:
+            value: stored value or default.
+        """
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Stores value for given key, evicting least recently used entries if needed.
+        """
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        self._evict()
+
+    def resize(self, max_size):
+        """
+        Changes the size limit, evicting entries if needed.
+        """
+        self.max_size = max_size
+        self._evict()
+
+    def clear(self):
+        """
+        Removes all the entries and resets the statistics.
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def statistics(self):
+        """
+        Returns cache statistics.
+
+        Returns:
+            statistics (dict): Contains hits, misses, hit_rate, evictions, size and max_size.
+        """
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            hit_rate = 0.0
+        else:
+            hit_rate = self.hits / lookups
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': hit_rate,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'max_size': self.max_size}
+
+    def _evict(self):
+        if self.max_size is None:
+            return
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+class DiskCache(object):
+    """
+    Persistent cache storing values as files in a directory, with a limit on the total size.
+
+    Values are pickled and compressed with zlib. Each entry is stored in a separate file,
+    named after the hash of its key, so the cache can be safely shared by many processes.
+    When the total size exceeds the limit, least recently used entries are removed.
+
+    Args:
+        directory (str): Directory in which the entries are stored. Created if it doesn't exist.
+        max_size_bytes (int, optional): Maximum total size of the entries in bytes.
+            If None, size is not limited. Default: 100 MB
+
+    Attributes:
+        directory (str): See Args.
+        max_size_bytes (int): See Args.
+        hits (int): Number of lookups which found a value.
+        misses (int): Number of lookups which didn't find a value.
+        evictions (int): Number of entries removed because of the size limit.
+
+    """
+    EXTENSION = '.cache'
+
+    def __init__(self, directory, max_size_bytes=100 * 1024**2):
+        self.directory = directory
+        self.max_size_bytes = max_size_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entry_paths())
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key, default=None):
+        """
+        Returns value stored for given key and marks it as recently used.
+
+        Entries which can't be read (e.g. corrupted files) are removed and treated as missing.
+
+        Args:
+            key: key with deterministic repr, e.g. tuple of integers, strings and booleans.
+            default (optional): Value returned if key is not in the cache. Default: None
+
+        Returns:
+            value: stored value or default.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as cache_file:
+                stored_key, value = pickle.loads(zlib.decompress(cache_file.read()))
+        except FileNotFoundError:
+            self.misses += 1
+            return default
+        except Exception:
+            self._remove(path)
+            self.misses += 1
+            return default
+        if stored_key != key:
+            self.misses += 1
+            return default
+        os.utime(path)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Stores value for given key, evicting least recently used entries if needed.
+        """
+        data = zlib.compress(pickle.dumps((key, value), protocol=pickle.HIGHEST_PROTOCOL))
+        # Writing to a temporary file first makes sure other processes never read a partial entry.
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(file_descriptor, 'wb') as cache_file:
+            cache_file.write(data)
+        os.replace(temporary_path, self._path(key))
+        self._evict()
+
+    def clear(self):
+        """
+        Removes all the entries and resets the statistics.
+        """
+        for path in self._entry_paths():
+            self._remove(path)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def size_bytes(self):
+        """
+        Returns total size of the stored entries in bytes.
+        """
+        return sum(os.path.getsize(path) for path in self._entry_paths())
+
+    def statistics(self):
+        """
+        Returns cache statistics.
+
+        Returns:
+            statistics (dict): Contains hits, misses, hit_rate, evictions, size, size_bytes and max_size_bytes.
+        """
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            hit_rate = 0.0
+        else:
+            hit_rate = self.hits / lookups
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': hit_rate,
+                'evictions': self.evictions,
+                'size': len(self),
+                'size_bytes': self.size_bytes(),
+                'max_size_bytes': self.max_size_bytes}
+
+    def _path(self, key):
+        key_hash = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.directory, key_hash + self.EXTENSION)
+
+    def _entry_paths(self):
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                if name.endswith(self.EXTENSION)]
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        if self.max_size_bytes is None:
+            return
+        entries = []
+        for path in self._entry_paths():
+            try:
+                status = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((status.st_mtime, path, status.st_size))
+        total_size = sum(size for _, _, size in entries)
+        entries.sort()
+        for _, path, size in entries:
+            if total_size <= self.max_size_bytes:
+                break
+            self._remove(path)
+            total_size -= size
+            self.evictions += 1
@@ -0,0 +1,113 @@
+import numpy as np
+
+"""
+Generation of the cost layer of QAOA, exp(-i * gamma * H), for the cost hamiltonian H.
+
+Grove exponentiates every Pauli term of every clause separately, so terms acting on the
+same qubits are repeated and every multi-qubit term gets its own CNOT ladder.
+Here the whole hamiltonian is first merged into IsingHamiltonian (see cost_hamiltonian.py),
+so every set of qubits appears once, and terms are ordered so that consecutive ones
+share the beginning of their CNOT ladders.
+
+exp(-i * gamma * c * Z_a Z_b ... Z_k) is implemented as CNOT(a, b), CNOT(b, c), ...,
+which computes parity of all the qubits on k, followed by RZ(2 * gamma * c) on k and
+uncomputation of the parity. Uncomputation is postponed until the next term needs
+a different ladder. The constant term gives only a global phase, so it's skipped.
+
+For small number of qubits the cost layer can also be a single gate defined by its
+diagonal (see create_diagonal_gate_program).
+
+** Notation **
+gates
+List of tuples (name, angle, qubits), where name is 'RZ' or 'CNOT',
+angle is None for CNOT and qubits is a tuple (control, target) for CNOT.
+"""
+
+
+# Maximum number of qubits for which the cost layer is defined as a single DEFGATE.
+DEFGATE_MAX_QUBITS = 10
+
+
+def create_cost_layer_gates(hamiltonian, gamma):
+    """
+    Creates gates implementing exp(-i * gamma * H), up to a global phase.
+
+    Args:
+        hamiltonian (IsingHamiltonian): Cost hamiltonian.
+        gamma (float): Angle of the cost layer.
+
+    Returns:
+        gates (list): See module documentation at the top.
+    """
+    gates = []
+    chain = ()
+    for qubits, coefficient in sorted(hamiltonian.terms()):
+        if len(qubits) == 0:
+            continue
+        shared_length = 0
+        while (shared_length < min(len(chain), len(qubits))
+               and chain[shared_length] == qubits[shared_length]):
+            shared_length += 1
+        # After CNOT(chain[i], chain[i+1]) qubit chain[i+1] holds parity of chain[0], ..., chain[i+1],
+        # so only the part of the ladder after the shared qubits has to be uncomputed.
+        for index in range(len(chain) - 2, max(shared_length, 1) - 2, -1):
+            gates.append(('CNOT', None, (chain[index], chain[index + 1])))
+        for index in range(max(shared_length, 1) - 1, len(qubits) - 1):
+            gates.append(('CNOT', None, (qubits[index], qubits[index + 1])))
+        gates.append(('RZ', 2 * gamma * coefficient, (qubits[-1],)))
+        chain = qubits
+    for index in range(len(chain) - 2, -1, -1):
+        gates.append(('CNOT', None, (chain[index], chain[index + 1])))
+    return gates
+
+
+def count_gates(gates):
+    """
+    Counts gates of every type.
+
+    Returns:
+        counts (dict): Maps names of the gates to their numbers.
+    """
+    counts = {}
+    for name, _, _ in gates:
+        counts[name] = counts.get(name, 0) + 1
+    return counts
+
+
+def create_cost_layer_program(hamiltonian, gamma):
+    """
+    Creates pyquil Program implementing exp(-i * gamma * H), see create_cost_layer_gates.
+    """
+    from pyquil import Program
+    from pyquil.gates import RZ, CNOT
+    program = Program()
+    for name, angle, qubits in create_cost_layer_gates(hamiltonian, gamma):
+        if name == 'RZ':
+            program += RZ(angle, qubits[0])
+        else:
+            program += CNOT(*qubits)
+    return program
+
+
+def create_diagonal_gate_program(diagonal, gamma, name="COST"):
+    """
+    Creates pyquil Program with the cost layer defined as a single diagonal gate.
+
+    Args:
+        diagonal (ndarray): Values of the cost hamiltonian, see create_cost_diagonal in cost_hamiltonian.py.
+        gamma (float): Angle of the cost layer.
+        name (str, optional): Name of the gate. Default: "COST"
+
+    Returns:
+        program (Program): Program with DEFGATE and its application to all the qubits.
+    """
+    from pyquil import Program
+    from pyquil.quil import DefGate
+    number_of_qubits = len(diagonal).bit_length() - 1
+    if number_of_qubits > DEFGATE_MAX_QUBITS:
+        raise ValueError("Too many qubits for a diagonal gate: " + str(number_of_qubits))
+    matrix = np.diag(np.exp(-1j * gamma * np.asarray(diagonal)))
+    gate_definition = DefGate(name, matrix)
+    gate = gate_definition.get_constructor()
+    # In pyquil the first qubit of a gate is the most significant bit of the matrix index.
+    return Program(gate_definition, gate(*reversed(range(number_of_qubits))))
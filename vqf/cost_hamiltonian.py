@@ -0,0 +1,270 @@
+import itertools
+
+import numpy as np
+from sympy import sympify, default_sort_key
+
+from polynomial import Polynomial, id_to_symbol
+from exhaustive_solver import evaluate_polynomial
+from walsh_hadamard import fast_walsh_hadamard_transform
+
+"""
+Cost hamiltonian of the VQF algorithm, built without pyquil.
+
+The cost hamiltonian (sum of squared clauses, see section IIC of the article)
+is diagonal in the computational basis, so it's fully described by the vector
+of its values for all the 2**n basis states - the diagonal.
+
+** Notation **
+mapping
+Dictionary mapping names of the variables (e.g. 'p_1') to qubit indices,
+the same as mapping in OptimizationEngine.
+
+basis state index
+Qubit i corresponds to the i-th bit of the index, i.e. index = sum(b_i * 2**i).
+"""
+
+
+def create_mapping(clauses):
+    """
+    Assigns qubits to the variables from the clauses, in the order of their names.
+
+    Args:
+        clauses (list): See module documentation in preprocessing.py.
+
+    Returns:
+        mapping (dict): See module documentation at the top.
+    """
+    variables = set()
+    for clause in clauses:
+        variables |= sympify(clause).free_symbols
+    return {str(variable): qubit for qubit, variable in enumerate(sorted(variables, key=default_sort_key))}
+
+
+def create_cost_diagonal(clauses, mapping=None):
+    """
+    Calculates value of the cost hamiltonian for every basis state.
+
+    Every squared clause is first tabulated for all the values of its own k variables (2**k entries).
+    The diagonal is stored as an n-dimensional array with one axis of length 2 per qubit,
+    so the table can be added to it with broadcasting. This takes O(number of clauses * 2**n)
+    vectorized operations, without any arrays of bits of length 2**n.
+
+    Args:
+        clauses (list): See module documentation in preprocessing.py.
+        mapping (dict, optional): See module documentation at the top.
+            If None, create_mapping is used. Default: None
+
+    Returns:
+        diagonal (ndarray): Array of length 2**n, where n is the number of qubits.
+            Its dtype is int64 if all the coefficients are integers, float otherwise.
+    """
+    if mapping is None:
+        mapping = create_mapping(clauses)
+    number_of_qubits = len(mapping)
+    # Qubit i corresponds to the axis number_of_qubits - 1 - i.
+    diagonal = np.zeros((2,) * number_of_qubits, dtype=np.int64)
+    for clause in clauses:
+        polynomial = Polynomial.from_sympy(clause)
+        if polynomial.is_constant() and polynomial.constant_term() == 0:
+            continue
+        qubit_of_variable = {var_id: mapping[str(id_to_symbol(var_id))] for var_id in polynomial.variables()}
+        qubits = sorted(set(qubit_of_variable.values()))
+        local_indices = np.arange(2**len(qubits), dtype=np.int64)
+        bits = [((local_indices >> position) & 1).astype(bool) for position in range(len(qubits))]
+        position = {var_id: qubits.index(qubit) for var_id, qubit in qubit_of_variable.items()}
+        values = evaluate_polynomial(polynomial, bits, position, len(local_indices))
+
+        # Axes of the reshaped table go from the highest qubit to the lowest one, as in the diagonal.
+        shape = [1] * number_of_qubits
+        for qubit in qubits:
+            shape[number_of_qubits - 1 - qubit] = 2
+        table = (values * values).reshape(shape)
+        if table.dtype != diagonal.dtype:
+            diagonal = diagonal.astype(table.dtype)
+        diagonal += table
+    return diagonal.reshape(-1)
+
+
+def get_ground_states(diagonal, mapping):
+    """
+    Finds basis states with the lowest energy.
+
+    Args:
+        diagonal (ndarray): See create_cost_diagonal.
+        mapping (dict): See module documentation at the top.
+
+    Returns:
+        ground_states (list): List of dictionaries mapping names of the variables to their values.
+        energy: Energy of the ground states.
+    """
+    energy = diagonal.min()
+    ground_states = []
+    for index in np.nonzero(diagonal == energy)[0].tolist():
+        ground_states.append({name: (index >> qubit) & 1 for name, qubit in mapping.items()})
+    return ground_states, energy.item()
+
+
+class IsingHamiltonian(object):
+    """
+    Cost hamiltonian expressed with Pauli Z operators.
+
+    Binary variable assigned to qubit i is x_i = (1 - Z_i) / 2, so every squared clause
+    is a polynomial in Z operators. It's stored as a constant, a vector of single-qubit
+    coefficients and sparse tables of the multi-qubit terms, keyed by sorted tuples of qubits.
+    Squaring and summing is done on Polynomial objects and on these tables,
+    so no duplicated or identity terms are created.
+
+    Args:
+        number_of_qubits (int): Number of qubits.
+
+    Attributes:
+        number_of_qubits (int): See Args.
+        constant (float): Coefficient of the identity.
+        h (ndarray): Coefficients of Z_i terms.
+        couplings (dict): Maps number of qubits in a term (2, 3, 4, ...) to a dictionary,
+            which maps sorted tuples of qubits to the coefficients of Z_i*Z_j*... terms.
+    """
+
+    def __init__(self, number_of_qubits):
+        self.number_of_qubits = number_of_qubits
+        self.constant = 0.0
+        self.h = np.zeros(number_of_qubits)
+        self.couplings = {}
+
+    @classmethod
+    def from_clauses(cls, clauses, mapping=None):
+        """
+        Creates hamiltonian equal to the sum of squared clauses.
+
+        Args:
+            clauses (list): See module documentation in preprocessing.py.
+            mapping (dict, optional): See module documentation at the top.
+                If None, create_mapping is used. Default: None
+
+        Returns:
+            hamiltonian (IsingHamiltonian)
+        """
+        if mapping is None:
+            mapping = create_mapping(clauses)
+        cost_function = Polynomial()
+        for clause in clauses:
+            polynomial = Polynomial.from_sympy(clause)
+            cost_function += polynomial * polynomial
+
+        hamiltonian = cls(len(mapping))
+        for monomial, coefficient in cost_function.terms.items():
+            qubits = sorted(mapping[str(id_to_symbol(var_id))] for var_id in monomial)
+            # x_1 * ... * x_k = (1 - Z_1) * ... * (1 - Z_k) / 2**k
+            weight = float(coefficient) / 2**len(qubits)
+            for order in range(len(qubits) + 1):
+                for term_qubits in itertools.combinations(qubits, order):
+                    hamiltonian.add_term(term_qubits, (-1)**order * weight)
+        hamiltonian.remove_zero_terms()
+        return hamiltonian
+
+    def add_term(self, qubits, coefficient):
+        """
+        Adds coefficient to the term acting on the given qubits.
+
+        Args:
+            qubits (tuple): Sorted tuple of qubits, empty tuple represents the constant.
+            coefficient (float): Coefficient to add.
+        """
+        if len(qubits) == 0:
+            self.constant += coefficient
+        elif len(qubits) == 1:
+            self.h[qubits[0]] += coefficient
+        else:
+            table = self.couplings.setdefault(len(qubits), {})
+            table[qubits] = table.get(qubits, 0.0) + coefficient
+
+    def remove_zero_terms(self):
+        """
+        Removes multi-qubit terms which have cancelled out.
+        """
+        for order in list(self.couplings):
+            self.couplings[order] = {qubits: coefficient for qubits, coefficient in self.couplings[order].items()
+                                     if coefficient != 0}
+            if len(self.couplings[order]) == 0:
+                del self.couplings[order]
+
+    def terms(self):
+        """
+        Returns list of tuples (qubits, coefficient) of all the non-zero terms, including the constant.
+        """
+        terms = []
+        if self.constant != 0:
+            terms.append(((), self.constant))
+        for qubit, coefficient in enumerate(self.h):
+            if coefficient != 0:
+                terms.append(((qubit,), float(coefficient)))
+        for order in sorted(self.couplings):
+            terms.extend(sorted(self.couplings[order].items()))
+        return terms
+
+    def to_pauli_sum(self):
+        """
+        Exports the hamiltonian to pyquil's PauliSum.
+        """
+        from pyquil.paulis import PauliTerm, PauliSum
+        pauli_terms = []
+        for qubits, coefficient in self.terms():
+            if len(qubits) == 0:
+                pauli_terms.append(PauliTerm("I", 0, coefficient))
+            else:
+                pauli_terms.append(PauliTerm.from_list([("Z", qubit) for qubit in qubits], coefficient))
+        if len(pauli_terms) == 0:
+            pauli_terms.append(PauliTerm("I", 0, 0.0))
+        return PauliSum(pauli_terms)
+
+    def to_diagonal(self):
+        """
+        Calculates value of the hamiltonian for every basis state, see create_cost_diagonal.
+
+        Value for basis state x is the sum of c_S * (-1)**(number of qubits from S equal to 1 in x),
+        which is the Walsh-Hadamard transform of the vector of coefficients indexed by the sets of qubits S,
+        so it takes O(n * 2**n) operations regardless of the number of terms.
+
+        Returns:
+            diagonal (ndarray): Array of length 2**n, where n is the number of qubits.
+        """
+        coefficients = np.zeros(2**self.number_of_qubits)
+        for qubits, coefficient in self.terms():
+            coefficients[sum(2**qubit for qubit in qubits)] = coefficient
+        return walsh_hadamard_transform(coefficients)
+
+    def to_dict(self):
+        """
+        Returns JSON-serializable representation of the hamiltonian, see from_dict.
+        """
+        return {'number_of_qubits': self.number_of_qubits,
+                'constant': self.constant,
+                'h': self.h.tolist(),
+                'couplings': [[list(qubits), coefficient]
+                              for order in sorted(self.couplings)
+                              for qubits, coefficient in sorted(self.couplings[order].items())]}
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Creates hamiltonian from the representation returned by to_dict.
+        """
+        hamiltonian = cls(data['number_of_qubits'])
+        hamiltonian.constant = data['constant']
+        hamiltonian.h = np.array(data['h'], dtype=float)
+        for qubits, coefficient in data['couplings']:
+            hamiltonian.add_term(tuple(qubits), coefficient)
+        return hamiltonian
+
+
+def walsh_hadamard_transform(vector):
+    """
+    Calculates unnormalized Walsh-Hadamard transform of the vector.
+
+    Args:
+        vector (ndarray): Vector of length 2**n.
+
+    Returns:
+        transformed_vector (ndarray): Transformed copy of the vector.
+    """
+    return fast_walsh_hadamard_transform(np.array(vector, dtype=float))
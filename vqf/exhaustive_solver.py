@@ -0,0 +1,123 @@
+import numpy as np
+from sympy import sympify, default_sort_key
+
+from polynomial import Polynomial, symbol_to_id
+
+"""
+Classical solver for the problems which are small after the preprocessing.
+
+It evaluates all the clauses for every possible assignment of the unknowns at once,
+using NumPy arrays of bits, and returns the assignments for which the cost function
+(sum of squared clauses, the same as in QAOA) is the lowest - if the clauses can be satisfied,
+these are the assignments for which all of them are equal to 0.
+With 20 unknowns it takes a fraction of a second, so there is no point in running QAOA for such problems.
+It can also be used as a ground truth for the results of QAOA.
+"""
+
+
+def solve_exhaustively(clauses, p_dict, q_dict, z_dict=None, max_unknowns=24, block_size=2**16):
+    """
+    Finds all the assignments of the unknowns which minimize the sum of squared clauses.
+
+    Args:
+        clauses (list): See module documentation in preprocessing.py.
+        p_dict, q_dict, z_dict: See module documentation in preprocessing.py. z_dict is optional.
+        max_unknowns (int, optional): Maximum number of unknowns, problems with more unknowns
+            raise ValueError. Default: 24
+        block_size (int, optional): Number of assignments evaluated at once. Default: 2**16
+
+    Returns:
+        solutions (list): List of dictionaries mapping sympy Symbols to their values (0 or 1).
+        cost: Value of the cost function for the solutions. 0 if they satisfy all the clauses.
+    """
+    variables = get_unknowns(clauses, p_dict, q_dict, z_dict)
+    number_of_unknowns = len(variables)
+    if number_of_unknowns > max_unknowns:
+        raise ValueError("Too many unknowns for the exhaustive search: " + str(number_of_unknowns))
+
+    polynomials = [Polynomial.from_sympy(clause) for clause in clauses]
+    position = {symbol_to_id(variable): index for index, variable in enumerate(variables)}
+
+    best_assignments = []
+    best_cost = None
+    number_of_assignments = 2**number_of_unknowns
+    for start in range(0, number_of_assignments, block_size):
+        assignments = np.arange(start, min(start + block_size, number_of_assignments), dtype=np.int64)
+        bits = [((assignments >> index) & 1).astype(bool) for index in range(number_of_unknowns)]
+        cost = np.zeros(len(assignments), dtype=np.int64)
+        for polynomial in polynomials:
+            cost = cost + evaluate_polynomial(polynomial, bits, position, len(assignments))**2
+        block_best_cost = cost.min()
+        if best_cost is None or block_best_cost < best_cost:
+            best_cost = block_best_cost
+            best_assignments = []
+        if block_best_cost == best_cost:
+            best_assignments.extend(assignments[cost == best_cost].tolist())
+
+    solutions = [{variable: (assignment >> index) & 1 for index, variable in enumerate(variables)}
+                 for assignment in best_assignments]
+    return solutions, best_cost.item()
+
+
+def evaluate_polynomial(polynomial, bits, position, size):
+    """
+    Evaluates polynomial for many assignments at once.
+
+    Args:
+        polynomial (Polynomial): polynomial to evaluate.
+        bits (list): Boolean arrays with values of the variables.
+        position (dict): Maps variable ids to indices in bits.
+        size (int): Number of assignments.
+
+    Returns:
+        values (ndarray): Values of the polynomial.
+    """
+    if all(coefficient == int(coefficient) for coefficient in polynomial.terms.values()):
+        values = np.zeros(size, dtype=np.int64)
+        convert = int
+    else:
+        values = np.zeros(size, dtype=float)
+        convert = float
+    for monomial, coefficient in polynomial.terms.items():
+        coefficient = convert(coefficient)
+        if len(monomial) == 0:
+            values += coefficient
+            continue
+        product = bits[position[monomial[0]]]
+        for var_id in monomial[1:]:
+            product = product & bits[position[var_id]]
+        values[product] += coefficient
+    return values
+
+
+def get_unknowns(clauses, p_dict, q_dict, z_dict=None):
+    """
+    Returns sorted list of the variables which appear in the clauses or the dictionaries.
+    """
+    unknowns = set()
+    for expression in list(clauses) + list(p_dict.values()) + list(q_dict.values()):
+        unknowns |= sympify(expression).free_symbols
+    if z_dict is not None:
+        for expression in z_dict.values():
+            unknowns |= sympify(expression).free_symbols
+    return sorted(unknowns, key=default_sort_key)
+
+
+def decode_solutions(solutions, p_dict, q_dict):
+    """
+    Calculates values of p and q for every solution.
+
+    Args:
+        solutions (list): Solutions returned by solve_exhaustively.
+        p_dict, q_dict: See module documentation in preprocessing.py.
+
+    Returns:
+        factors (list): List of tuples (p, q), without duplicates.
+    """
+    factors = []
+    for solution in solutions:
+        p = sum(int(sympify(value).subs(solution)) * 2**key for key, value in p_dict.items())
+        q = sum(int(sympify(value).subs(solution)) * 2**key for key, value in q_dict.items())
+        if (p, q) not in factors:
+            factors.append((p, q))
+    return factors
@@ -1,22 +1,44 @@
 from preprocessing import create_clauses, calculate_number_of_unknowns
 from preprocessing import factor_56153, factor_291311
 from optimization import OptimizationEngine
+from exhaustive_solver import solve_exhaustively, decode_solutions
+from caching import DiskCache
 from sympy import Add, Mul, Symbol
+import os
 import pdb
 
+# Preprocessing results are stored between the runs, see DiskCache and create_clauses.
+PREPROCESSING_CACHE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.preprocessing_cache')
 
-def factor_number(m, true_p, true_q, use_true_values=False):
+
+def factor_number(m, true_p, true_q, use_true_values=False, exhaustive_search_threshold=None):
+    """
+    Factors given number using the VQF algorithm.
+
+    Exhaustive search is opt-in: if exhaustive_search_threshold is provided, problems which have
+    at most that many unknowns after the preprocessing are solved classically (see exhaustive_solver.py)
+    instead of using QAOA. If none of the solutions found this way gives m, QAOA is used anyway.
+    By default (None) QAOA is always used, as in the original demonstration.
+
+    Returns:
+        p, q (int): calculated factors.
+        squared_overlap (float): See calculate_squared_overlap. None if QAOA has not been used.
+    """
     apply_preprocessing = True
     preprocessing_verbose = False
     optimization_verbose = False
+    cache = DiskCache(PREPROCESSING_CACHE_DIRECTORY)
+    # TODO: Clauses for 56153 and 291311 are still hardcoded (see footnote 40 in the paper).
+    # With known lengths create_clauses leaves 38 and 24 unknowns for them, against 4 and 6 here,
+    # so these special cases can be removed only once the general rules reach these counts.
     if m == 56153:
         p_dict, q_dict, z_dict, clauses = factor_56153()
     elif m == 291311:
         p_dict, q_dict, z_dict, clauses = factor_291311()
     elif use_true_values:
-        p_dict, q_dict, z_dict, clauses = create_clauses(m, true_p, true_q, apply_preprocessing, preprocessing_verbose)
+        p_dict, q_dict, z_dict, clauses = create_clauses(m, true_p, true_q, apply_preprocessing, preprocessing_verbose, cache)
     else:
-        p_dict, q_dict, z_dict, clauses = create_clauses(m, None, None, apply_preprocessing, preprocessing_verbose)
+        p_dict, q_dict, z_dict, clauses = create_clauses(m, None, None, apply_preprocessing, preprocessing_verbose, cache)
 
     number_of_uknowns, number_of_carry_bits = calculate_number_of_unknowns(p_dict, q_dict, z_dict)
     print("Number of unknowns:", number_of_uknowns)
@@ -26,6 +48,15 @@ def factor_number(m, true_p, true_q, use_true_values=False):
             p, q = decode_solution(p_dict, q_dict)
             return p, q, None
 
+    if exhaustive_search_threshold is not None and number_of_uknowns <= exhaustive_search_threshold:
+        solutions, _ = solve_exhaustively(clauses, p_dict, q_dict, z_dict, max_unknowns=exhaustive_search_threshold)
+        factors = decode_solutions(solutions, p_dict, q_dict)
+        correct_factors = [(p, q) for p, q in factors if p * q == m]
+        if len(correct_factors) != 0:
+            p, q = correct_factors[0]
+            return p, q, None
+        print("Exhaustive search hasn't found factors of", m, "- using QAOA.")
+
     optimization_engine = OptimizationEngine(clauses, m, steps=1, grid_size=20, gate_noise=None, verbose=optimization_verbose, visualize=True)
     sampling_results, mapping = optimization_engine.perform_qaoa()
     most_frequent_bit_string = max(sampling_results, key=lambda x: sampling_results[x])
@@ -1,26 +1,17 @@
-import pyquil.api as api
-from pyquil.api._qvm import ForestConnection, QVM
-from pyquil.device import NxDevice
-from pyquil.api._quantum_computer import QuantumComputer   
-from pyquil.api._compiler import QVMCompiler
-from grove.pyqaoa.qaoa import QAOA
-from pyquil.paulis import PauliTerm, PauliSum
-from pyquil.gates import X, I
-# from grove.pyvqe.vqe import VQE
-from vqe import VQE
-
-import scipy.optimize
 import numpy as np
-import networkx as nx
 from functools import reduce
-from sympy import Add, Mul, Number
-from itertools import product
 import time
 
-from visualization import plot_energy_landscape, plot_variance_landscape, plot_optimization_trajectory
+from cost_hamiltonian import create_cost_diagonal, IsingHamiltonian
+from cost_circuits import create_cost_layer_program, create_diagonal_gate_program
+from statevector_simulator import StatevectorQAOA
 
 import pdb
 
+# pyquil, grove, scipy, networkx and matplotlib (through visualization) take several seconds to import,
+# so they are imported in the methods which use them. This way importing this module is cheap
+# for the code which never runs the simulation.
+
 
 class OptimizationEngine(object):
     """
@@ -38,32 +29,68 @@ class OptimizationEngine(object):
         gate_noise (float, optional): Specifies gate noise for qvm. Default: None.
         verbose (bool): Boolean flag, if True, information about the execution will be printed to the console. Default: False
         visualize (bool): Flag indicating if visualizations should be created. Default: False
+        cost_layer (str, optional): How the cost layer of QAOA is created:
+            'pauli' - Grove exponentiates every term of every clause separately,
+            'fused' - terms are merged and share CNOT ladders (see cost_circuits.py),
+            'defgate' - single diagonal gate, only for small number of qubits.
+            Default: 'pauli'
+        backend (str, optional): 'qvm' - programs are run on pyquil's QVM,
+            'numpy' - QAOA is simulated locally with StatevectorQAOA (see statevector_simulator.py),
+            without qvm and quilc servers. Gate noise and cost_layer are not supported by 'numpy'.
+            Default: 'qvm'
 
     Attributes:
         clauses (list): See Args.
         grid_size (int): See Args.
         mapping (dict): Maps variables into qubit indices.
-        qaoa_inst (object): Instance of QAOA class from Grove.
+        qaoa_inst (object): Instance of QAOA class from Grove or StatevectorQAOA.
         samples (int): If noise model is active, specifies how many samples we should take for any given quantum program.
         ax (object): Matplotlib `axis` object, used for plotting optimization trajectory.
 
     """
-    def __init__(self, clauses, m=None, steps=1, grid_size=None, tol=1e-5, gate_noise=None, verbose=False, visualize=False):
+    def __init__(self, clauses, m=None, steps=1, grid_size=None, tol=1e-5, gate_noise=None, verbose=False, visualize=False,
+                 cost_layer='pauli', backend='qvm'):
         self.clauses = clauses
         self.m = m
         self.verbose = verbose
         self.visualize = visualize
         self.gate_noise = gate_noise
+        if cost_layer not in ['pauli', 'fused', 'defgate']:
+            raise ValueError("Unknown cost layer: " + str(cost_layer))
+        self.cost_layer = cost_layer
+        if backend not in ['qvm', 'numpy']:
+            raise ValueError("Unknown backend: " + str(backend))
+        if backend == 'numpy' and (gate_noise or cost_layer != 'pauli'):
+            raise ValueError("Gate noise and cost_layer are not supported by the numpy backend.")
+        self.backend = backend
         if grid_size is None:
             self.grid_size = len(clauses) + len(qubits)
         else:
             self.grid_size = grid_size
 
+        minimizer_kwargs = {'method': 'BFGS',
+                                'options': {'gtol': tol, 'disp': False}}
+        self.ax = None
+        self._cost_hamiltonian = None
+        self._parameterized_program = None
+        self._programs_by_steps = {}
+        if self.backend == 'numpy':
+            self.mapping = self.create_mapping()
+            self.samples = None
+            self.qaoa_inst = StatevectorQAOA(self.create_cost_diagonal(), steps=steps, minimizer_kwargs=minimizer_kwargs)
+            return
+
+        from pyquil.api._qvm import ForestConnection, QVM
+        from pyquil.device import NxDevice
+        from pyquil.api._quantum_computer import QuantumComputer
+        from pyquil.api._compiler import QVMCompiler
+        from grove.pyqaoa.qaoa import QAOA
+        import scipy.optimize
+        import networkx as nx
+
         cost_operators, mapping = self.create_operators_from_clauses()
         self.mapping = mapping
         mixing_operators = self.create_mixing_operators()
-        minimizer_kwargs = {'method': 'BFGS',
-                                'options': {'gtol': tol, 'disp': False}}
         if self.verbose:
             print_fun = print
         else:
@@ -104,8 +131,10 @@ class OptimizationEngine(object):
                           rand_seed=None,
                           vqe_options=vqe_option, 
                           store_basis=True)
-
-        self.ax = None
+        if self.cost_layer != 'pauli':
+            # The cost hamiltonian (or its diagonal) is built here once, not for every evaluation.
+            self.get_parameterized_program()
+            self.qaoa_inst.get_parameterized_program = self.get_parameterized_program
 
     def create_operators_from_clauses(self):
         """
@@ -113,6 +142,25 @@ class OptimizationEngine(object):
         For details see section IIC from the article.
         """
         operators = []
+        mapping = self.create_mapping()
+
+        # Squares are calculated on IsingHamiltonian coefficients, not on PauliSum objects,
+        # so pyquil gets operators without duplicated terms.
+        for clause in self.clauses:
+            if clause == 0:
+                continue
+            squared_clause_operator = IsingHamiltonian.from_clauses([clause], mapping).to_pauli_sum()
+            if self.verbose:
+                print("C:", clause)
+                print("C**2:", squared_clause_operator)
+            operators.append(squared_clause_operator)
+
+        return operators, mapping
+
+    def create_mapping(self):
+        """
+        Assigns qubits to the variables, in the order in which they appear in the clauses.
+        """
         mapping = {}
         variable_counter = 0
         for clause in self.clauses:
@@ -123,54 +171,62 @@ class OptimizationEngine(object):
                 if str(variable) not in mapping.keys():
                     mapping[str(variable)] = variable_counter
                     variable_counter += 1
-            pauli_terms = []
-            quadratic_pauli_terms = []
-            if type(clause) == Add:
-                clause_terms = clause.args
-            elif type(clause) == Mul:
-                clause_terms = [clause]
-            for single_term in clause_terms:
-                if len(single_term.free_symbols) == 0:
-                    pauli_terms.append(PauliTerm("I", 0, int(single_term)))
-                elif len(single_term.free_symbols) == 1:
-                    multiplier = 1
-                    if type(single_term) == Mul:
-                        multiplier = int(single_term.args[0])
-                    symbol = list(single_term.free_symbols)[0]
-                    symbol_id = mapping[str(symbol)]
-                    pauli_terms.append(PauliTerm("I", symbol_id, 1/2*multiplier))
-                    pauli_terms.append(PauliTerm("Z", symbol_id, -1/2*multiplier))
-                elif len(single_term.free_symbols) == 2 and type(single_term) == Mul:
-                    multiplier = 1
-                    if isinstance(single_term.args[0], Number):
-                        multiplier = int(single_term.args[0])
-                    symbol_1 = list(single_term.free_symbols)[0]
-                    symbol_2 = list(single_term.free_symbols)[1]
-                    symbol_id_1 = mapping[str(symbol_1)]
-                    symbol_id_2 = mapping[str(symbol_2)]
-                    pauli_term_1 = PauliTerm("I", symbol_id_1, 1/2*multiplier) - PauliTerm("Z", symbol_id_1, 1/2*multiplier)
-                    pauli_term_2 = PauliTerm("I", symbol_id_2, 1/2) - PauliTerm("Z", symbol_id_2, 1/2)
-                    quadratic_pauli_terms.append(pauli_term_1 * pauli_term_2)
-                else:
-                    Exception("Terms of orders higher than quadratic are not handled.")
-
-            clause_operator = PauliSum(pauli_terms)
-            for quadratic_term in quadratic_pauli_terms:
-                clause_operator += quadratic_term
-            
-            squared_clause_operator = clause_operator**2
-            if self.verbose:
-                print("C:", clause_operator)
-                print("C**2:", squared_clause_operator)
-            operators.append(squared_clause_operator)
+        return mapping
+
+    def create_cost_diagonal(self):
+        """
+        Calculates values of the cost hamiltonian for all the basis states,
+        without creating pyquil operators. See create_cost_diagonal in cost_hamiltonian.py.
+        """
+        return create_cost_diagonal(self.clauses, self.mapping)
 
+    def create_ising_hamiltonian(self):
+        """
+        Creates cost hamiltonian (sum of all the squared clauses) as IsingHamiltonian.
+        """
+        return IsingHamiltonian.from_clauses(self.clauses, self.mapping)
 
-        return operators, mapping
+    def get_parameterized_program(self):
+        """
+        Replacement of get_parameterized_program from Grove's QAOA, which uses
+        the cost layer chosen with the cost_layer argument.
+        The program function is created once and reused by the later calls.
+
+        Returns:
+            program (function): Function which takes array of betas and gammas
+                and returns pyquil Program.
+        """
+        if self._parameterized_program is not None:
+            return self._parameterized_program
+        from pyquil import Program
+        from pyquil.gates import H, RX
+        qubits = self.qaoa_inst.qubits
+        if self.cost_layer == 'defgate':
+            diagonal = self.create_cost_diagonal()
+            create_cost_layer = lambda gamma: create_diagonal_gate_program(diagonal, gamma)
+        else:
+            hamiltonian = self.create_ising_hamiltonian()
+            create_cost_layer = lambda gamma: create_cost_layer_program(hamiltonian, gamma)
+
+        def program(params):
+            steps = self.qaoa_inst.steps
+            betas = params[:steps]
+            gammas = params[steps:]
+            parameterized_program = Program([H(qubit) for qubit in qubits])
+            for beta, gamma in zip(betas, gammas):
+                parameterized_program += create_cost_layer(gamma)
+                # Mixing operators are -X_i, see create_mixing_operators.
+                parameterized_program += Program([RX(-2 * beta, qubit) for qubit in qubits])
+            return parameterized_program
+
+        self._parameterized_program = program
+        return program
 
     def create_mixing_operators(self):
         """
         Creates mixing hamiltonian. (eq. 10)
         """
+        from pyquil.paulis import PauliTerm, PauliSum
 
         mixing_operators = []
         
@@ -207,19 +263,24 @@ class OptimizationEngine(object):
 
         """
         stacked_params = np.hstack((self.qaoa_inst.betas, self.qaoa_inst.gammas))
-        vqe = VQE(self.qaoa_inst.minimizer, minimizer_args=self.qaoa_inst.minimizer_args,
-                  minimizer_kwargs=self.qaoa_inst.minimizer_kwargs)
-        cost_ham = reduce(lambda x, y: x + y, self.qaoa_inst.cost_ham)
-        # maximizing the cost function!
-        param_prog = self.qaoa_inst.get_parameterized_program()
-        result = vqe.vqe_run(param_prog, cost_ham, stacked_params, qc=self.qaoa_inst.qc,
-                             **self.qaoa_inst.vqe_options)
+        if self.backend == 'numpy':
+            result = self.qaoa_inst.minimize(stacked_params)
+        else:
+            from vqe import VQE
+            vqe = VQE(self.qaoa_inst.minimizer, minimizer_args=self.qaoa_inst.minimizer_args,
+                      minimizer_kwargs=self.qaoa_inst.minimizer_kwargs)
+            cost_ham = reduce(lambda x, y: x + y, self.qaoa_inst.cost_ham)
+            # maximizing the cost function!
+            param_prog = self.qaoa_inst.get_parameterized_program()
+            result = vqe.vqe_run(param_prog, cost_ham, stacked_params, qc=self.qaoa_inst.qc,
+                                 **self.qaoa_inst.vqe_options)
         best_betas = result.x[:self.qaoa_inst.steps]
         best_gammas = result.x[self.qaoa_inst.steps:]
         optimization_trajectory = result.iteration_params
         energy_history = result.expectation_vals
 
         if self.ax is not None and self.visualize and self.qaoa_inst.steps==1:
+            from visualization import plot_optimization_trajectory
             plot_optimization_trajectory(self.ax, optimization_trajectory)
         return best_betas, best_gammas
 
@@ -233,6 +294,7 @@ class OptimizationEngine(object):
             best_betas, best_gammas (np.arrays): best values of the betas and gammas found. 
 
         """
+        from visualization import plot_energy_landscape, plot_variance_landscape
         best_betas = None
         best_gammas = None
         best_energy = np.inf
@@ -254,9 +316,6 @@ class OptimizationEngine(object):
         all_gammas = all_gammas[:, column_order]
 
 
-        vqe = VQE(self.qaoa_inst.minimizer, minimizer_args=self.qaoa_inst.minimizer_args,
-                      minimizer_kwargs=self.qaoa_inst.minimizer_kwargs)
-        cost_hamiltonian = reduce(lambda x, y: x + y, self.qaoa_inst.cost_ham)
         all_energies = []
         data_to_save = []
         if save_data:
@@ -264,8 +323,7 @@ class OptimizationEngine(object):
         for betas in all_betas:
             for gammas in all_gammas:
                 stacked_params = np.hstack((betas, gammas))
-                program = self.qaoa_inst.get_parameterized_program()
-                energy = vqe.expectation(program(stacked_params), cost_hamiltonian, self.samples, self.qaoa_inst.qc)
+                energy = self.calculate_energy(stacked_params)
                 all_energies.append(energy)
                 if self.verbose:
                     print(betas, gammas, energy, end="\r")
@@ -289,6 +347,31 @@ class OptimizationEngine(object):
 
         return best_betas, best_gammas
 
+    def calculate_energy(self, stacked_params):
+        """
+        Calculates expectation value of the cost hamiltonian for given angles.
+
+        Args:
+            stacked_params (ndarray): Stacked betas and gammas.
+
+        Returns:
+            energy (float): Expectation value.
+        """
+        if self.backend == 'numpy':
+            return self.qaoa_inst.expectation(stacked_params)
+        from vqe import VQE
+        vqe = VQE(self.qaoa_inst.minimizer, minimizer_args=self.qaoa_inst.minimizer_args,
+                  minimizer_kwargs=self.qaoa_inst.minimizer_kwargs)
+        if self._cost_hamiltonian is None:
+            self._cost_hamiltonian = reduce(lambda x, y: x + y, self.qaoa_inst.cost_ham)
+        # Grove's program is fixed to the number of steps at the time of its creation,
+        # so one program is kept for every number of steps used by the grid search.
+        steps = self.qaoa_inst.steps
+        if steps not in self._programs_by_steps:
+            self._programs_by_steps[steps] = self.qaoa_inst.get_parameterized_program()
+        program = self._programs_by_steps[steps]
+        return vqe.expectation(program(stacked_params), self._cost_hamiltonian, self.samples, self.qaoa_inst.qc)
+
     def step_by_step_grid_search_angles(self):
         """
         Finds optimal angles for QAOA by performing "step-by-step" grid search.
@@ -338,16 +421,12 @@ class OptimizationEngine(object):
         beta_range = np.linspace(0, np.pi, self.grid_size)
         gamma_range = np.linspace(0, 2*np.pi, self.grid_size)
 
-        vqe = VQE(self.qaoa_inst.minimizer, minimizer_args=self.qaoa_inst.minimizer_args,
-                      minimizer_kwargs=self.qaoa_inst.minimizer_kwargs)
-        cost_hamiltonian = reduce(lambda x, y: x + y, self.qaoa_inst.cost_ham)
         for beta in beta_range:
             for gamma in gamma_range:
                 betas = np.append(fixed_betas, beta)
                 gammas = np.append(fixed_gammas, gamma)
                 stacked_params = np.hstack((betas, gammas))
-                program = self.qaoa_inst.get_parameterized_program()
-                energy = vqe.expectation(program(stacked_params), cost_hamiltonian, self.samples, self.qaoa_inst.qc)
+                energy = self.calculate_energy(stacked_params)
                 print(beta, gamma, end="\r")
                 if energy < best_energy:
                     best_energy = energy
@@ -0,0 +1,425 @@
+from fractions import Fraction
+from math import gcd
+import random
+from sympy import Symbol, Add, Mul, Pow, Number, Integer, Rational
+from sympy import sympify, default_sort_key
+
+"""
+Native representation of the clauses used in the preprocessing part of the VQF algorithm.
+
+All the variables in VQF (p_i, q_i and z_i_j) are binary, so every clause is a
+multilinear polynomial with integer coefficients. Sympy doesn't know about it,
+so it keeps x**2 terms around and spends most of its time in subs() and expand().
+The Polynomial class stores such clauses directly and has idempotence (x**2 = x)
+built into the multiplication.
+
+** Notation **
+variable id
+Integer identifying a variable. Each sympy Symbol gets its own id the first time
+it is converted (see symbol_to_id).
+
+monomial
+Sorted tuple of variable ids, e.g. (0, 3) represents p_0*q_1 if p_0 has id 0 and q_1 has id 3.
+Empty tuple represents the constant term.
+
+terms
+Dictionary, where keys are monomials and values are their (non-zero) coefficients.
+"""
+
+
+_symbol_ids = {}
+_id_symbols = []
+
+
+def symbol_to_id(symbol):
+    """
+    Returns integer id of the given sympy Symbol, registering it if needed.
+
+    Args:
+        symbol: sympy Symbol.
+
+    Returns:
+        var_id (int): See module documentation at the top.
+    """
+    var_id = _symbol_ids.get(symbol)
+    if var_id is None:
+        # The symbol is added to _symbol_ids last, so if this is interrupted (e.g. by the timeout
+        # in batch.py), _symbol_ids never points at a missing entry and the symbol is registered again later.
+        var_id = len(_id_symbols)
+        _id_symbols.append(symbol)
+        _symbol_ids[symbol] = var_id
+    return var_id
+
+
+def id_to_symbol(var_id):
+    """
+    Returns sympy Symbol corresponding to the given variable id.
+
+    Args:
+        var_id (int): See module documentation at the top.
+
+    Returns:
+        symbol: sympy Symbol.
+    """
+    return _id_symbols[var_id]
+
+
+class Polynomial(object):
+    """
+    Multilinear polynomial over binary variables with integer coefficients.
+
+    Polynomials are treated as immutable - all the operations return new objects.
+    Coefficients are python integers, unless a division produced a fraction.
+
+    Args:
+        terms (dict, optional): See module documentation at the top. Default: None
+
+    Attributes:
+        terms (dict): See Args.
+
+    """
+    __slots__ = ['terms']
+
+    def __init__(self, terms=None):
+        if terms is None:
+            terms = {}
+        self.terms = {monomial: coefficient for monomial, coefficient in terms.items() if coefficient != 0}
+
+    @classmethod
+    def constant(cls, value):
+        return cls({(): value})
+
+    @classmethod
+    def variable(cls, var_id):
+        return cls({(var_id,): 1})
+
+    @classmethod
+    def from_sympy(cls, expression):
+        """
+        Creates polynomial from a sympy expression (or a number).
+
+        Powers with positive integer exponents are reduced using x**n = x.
+
+        Args:
+            expression: sympy expression, integer or sympy number.
+
+        Returns:
+            polynomial (Polynomial)
+
+        Raises:
+            ValueError: if the expression is not a polynomial with rational coefficients.
+        """
+        if isinstance(expression, (int, Fraction)):
+            return cls.constant(expression)
+        expression = sympify(expression)
+        if isinstance(expression, Number):
+            return cls.constant(_number_to_python(expression))
+        if expression.func == Symbol:
+            return cls.variable(symbol_to_id(expression))
+        if expression.func == Add:
+            terms = {}
+            for arg in expression.args:
+                for monomial, coefficient in cls.from_sympy(arg).terms.items():
+                    terms[monomial] = terms.get(monomial, 0) + coefficient
+            return cls(terms)
+        if expression.func == Mul:
+            result = cls.constant(1)
+            for arg in expression.args:
+                result = result * cls.from_sympy(arg)
+            return result
+        if expression.func == Pow:
+            exponent = expression.args[1]
+            if exponent.is_Integer and exponent > 0:
+                base = cls.from_sympy(expression.args[0])
+                result = base
+                for _ in range(int(exponent) - 1):
+                    result = result * base
+                return result
+        raise ValueError("Expression " + str(expression) + " is not a multilinear polynomial.")
+
+    def to_sympy(self):
+        """
+        Converts polynomial to a sympy expression.
+
+        Returns:
+            expression: sympy expression.
+        """
+        sympy_terms = []
+        for monomial, coefficient in self.terms.items():
+            factors = [id_to_symbol(var_id) for var_id in monomial]
+            sympy_terms.append(Mul(_python_to_number(coefficient), *factors))
+        if len(sympy_terms) == 0:
+            return Integer(0)
+        return Add(*sympy_terms)
+
+    def __repr__(self):
+        return "Polynomial(" + str(self.to_sympy()) + ")"
+
+    def __eq__(self, other):
+        if not isinstance(other, Polynomial):
+            if isinstance(other, (int, Fraction)):
+                other = Polynomial.constant(other)
+            else:
+                return NotImplemented
+        return self.terms == other.terms
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __hash__(self):
+        return hash(frozenset(self.terms.items()))
+
+    def __add__(self, other):
+        other = _to_polynomial(other)
+        terms = dict(self.terms)
+        for monomial, coefficient in other.terms.items():
+            terms[monomial] = terms.get(monomial, 0) + coefficient
+        return Polynomial(terms)
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return Polynomial({monomial: -coefficient for monomial, coefficient in self.terms.items()})
+
+    def __sub__(self, other):
+        return self + (-_to_polynomial(other))
+
+    def __rsub__(self, other):
+        return _to_polynomial(other) + (-self)
+
+    def __mul__(self, other):
+        if isinstance(other, (int, Fraction)):
+            return Polynomial({monomial: coefficient * other for monomial, coefficient in self.terms.items()})
+        other = _to_polynomial(other)
+        terms = {}
+        for monomial_1, coefficient_1 in self.terms.items():
+            for monomial_2, coefficient_2 in other.terms.items():
+                monomial = multiply_monomials(monomial_1, monomial_2)
+                terms[monomial] = terms.get(monomial, 0) + coefficient_1 * coefficient_2
+        return Polynomial(terms)
+
+    __rmul__ = __mul__
+
+    def __bool__(self):
+        return len(self.terms) != 0
+
+    def is_constant(self):
+        return all(len(monomial) == 0 for monomial in self.terms)
+
+    def constant_term(self):
+        return self.terms.get((), 0)
+
+    def variables(self):
+        """
+        Returns set of ids of all the variables present in the polynomial.
+        """
+        variables = set()
+        for monomial in self.terms:
+            variables.update(monomial)
+        return variables
+
+    def degree(self):
+        if len(self.terms) == 0:
+            return 0
+        return max(len(monomial) for monomial in self.terms)
+
+    def content(self):
+        """
+        Returns greatest common divisor of the coefficients (0 for zero polynomial).
+
+        Raises:
+            ValueError: if any of the coefficients is not an integer.
+        """
+        result = 0
+        for coefficient in self.terms.values():
+            if not isinstance(coefficient, int):
+                raise ValueError("Content is defined only for integer coefficients.")
+            result = gcd(result, coefficient)
+        return result
+
+    def leading_coefficient(self):
+        """
+        Returns coefficient of the leading term in lexicographic order.
+
+        Variables are ordered by default_sort_key of their symbols, i.e. by name,
+        so e.g. p_10 goes before p_2 and p_2 goes before q_1.
+        """
+        if len(self.terms) == 0:
+            return 0
+        ordered_symbols = sorted([id_to_symbol(var_id) for var_id in self.variables()], key=default_sort_key)
+        ordered_variables = [symbol_to_id(symbol) for symbol in ordered_symbols]
+        def exponents(monomial):
+            return tuple(var_id in monomial for var_id in ordered_variables)
+        leading_monomial = max(self.terms, key=exponents)
+        return self.terms[leading_monomial]
+
+    def is_reducible(self):
+        """
+        Checks if polynomial is a product of at least two non-constant polynomials.
+
+        Factors of a multilinear polynomial don't share variables.
+        Variables u and v belong to different factors if and only if P * P_uv = P_u * P_v,
+        where P_x denotes derivative with respect to x. This identity is checked by
+        evaluating both sides at random points modulo a large prime.
+        Polynomial is reducible if the variables form more than one group this way.
+        """
+        if len(self.terms) < 2:
+            return False
+        variables = sorted(self.variables())
+        if len(variables) < 2:
+            return False
+        common_variables = set(variables)
+        for monomial in self.terms:
+            common_variables.intersection_update(monomial)
+        if len(common_variables) != 0:
+            return True
+
+        prime = 2**61 - 1
+        generator = random.Random(len(self.terms))
+        points = [{var_id: generator.randrange(1, prime) for var_id in variables} for _ in range(2)]
+        groups = {var_id: var_id for var_id in variables}
+
+        def find(var_id):
+            while groups[var_id] != var_id:
+                groups[var_id] = groups[groups[var_id]]
+                var_id = groups[var_id]
+            return var_id
+
+        for index, u in enumerate(variables):
+            for v in variables[index+1:]:
+                if find(u) == find(v):
+                    continue
+                for point in points:
+                    values = {(): 0, (u,): 0, (v,): 0, (u, v): 0}
+                    for monomial, coefficient in self.terms.items():
+                        value = coefficient
+                        for var_id in monomial:
+                            if var_id != u and var_id != v:
+                                value = value * point[var_id] % prime
+                        has_u = u in monomial
+                        has_v = v in monomial
+                        if has_u and has_v:
+                            values[(u, v)] += value
+                        if has_u:
+                            values[(u,)] += value * (point[v] if has_v else 1)
+                        if has_v:
+                            values[(v,)] += value * (point[u] if has_u else 1)
+                        values[()] += value * (point[u] if has_u else 1) * (point[v] if has_v else 1)
+                    left_side = values[()] * values[(u, v)] % prime
+                    right_side = values[(u,)] * values[(v,)] % prime
+                    if left_side != right_side:
+                        groups[find(u)] = find(v)
+                        break
+
+        return len(set(find(var_id) for var_id in variables)) > 1
+
+    def divide(self, value):
+        """
+        Divides all the coefficients by value, keeping them integer if possible.
+        """
+        terms = {}
+        for monomial, coefficient in self.terms.items():
+            if isinstance(coefficient, int) and isinstance(value, int) and coefficient % value == 0:
+                terms[monomial] = coefficient // value
+            else:
+                terms[monomial] = Fraction(coefficient, value)
+        return Polynomial(terms)
+
+    def substitute(self, monomial, value, coefficient=1):
+        """
+        Substitutes coefficient*monomial with value, the same way sympy's subs does it.
+
+        Each term which contains all the variables from monomial is replaced.
+        For coefficient equal to 1 this happens regardless of term's coefficient.
+        For negative coefficient (e.g. -q) only terms with negative coefficients are matched.
+
+        Args:
+            monomial (tuple): See module documentation at the top.
+            value (Polynomial): Value which should be substituted.
+            coefficient (int, optional): Coefficient of the substituted expression. Default: 1
+
+        Returns:
+            polynomial (Polynomial)
+        """
+        monomial_set = set(monomial)
+        terms = {}
+        for term_monomial, term_coefficient in self.terms.items():
+            matches = monomial_set.issubset(term_monomial)
+            if matches and coefficient != 1:
+                matches = (term_coefficient * coefficient) > 0
+            if not matches:
+                terms[term_monomial] = terms.get(term_monomial, 0) + term_coefficient
+                continue
+            ratio = term_coefficient
+            if coefficient != 1:
+                ratio = Fraction(term_coefficient) / coefficient
+                if ratio.denominator == 1:
+                    ratio = ratio.numerator
+            rest = tuple(var_id for var_id in term_monomial if var_id not in monomial_set)
+            for value_monomial, value_coefficient in value.terms.items():
+                new_monomial = multiply_monomials(rest, value_monomial)
+                terms[new_monomial] = terms.get(new_monomial, 0) + ratio * value_coefficient
+        return Polynomial(terms)
+
+    def subs(self, known_values):
+        """
+        Simultaneously substitutes variables with given values.
+
+        Args:
+            known_values (dict): Keys are variable ids, values are Polynomials or integers.
+
+        Returns:
+            polynomial (Polynomial)
+        """
+        result = Polynomial()
+        for monomial, coefficient in self.terms.items():
+            product = Polynomial.constant(coefficient)
+            for var_id in monomial:
+                if var_id in known_values:
+                    product = product * _to_polynomial(known_values[var_id])
+                else:
+                    product = product * Polynomial.variable(var_id)
+            result = result + product
+        return result
+
+
+def multiply_monomials(monomial_1, monomial_2):
+    """
+    Multiplies two monomials using x*x = x.
+
+    Args:
+        monomial_1, monomial_2 (tuple): See module documentation at the top.
+
+    Returns:
+        monomial (tuple): See module documentation at the top.
+    """
+    if len(monomial_1) == 0:
+        return monomial_2
+    if len(monomial_2) == 0:
+        return monomial_1
+    return tuple(sorted(set(monomial_1).union(monomial_2)))
+
+
+def _to_polynomial(value):
+    if isinstance(value, Polynomial):
+        return value
+    if isinstance(value, (int, Fraction)):
+        return Polynomial.constant(value)
+    return Polynomial.from_sympy(value)
+
+
+def _number_to_python(number):
+    if number.is_Integer:
+        return int(number)
+    if number.is_Rational:
+        return Fraction(int(number.p), int(number.q))
+    raise ValueError("Coefficient " + str(number) + " is not rational.")
+
+
+def _python_to_number(value):
+    if isinstance(value, Fraction):
+        return Rational(value.numerator, value.denominator)
+    return Integer(value)
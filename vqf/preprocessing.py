@@ -1,7 +1,16 @@
-import numpy as np
-from sympy import Symbol, Add, Mul, Pow, Number
-from sympy import factor, srepr, sympify
-import pdb
+import hashlib
+import math
+import os
+import time
+from sympy import Symbol, Add, Mul, Pow, Number, Integer
+from sympy import factor, sympify, default_sort_key, preorder_traversal
+from functools import lru_cache
+from collections import deque, namedtuple
+from polynomial import Polynomial
+from caching import LRUCache
+from union_find import ParityUnionFind
+from variables import get_variable_symbol, get_variable_info
+from profiling import PreprocessingProfiler
 
 """
 This is script for preprocessing part of the VQF algorithm.
@@ -40,7 +49,31 @@ Values are either sympy expressions or integers (0 or 1).
 """
 
 
-def create_clauses(m_int, true_p_int=None, true_q_int=None, apply_preprocessing=True, verbose=True):
+# Results of simplify_clause, see get_simplification_cache_statistics and set_simplification_cache_size.
+simplification_cache = LRUCache(max_size=100000)
+
+# Statistics of the preprocessing steps, see enable_profiling.
+preprocessing_profiler = PreprocessingProfiler()
+
+# Shape of a clause, used to decide which preprocessing rules might apply to it.
+# number_of_terms - number of terms, including the constant one.
+# constant - value of the constant term.
+# terms - sorted tuple of (degree, coefficient) pairs of the non-constant terms.
+ClauseShape = namedtuple('ClauseShape', ['number_of_terms', 'constant', 'terms'])
+
+# Preprocessing rule registered with the preprocessing_rule decorator.
+# order - rules are applied to a clause in ascending order.
+# function - function with signature (clause, known_expressions, verbose) -> known_expressions.
+# condition - function which takes ClauseShape and returns False if the rule can't be applied to such a clause.
+PreprocessingRule = namedtuple('PreprocessingRule', ['order', 'function', 'condition'])
+
+PREPROCESSING_RULES = []
+
+# Source files which define the outcome of preprocessing, see get_rule_set_version.
+RULE_SET_FILES = ['preprocessing.py', 'polynomial.py', 'union_find.py', 'variables.py']
+
+
+def create_clauses(m_int, true_p_int=None, true_q_int=None, apply_preprocessing=True, verbose=True, cache=None):
     """
     Creates clauses for the VQF algorithm.
 
@@ -49,6 +82,7 @@ def create_clauses(m_int, true_p_int=None, true_q_int=None, apply_preprocessing=
     It returns dictionaries, which represent p, q and carry bits, and a list of clauses. 
     For p and q keys represent the bit index, for carry bits, between which bits carrying occurs.
     Clauses are sympy expressions which represent the optimization problem.
+    If p and q have the same length, preprocessing assumes that p >= q (see create_symmetry_breaking_clause).
 
     Args:
         m_int (int): number to be factored, as an integer.
@@ -56,12 +90,66 @@ def create_clauses(m_int, true_p_int=None, true_q_int=None, apply_preprocessing=
         true_p_int (int, optional): q - second factor, as an integer. Default: None.
         apply_preprocessing (bool, optional): If True, the preprocessing will be applied. Default: True
         verbose (bool, optional): See module documentation at the top.
+        cache (DiskCache, optional): If provided, results are read from and stored in this cache.
+            See get_create_clauses_cache_key. Default: None
 
     Returns:
         p_dict, q_dict, z_dict: See module documentation at the top.
         final_clauses (list): See 'clauses' in module documentation at the top.
     """
+    if cache is None:
+        return _create_clauses(m_int, true_p_int, true_q_int, apply_preprocessing, verbose)
+
+    key = get_create_clauses_cache_key(m_int, true_p_int, true_q_int, apply_preprocessing)
+    result = cache.get(key)
+    if result is None:
+        result = _create_clauses(m_int, true_p_int, true_q_int, apply_preprocessing, verbose)
+        cache.put(key, result)
+    elif verbose:
+        print("Final clauses (from cache):")
+        for clause in result[3]:
+            print(clause)
+    return result
+
+
+def get_create_clauses_cache_key(m_int, true_p_int=None, true_q_int=None, apply_preprocessing=True):
+    """
+    Creates key under which results of create_clauses are cached.
+
+    Results depend only on the lengths of p and q, not on their values,
+    so the key contains the lengths (None if unknown).
+    It also contains the rule set version, so the cached results are not used after the rules change.
+
+    Returns:
+        key (tuple): (m_int, p length, q length, apply_preprocessing, rule set version).
+    """
+    p_length = None if true_p_int is None else len(bin(true_p_int)) - 2
+    q_length = None if true_q_int is None else len(bin(true_q_int)) - 2
+    return (int(m_int), p_length, q_length, bool(apply_preprocessing), get_rule_set_version())
+
+
+@lru_cache(maxsize=None)
+def get_rule_set_version():
+    """
+    Returns version of the preprocessing rules.
+
+    It's a hash of the source files defining the preprocessing (see RULE_SET_FILES)
+    and the list of registered rules, so it changes whenever the rules change.
+
+    Returns:
+        version (str): hexadecimal hash.
+    """
+    digest = hashlib.sha1()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for file_name in RULE_SET_FILES:
+        with open(os.path.join(directory, file_name), 'rb') as source_file:
+            digest.update(source_file.read())
+    for rule in PREPROCESSING_RULES:
+        digest.update((str(rule.order) + rule.function.__module__ + rule.function.__qualname__).encode())
+    return digest.hexdigest()[:16]
+
 
+def _create_clauses(m_int, true_p_int, true_q_int, apply_preprocessing, verbose):
     m_dict, p_dict, q_dict, z_dict = create_initial_dicts(m_int, true_p_int, true_q_int)
     if apply_preprocessing:
         q_dict[0] = 1
@@ -70,12 +158,33 @@ def create_clauses(m_int, true_p_int=None, true_q_int=None, apply_preprocessing=
             q_dict[1] = 1
     clauses = create_basic_clauses(m_dict, p_dict, q_dict, z_dict, apply_preprocessing)
 
-
     if apply_preprocessing:
-        simplified_clauses, known_expressions = simplify_clauses(clauses, verbose)
-        p_dict, q_dict, z_dict = update_dictionaries(known_expressions, p_dict, q_dict, z_dict)
-    
-    known_symbols = create_known_symbols_dict(p_dict, q_dict, z_dict)
+        # Symmetry between p and q is broken one bit at a time - each new clause
+        # might allow to derive more bits, which in turn allows to add another clause.
+        symmetry_clauses = {}
+        variable_values = VariableValues(p_dict, q_dict, z_dict)
+        while True:
+            simplified_clauses, known_expressions = simplify_clauses(clauses, verbose)
+            variable_values.update(known_expressions)
+            z_dict = dict(zip(variable_values.z_keys, variable_values.z_values))
+            carry_clauses = create_carry_bound_clauses(m_dict, variable_values.p_values, variable_values.q_values, z_dict)
+            carry_clauses = [clause for clause in carry_clauses if clause not in clauses]
+            if len(carry_clauses) != 0:
+                if verbose:
+                    print("Carry bits determined by column bounds:", carry_clauses)
+                clauses = clauses + carry_clauses
+                continue
+            bit_index, symmetry_clause = create_symmetry_breaking_clause(variable_values.p_values, variable_values.q_values)
+            if bit_index is None or bit_index in symmetry_clauses:
+                break
+            if verbose:
+                print("Breaking symmetry between p and q with clause:", symmetry_clause)
+            symmetry_clauses[bit_index] = symmetry_clause
+            clauses = clauses + [symmetry_clause]
+        p_dict, q_dict, z_dict = variable_values.to_dicts()
+        known_symbols = variable_values.known_symbols()
+    else:
+        known_symbols = {}
 
     final_clauses = []
     for clause in clauses:
@@ -83,21 +192,9 @@ def create_clauses(m_int, true_p_int=None, true_q_int=None, apply_preprocessing=
 
     z_dict = {key:value for key, value in z_dict.items() if value != 0}
 
-    # TODO: In principle this should be recurrent / in while loop.
-    if apply_preprocessing and final_clauses[0] == 0 and len(set(final_clauses)) == 1:
-        number_of_unknowns, _ = calculate_number_of_unknowns(p_dict, q_dict, z_dict)
-        if number_of_unknowns != 0:
-            p_dict, q_dict = simplify_symmetric_case(p_dict, q_dict)
-            number_of_unknowns, _ = calculate_number_of_unknowns(p_dict, q_dict, z_dict)
-            if number_of_unknowns != 0:
-                final_clauses = create_basic_clauses(m_dict, p_dict, q_dict, z_dict, apply_preprocessing)
-                final_clauses, known_expressions = simplify_clauses(final_clauses, verbose)
-                p_dict, q_dict, z_dict = update_dictionaries(known_expressions, p_dict, q_dict, z_dict)
-
     if final_clauses[0] == 0 and len(set(final_clauses)) == 1:
         number_of_unknowns, _ = calculate_number_of_unknowns(p_dict, q_dict, z_dict)
         if number_of_unknowns != 0:
-            # This should be fixed after implementation of the TODO above.
             raise Exception("All clauses equal to 0, but unknowns still exist.")
 
     for clause in final_clauses:
@@ -116,6 +213,15 @@ def simplify_clauses(clauses, verbose=True):
     """
     Performs simplification of clauses.
 
+    Clauses are processed using a worklist. Every time new known expression is derived,
+    only the clauses which contain its variables are put back into the worklist.
+    This lasts until no clause can be simplified any further.
+    Equalities and complements of variables are kept in ParityUnionFind (see merge_equalities),
+    so known_expressions never contain chains of such substitutions.
+    If the clauses turn out to be inconsistent (see are_new_expressions_consistent),
+    simplification stops and the clause which revealed it is replaced by 1,
+    so the returned clauses can't be satisfied either.
+
     Args:
         clauses (list): See module documentation at the top.
         verbose (bool, optional): See module documentation at the top.
@@ -126,29 +232,137 @@ def simplify_clauses(clauses, verbose=True):
     """
 
     known_expressions = {}
-    counter = 0
-    should_continue = True
-    simplified_clauses = clauses
-    while should_continue:
-        if verbose:
-            print("Preprocessing iteration:", counter)
-        new_simplified_clauses, new_known_expressions = apply_preprocessing_rules(simplified_clauses, verbose)
-        for new_clause, old_clause in zip(new_simplified_clauses, simplified_clauses):
-            if new_clause != old_clause:
-                break
+    equalities = ParityUnionFind()
+    simplified_clauses = list(clauses)
+    clauses_by_variable = {}
+    for index, clause in enumerate(simplified_clauses):
+        for variable in clause.free_symbols:
+            clauses_by_variable.setdefault(variable, set()).add(index)
+
+    worklist = deque(range(len(simplified_clauses)))
+    in_worklist = set(worklist)
+    processed_clauses = set()
+    # Iteration of a clause is one more than the iteration of the clause which put it back into the worklist.
+    iteration_of_clause = {index: 0 for index in worklist}
+    while len(worklist) != 0:
+        index = worklist.popleft()
+        in_worklist.remove(index)
+        iteration = iteration_of_clause[index]
+        if preprocessing_profiler.enabled:
+            start_time = time.perf_counter()
+        clause = simplify_clause(simplified_clauses[index], known_expressions)
+        simplified_clauses[index] = clause
+        for variable in clause.free_symbols:
+            clauses_by_variable.setdefault(variable, set()).add(index)
+
+        # Rules depend only on the clause, so there is no point in applying them twice to the same clause.
+        if (index, clause) in processed_clauses:
+            continue
+        processed_clauses.add((index, clause))
+        if verbose and clause != 0:
+            print("Current clause", index, ":", clause)
+        if clause == 0:
+            continue
+
+        previous_known_expressions = dict(known_expressions)
+        clause, known_expressions = apply_rules_to_clause(clause, known_expressions, verbose)
+        known_expressions = merge_equalities(known_expressions, previous_known_expressions, equalities)
+        simplified_clauses[index] = clause
+        if not are_new_expressions_consistent(known_expressions, previous_known_expressions, equalities):
+            if verbose:
+                print("Clauses are inconsistent, clause", index, "replaced by 1.")
+            simplified_clauses[index] = Integer(1)
+            break
+
+        for key, value in known_expressions.items():
+            if key in previous_known_expressions and previous_known_expressions[key] == value:
+                continue
+            for variable in sympify(key).free_symbols:
+                for affected_index in clauses_by_variable.get(variable, []):
+                    if affected_index not in in_worklist:
+                        worklist.append(affected_index)
+                        in_worklist.add(affected_index)
+                        iteration_of_clause[affected_index] = iteration + 1
+
+        if preprocessing_profiler.enabled:
+            derived_facts, eliminated_variables = count_derived_facts(previous_known_expressions, known_expressions)
+            preprocessing_profiler.record_iteration(iteration, time.perf_counter() - start_time,
+                                                    derived_facts, eliminated_variables)
+
+    # Expressions derived early might depend on the variables whose values have been found later.
+    known_values = {key: value for key, value in known_expressions.items() if isinstance(sympify(value), Number)}
+    substitutions = create_polynomial_substitutions(known_values)
+    for key, value in known_expressions.items():
+        if key not in known_values:
+            if substitutions is None:
+                known_expressions[key] = sympify(value).subs(known_values)
+            else:
+                polynomial = Polynomial.from_sympy(value)
+                known_expressions[key] = apply_polynomial_substitutions(polynomial, substitutions).to_sympy()
+
+    return simplified_clauses, known_expressions
+
+
+def merge_equalities(known_expressions, previous_known_expressions, equalities):
+    """
+    Moves newly derived equalities between variables from known_expressions to equalities.
+
+    New expressions of form x = 0, x = 1, x = y and x = 1 - y are stored in equalities.
+    Then all the variables stored there are replaced in known_expressions by 0, 1, 
+    their representative or its complement, so no chains of substitutions are left.
+    Representatives themselves are removed from known_expressions.
+
+    Args:
+        known_expressions (dict): See module documentation at the top.
+        previous_known_expressions (dict): known_expressions before applying the rules.
+        equalities (ParityUnionFind): equalities found so far.
+
+    Returns:
+        known_expressions (dict): See module documentation at the top.
+    """
+    new_equalities_found = False
+    for key, value in known_expressions.items():
+        if key in previous_known_expressions and previous_known_expressions[key] == value:
+            continue
+        if equalities.add_equality(key, value):
+            new_equalities_found = True
+
+    if not new_equalities_found:
+        return known_expressions
+
+    for variable in equalities.variables():
+        value = equalities.resolve(variable)
+        if value == variable:
+            known_expressions.pop(variable, None)
         else:
-            should_continue = False
+            known_expressions[variable] = value
+    return known_expressions
 
-        simplified_clauses = new_simplified_clauses
-        known_expressions = {**known_expressions, **new_known_expressions}
 
-        if counter == 0:
-            should_continue = True
-        counter += 1
-        if verbose:
-            print("\n")
+def are_new_expressions_consistent(known_expressions, previous_known_expressions, equalities):
+    """
+    Checks whether newly derived expressions don't contradict the clauses.
 
-    return simplified_clauses, known_expressions
+    Expressions are inconsistent if some equality contradicted the ones stored
+    in equalities (see ParityUnionFind.conflicts), or if a new expression can't hold
+    for any values of the variables (e.g. 2*q_1 = 1, see can_be_zero).
+
+    Args:
+        known_expressions (dict): See module documentation at the top.
+        previous_known_expressions (dict): known_expressions before applying the rules.
+        equalities (ParityUnionFind): equalities found so far.
+
+    Returns:
+        consistent (bool): False if the clauses can't be satisfied.
+    """
+    if len(equalities.conflicts) != 0:
+        return False
+    for key, value in known_expressions.items():
+        if key in previous_known_expressions and previous_known_expressions[key] == value:
+            continue
+        if not can_be_zero(sympify(key) - value):
+            return False
+    return True
 
 
 def create_initial_dicts(m_int, true_p_int=None, true_q_int=None):
@@ -157,6 +371,8 @@ def create_initial_dicts(m_int, true_p_int=None, true_q_int=None):
 
     If true_p_int or true_q_int are provided, algorithm treats their length as known 
     and it sets the leading bits to 1.
+    Returned z_dict is empty - carry bits are created in create_basic_clauses,
+    only for the carries which are possible.
 
     Args:
         m_int (int): number to be factored, as an integer.
@@ -170,7 +386,6 @@ def create_initial_dicts(m_int, true_p_int=None, true_q_int=None):
     m_binary = bin(m_int)[2:][::-1]
 
     m_dict = {}
-    n_m = len(m_binary)
     for i, item in enumerate(m_binary):
         m_dict[i] = int(item)
 
@@ -182,40 +397,26 @@ def create_initial_dicts(m_int, true_p_int=None, true_q_int=None):
         n_p = len(true_p_binary)
 
     if true_q_int is None:
-        n_q = int(np.ceil(len(m_dict)/2))
+        n_q = int(math.ceil(len(m_dict)/2))
     else:
         true_q_binary = bin(true_q_int)[2:][::-1]
         n_q = len(true_q_binary)
 
 
     for i in range(n_p):
-        p_dict[i] = Symbol('p_'+str(i))
+        p_dict[i] = get_variable_symbol('p', i)
 
     if true_p_int is not None:
         p_dict[n_p-1] = 1
 
     q_dict = {}
     for i in range(n_q):
-        q_dict[i] = Symbol('q_'+str(i))
+        q_dict[i] = get_variable_symbol('q', i)
 
     if true_q_int is not None:
         q_dict[n_q-1] = 1
 
-
-    n_c = len(m_dict) + int(np.ceil(len(m_dict)/2)) - 1
-
     z_dict = {}
-    for i in range(n_c):
-        for j in range(i+1):
-            if i!=j:
-                if i >= n_m:
-                    pass
-                elif j==0:
-                    pass
-                else:
-                    z_dict[(j, i)] = Symbol('z_'+str(j)+'_'+str(i))
-            else:
-                pass
 
     return m_dict, p_dict, q_dict, z_dict
 
@@ -229,47 +430,57 @@ def create_basic_clauses(m_dict, p_dict, q_dict, z_dict, apply_preprocessing=Tru
     Preprocessing in this case is limited to calculating what carry bits are possible
     for p and q of given length.
 
+    Carry bits are added to z_dict as the columns are processed, so only the ones
+    which are possible are ever created. There are no carries from the 0th column
+    and no carries to the columns beyond the length of m.
+
     Args:
         m_dict, p_dict, q_dict, z_dict: See module documentation at the top.
+            z_dict is updated with the carry bits.
         apply_preprocessing (bool, optional): If True, the preprocessing will be applied. Default: True
 
     Returns:
         clauses (list): See module documentation at the top.
     """
     clauses = []
-    n_c = len(m_dict) + int(np.ceil(len(m_dict)/2)) - 1
+    n_m = len(m_dict)
+    n_c = len(m_dict) + int(math.ceil(len(m_dict)/2)) - 1
+    p_polynomials = {key: Polynomial.from_sympy(value) for key, value in p_dict.items()}
+    q_polynomials = {key: Polynomial.from_sympy(value) for key, value in q_dict.items()}
+    carries_in = {i: [] for i in range(n_c)}
+    for key, value in z_dict.items():
+        if key[1] in carries_in:
+            carries_in[key[1]].append(Polynomial.from_sympy(value))
     for i in range(n_c):
-        clause = 0
+        clause = Polynomial()
         for j in range(i+1):
-            clause += q_dict.get(j, 0) * p_dict.get(i-j, 0)
+            if j in q_polynomials and i-j in p_polynomials:
+                clause += q_polynomials[j] * p_polynomials[i-j]
         clause += -m_dict.get(i, 0)
 
-        for j in range(i+1):
-            clause += z_dict.get((j, i), 0)
-        
-        if type(clause) == int:
-            clause = sympify(clause)
+        for carry in carries_in[i]:
+            clause += carry
 
-        if apply_preprocessing and clause != 0:
+        if i == 0:
+            max_carry = 0
+        elif apply_preprocessing:
             # This part exists in order to limit the number of z terms.
-            max_sum = get_max_sum_from_clause(clause)
-
-
-            if max_sum != 0:
-                max_carry = int(np.floor(np.log2(max_sum)))
+            max_sum = get_max_sum_from_clause(clause) if clause != 0 else 0
+            if max_sum > 0:
+                max_carry = int(max_sum).bit_length() - 1
             else:
                 max_carry = 0
-            for j in range(i + max_carry + 1, n_c):
-                if z_dict.get((i, j), 0) != 0:
-                    z_dict[(i, j)] = 0
-        
-        for j in range(1, n_c):
-            clause += - 2**j * z_dict.get((i, i+j), 0)
-        
-        if clause == 0:
-            clause = sympify(clause)
+        else:
+            max_carry = n_c - 1
+
+        for j in range(1, min(max_carry, n_m - 1 - i) + 1):
+            if (i, i+j) not in z_dict:
+                z_dict[(i, i+j)] = get_variable_symbol('z', i, i+j)
+            carry = Polynomial.from_sympy(z_dict[(i, i+j)])
+            carries_in[i+j].append(carry)
+            clause += - 2**j * carry
 
-        clauses.append(clause)
+        clauses.append(clause.to_sympy())
 
     return clauses
 
@@ -279,12 +490,15 @@ def get_max_sum_from_clause(clause):
     Calculates maximum sum that can be achieved for given clause.
     
     Args:
-        clause: sympy expression representing a clause.
+        clause: sympy expression or Polynomial representing a clause.
 
     Returns:
         max_sum (int): Maximum sum that can be achieved by given clause.
     """
 
+    if isinstance(clause, Polynomial):
+        return get_max_sum_from_polynomial(clause)
+
     max_sum = 0
     if clause.func == Mul:
         if isinstance(clause.args[0], Number) and clause.args[0] > 0:
@@ -312,31 +526,233 @@ def get_max_sum_from_clause(clause):
     return max_sum
 
 
-def simplify_symmetric_case(p_dict, q_dict):
+def get_max_sum_from_polynomial(polynomial):
     """
-    Simplifies expressions if p_dict and q_dict are "symmetric".
+    Calculates maximum sum that can be achieved for given clause represented as Polynomial.
+
+    It follows the same conventions as get_max_sum_from_clause.
     
-    Example: numbers p = [1, x, 1] and q = [1, 1-x, 1] are symmetric, since 
-    if multiplied, they will produce the same result regardless of the value of x.
-    This function handles such cases and sets the bits in such way, 
-    that p is greater than q.
+    Args:
+        polynomial (Polynomial): clause.
+
+    Returns:
+        max_sum (int): Maximum sum that can be achieved by given clause.
+    """
+    if len(polynomial.terms) == 1:
+        monomial, coefficient = list(polynomial.terms.items())[0]
+        if len(monomial) == 0:
+            return int(coefficient)
+        elif coefficient > 0:
+            return int(coefficient)
+        else:
+            return 1
+
+    max_sum = 0
+    for monomial, coefficient in polynomial.terms.items():
+        if len(monomial) == 0:
+            max_sum += int(coefficient)
+        elif coefficient > 0:
+            max_sum += int(coefficient)
+    return max_sum
+
+
+def propagate_carry_bounds(m_dict, p_dict, q_dict, z_dict):
+    """
+    Determines carry bits using the bounds of the sums in every column.
+
+    Column i of the multiplication states that:
+    sum(p_j * q_(i-j)) + (carries into column i) - m_i = sum(2**k * z_(i, i+k)),
+    so the range of the left side limits which carries out of column i are possible (forward),
+    and the range of the carries out limits the carries into the column (backward).
+    Ranges are calculated from the current values in the dictionaries, each bit is
+    treated as an independent variable in range [0, 1] unless its value is known.
+    Carry bits whose range collapses to a single value are determined.
+    Since determined carry bits change the ranges in the neighbouring columns,
+    it's repeated until nothing changes.
 
     Args:
-        p_dict, q_dict: See module documentation at the top.
+        m_dict, p_dict, q_dict, z_dict: See module documentation at the top.
+            p_dict and q_dict can also be lists indexed by bit (see VariableValues).
 
     Returns:
-        p_dict, q_dict: See module documentation at the top.
+        carry_values (dict): Maps keys of z_dict to the determined values (0 or 1).
+            Only the carry bits which are not constants in z_dict are included.
+    """
+    n_c = len(m_dict) + int(math.ceil(len(m_dict)/2)) - 1
+    bounds = {key: get_bounds(value) for key, value in z_dict.items()}
+    column_sum_bounds = []
+    for i in range(n_c):
+        column_sum = Polynomial()
+        for j in range(i+1):
+            if j < len(q_dict) and i-j < len(p_dict):
+                column_sum += Polynomial.from_sympy(q_dict[j]) * Polynomial.from_sympy(p_dict[i-j])
+        column_sum_bounds.append(get_bounds(column_sum))
+    carries_in = {i: [] for i in range(n_c)}
+    carries_out = {i: [] for i in range(n_c)}
+    for key in z_dict:
+        if key[0] in carries_out and key[1] in carries_in:
+            carries_out[key[0]].append(key)
+            carries_in[key[1]].append(key)
+
+    carry_values = {}
+    changed = True
+    while changed:
+        changed = False
+        for i in range(n_c):
+            sum_low, sum_high = column_sum_bounds[i]
+            m_bit = m_dict.get(i, 0)
+            in_low = sum(bounds[key][0] for key in carries_in[i])
+            in_high = sum(bounds[key][1] for key in carries_in[i])
+            out_low = sum(bounds[key][0] * 2**(key[1] - key[0]) for key in carries_out[i])
+            out_high = sum(bounds[key][1] * 2**(key[1] - key[0]) for key in carries_out[i])
+
+            # Forward: carries out of the column must be equal to the sum in the column.
+            required_out_low = sum_low + in_low - m_bit
+            required_out_high = sum_high + in_high - m_bit
+            for key in carries_out[i]:
+                low, high = bounds[key]
+                if low == high:
+                    continue
+                weight = 2**(key[1] - key[0])
+                if out_low + weight > required_out_high:
+                    carry_values[key] = 0
+                elif out_high - weight < required_out_low:
+                    carry_values[key] = 1
+                else:
+                    continue
+                bounds[key] = (carry_values[key], carry_values[key])
+                out_low = sum(bounds[key][0] * 2**(key[1] - key[0]) for key in carries_out[i])
+                out_high = sum(bounds[key][1] * 2**(key[1] - key[0]) for key in carries_out[i])
+                changed = True
+
+            # Backward: carries into the column must make up for the difference.
+            required_in_low = out_low + m_bit - sum_high
+            required_in_high = out_high + m_bit - sum_low
+            for key in carries_in[i]:
+                low, high = bounds[key]
+                if low == high:
+                    continue
+                if in_low + 1 > required_in_high:
+                    carry_values[key] = 0
+                elif in_high - 1 < required_in_low:
+                    carry_values[key] = 1
+                else:
+                    continue
+                bounds[key] = (carry_values[key], carry_values[key])
+                in_low = sum(bounds[key][0] for key in carries_in[i])
+                in_high = sum(bounds[key][1] for key in carries_in[i])
+                changed = True
+    return carry_values
+
+
+def create_carry_bound_clauses(m_dict, p_dict, q_dict, z_dict):
+    """
+    Creates clauses stating the values of carry bits determined by propagate_carry_bounds.
+
+    Args:
+        m_dict, p_dict, q_dict, z_dict: See propagate_carry_bounds.
+
+    Returns:
+        clauses (list): Clauses of form z - value, where z is the value from z_dict.
+    """
+    carry_values = propagate_carry_bounds(m_dict, p_dict, q_dict, z_dict)
+    clauses = []
+    for key in sorted(carry_values):
+        clause = (sympify(z_dict[key]) - carry_values[key]).expand()
+        if clause != 0:
+            clauses.append(clause)
+    return clauses
+
+
+def get_bounds(expression):
+    """
+    Calculates the lowest and highest value of the expression, treating every variable
+    as independent and binary.
+
+    Args:
+        expression: sympy expression, integer or Polynomial.
+
+    Returns:
+        low, high (int): Bounds of the expression.
+    """
+    if not isinstance(expression, Polynomial):
+        expression = Polynomial.from_sympy(expression)
+    low = 0
+    high = 0
+    for monomial, coefficient in expression.terms.items():
+        if len(monomial) == 0:
+            low += coefficient
+            high += coefficient
+        elif coefficient > 0:
+            high += coefficient
+        else:
+            low += coefficient
+    return int(low), int(high)
+
+
+def can_be_zero(clause):
+    """
+    Checks whether a clause can be equal to 0 for some values of the binary variables.
+
+    Clause can't be equal to 0 if 0 is outside of the range of its values,
+    or if the constant term is not divisible by the greatest common divisor of the other coefficients.
+    """
+    clause = sympify(clause)
+    try:
+        polynomial = Polynomial.from_sympy(clause)
+    except ValueError:
+        return True
+    constant = polynomial.constant_term()
+    lowest_value = constant + sum(coefficient for monomial, coefficient in polynomial.terms.items()
+                                  if len(monomial) != 0 and coefficient < 0)
+    highest_value = constant + sum(coefficient for monomial, coefficient in polynomial.terms.items()
+                                   if len(monomial) != 0 and coefficient > 0)
+    if not lowest_value <= 0 <= highest_value:
+        return False
+    try:
+        common_divisor = (polynomial - constant).content()
+    except ValueError:
+        return True
+    return common_divisor == 0 or constant % common_divisor == 0
+
+
+def create_symmetry_breaking_clause(p_dict, q_dict):
     """
+    Creates clause which breaks the symmetry between p and q.
+
+    If p and q have the same length, swapping them gives another solution
+    (see https://arxiv.org/pdf/1411.6758.pdf), which costs additional unknowns.
+    The symmetry is broken by requiring that p >= q. If the bits of p and q
+    are equal down to bit k, it means that p_k >= q_k, i.e. q_k*(1 - p_k) = 0.
+    Example: for p = [1, x, 1] and q = [1, 1-x, 1] the clause is 1 - x, so x = 1.
 
+    Bits are compared as expressions, so it works only for the bits which
+    are known to be equal in every solution - it's meant to be used repeatedly,
+    after each round of simplification.
+
+    Args:
+        p_dict, q_dict: See module documentation at the top.
+            Lists indexed by bit (see VariableValues) can be used as well.
+
+    Returns:
+        bit_index (int): Index of the bit for which the clause has been created.
+            None if the symmetry can't be broken (any more).
+        clause: sympy expression representing the clause. None if bit_index is None.
+    """
     if len(p_dict) != len(q_dict):
-        return p_dict, q_dict
+        return None, None
 
-    for key in sorted(p_dict.keys())[::-1]:
-        if type(p_dict[key]) != int or type(q_dict[key]) != int:
-            if p_dict[key] + q_dict[key] == 1:
-                known_expressions = {p_dict[key]: 1, q_dict[key]: 0}
-                p_dict, q_dict, _ = update_dictionaries(known_expressions, p_dict, q_dict, {})
-    return p_dict, q_dict
+    for key in reversed(range(len(p_dict))):
+        p_bit = sympify(p_dict[key])
+        q_bit = sympify(q_dict[key])
+        if p_bit == q_bit:
+            continue
+        clause = reduce_powers((q_bit * (1 - p_bit)).expand())
+        if clause == 0:
+            # p_k >= q_k for every solution, so the symmetry is already broken.
+            return None, None
+        return key, clause
+    return None, None
 
 
 def apply_preprocessing_rules(clauses, verbose=True):
@@ -366,45 +782,428 @@ def apply_preprocessing_rules(clauses, verbose=True):
         if clause == 0:
             continue
 
+        clause, known_expressions = apply_rules_to_clause(clause, known_expressions, verbose)
 
-        known_expressions = apply_z_rule(clause, known_expressions, verbose)
-        clause = simplify_clause(clause, known_expressions)
+    simplified_clauses = []
+    for clause in clauses:
+        simplified_clause = simplify_clause(clause, known_expressions)
+        simplified_clauses.append(simplified_clause)
+    return simplified_clauses, known_expressions
 
-        known_expressions = apply_rule_1(clause, known_expressions, verbose)
-        clause = simplify_clause(clause, known_expressions)
 
-        known_expressions = apply_rule_2(clause, known_expressions, verbose)
-        clause = simplify_clause(clause, known_expressions)
+def apply_rules_to_clause(clause, known_expressions, verbose=True):
+    """
+    Applies all the preprocessing rules to a single clause.
 
-        known_expressions = apply_rule_3(clause, known_expressions, verbose)
-        clause = simplify_clause(clause, known_expressions)
+    Only rules whose condition accepts the shape of the clause are applied (see preprocessing_rule).
+    Clause is simplified after each applied rule, so the next rule works on the simplified version.
 
-        known_expressions = apply_rules_4_and_5(clause, known_expressions, verbose)
-        clause = simplify_clause(clause, known_expressions)
+    Args:
+        clause: sympy expression representing a clause.
+        known_expressions (dict): See module documentation at the top.
+        verbose (bool, optional): See module documentation at the top.
 
-        known_expressions = apply_rule_of_equality(clause, known_expressions, verbose)
-        clause = simplify_clause(clause, known_expressions)
+    Returns:
+        clause: sympy expression representing a simplified clause.
+        known_expressions (dict): See module documentation at the top.
+    """
+    shape = get_clause_shape(clause)
+    for rule in PREPROCESSING_RULES:
+        if shape is not None and not rule.condition(shape):
+            continue
+        if preprocessing_profiler.enabled:
+            known_expressions = apply_rule_with_profiling(rule, clause, known_expressions, verbose)
+        else:
+            known_expressions = rule.function(clause, known_expressions, verbose)
+        simplified_clause = simplify_clause(clause, known_expressions)
+        if simplified_clause != clause:
+            clause = simplified_clause
+            shape = get_clause_shape(clause)
+    return clause, known_expressions
 
-        known_expressions = apply_parity_rule(clause, known_expressions, verbose)
-        clause = simplify_clause(clause, known_expressions)
 
+def apply_rule_with_profiling(rule, clause, known_expressions, verbose=True):
+    """
+    Applies a preprocessing rule and records its statistics in preprocessing_profiler.
+
+    Args:
+        rule (PreprocessingRule): rule to apply.
+        clause: sympy expression representing a clause.
+        known_expressions (dict): See module documentation at the top.
+        verbose (bool, optional): See module documentation at the top.
+
+    Returns:
+        known_expressions (dict): See module documentation at the top.
+    """
+    # Rules modify known_expressions in place, so a copy is needed for the comparison.
+    previous_known_expressions = dict(known_expressions)
+    start_time = time.perf_counter()
+    known_expressions = rule.function(clause, known_expressions, verbose)
+    elapsed_time = time.perf_counter() - start_time
+    derived_facts, eliminated_variables = count_derived_facts(previous_known_expressions, known_expressions)
+    preprocessing_profiler.record_step(rule.function.__name__, elapsed_time, derived_facts, eliminated_variables)
+    return known_expressions
+
+
+def count_derived_facts(previous_known_expressions, known_expressions):
+    """
+    Compares known_expressions before and after some preprocessing step.
+
+    Args:
+        previous_known_expressions (dict): known_expressions before the step.
+        known_expressions (dict): known_expressions after the step.
+
+    Returns:
+        derived_facts (int): Number of added or changed entries.
+        eliminated_variables (int): Number of single variables which have been added.
+    """
+    derived_facts = 0
+    eliminated_variables = 0
+    for key, value in known_expressions.items():
+        if key not in previous_known_expressions:
+            derived_facts += 1
+            if isinstance(key, Symbol):
+                eliminated_variables += 1
+        elif previous_known_expressions[key] != value:
+            derived_facts += 1
+    return derived_facts, eliminated_variables
+
+
+def enable_profiling(reset=True):
+    """
+    Starts collecting statistics of the preprocessing steps, see PreprocessingProfiler.
+
+    Args:
+        reset (bool, optional): If True, previously collected statistics are removed. Default: True
+    """
+    if reset:
+        preprocessing_profiler.reset()
+    preprocessing_profiler.enabled = True
 
-    simplified_clauses = []
-    for clause in clauses:
-        simplified_clause = simplify_clause(clause, known_expressions)
-        simplified_clauses.append(simplified_clause)
-    return simplified_clauses, known_expressions
 
+def disable_profiling():
+    """
+    Stops collecting statistics of the preprocessing steps.
+    """
+    preprocessing_profiler.enabled = False
+
+
+def get_profiling_statistics():
+    """
+    Returns statistics of the preprocessing steps, see PreprocessingProfiler.statistics.
+    Use preprocessing_profiler.to_table() or to_json() to export them.
+    """
+    return preprocessing_profiler.statistics()
 
-def simplify_clause(clause, known_expressions, iterations=2):
+
+def preprocessing_rule(order, condition):
+    """
+    Decorator which registers function as a preprocessing rule.
+
+    Example:
+        @preprocessing_rule(order=10, condition=lambda shape: shape.number_of_terms == 2)
+        def apply_my_rule(clause, known_expressions, verbose=False):
+            ...
+            return known_expressions
+
+    Args:
+        order (int): Rules are applied to a clause in ascending order.
+        condition (function): Takes ClauseShape of a clause and returns False 
+            if the rule certainly can't be applied to it.
+
+    Returns:
+        decorator (function)
+    """
+    def decorator(function):
+        PREPROCESSING_RULES.append(PreprocessingRule(order, function, condition))
+        PREPROCESSING_RULES.sort(key=lambda rule: rule.order)
+        get_rule_set_version.cache_clear()
+        return function
+    return decorator
+
+
+@lru_cache(maxsize=2**16)
+def get_clause_shape(clause):
+    """
+    Calculates shape of the clause, which is used for choosing preprocessing rules.
+
+    Args:
+        clause: sympy expression representing a clause.
+
+    Returns:
+        shape (ClauseShape): See ClauseShape. None if clause is not a multilinear polynomial.
+    """
+    try:
+        polynomial = Polynomial.from_sympy(clause)
+    except ValueError:
+        return None
+    terms = tuple(sorted((len(monomial), coefficient) for monomial, coefficient in polynomial.terms.items() 
+                         if len(monomial) != 0))
+    return ClauseShape(len(polynomial.terms), polynomial.constant_term(), terms)
+
+
+def simplify_clause(clause, known_expressions, iterations=2, use_cache=True):
     """
     Simplifies clauses based on known_expressions and algebraic rules.
     
     Substitutes some variables in given claus with known expressions (if possible).
     Also performs addition simplification, like dividing clause by a constant (if it makes sense)
     and substituting x**2 -> x, since the variables are binary.
+    Calculations are performed on Polynomial objects, substitutions are applied
+    in the same order as sympy's subs would apply them.
+    If clause or known_expressions can't be represented that way, it falls back to sympy.
+
+    Results are memoized in simplification_cache. The key consists of the clause
+    and only those known_expressions which can affect it (see select_relevant_expressions).
 
     TODO: instead of using iterations, it should use some form of recursion.
+    Args:
+        clause: sympy expression representing a clause.
+        known_expressions (dict): See module documentation at the top.
+        iterations (int, optional): Number of simplification rounds. Default: 2
+        use_cache (bool, optional): If False, simplification_cache is bypassed. Default: True
+
+    Returns:
+        simplified_clause: sympy expression representing a simplified clause.
+    """
+    if preprocessing_profiler.enabled:
+        start_time = time.perf_counter()
+    relevant_expressions = select_relevant_expressions(clause, known_expressions)
+    if not use_cache:
+        simplified_clause = _simplify_clause(clause, relevant_expressions, iterations)
+    else:
+        cache_key = (clause, frozenset(relevant_expressions.items()), iterations)
+        simplified_clause = simplification_cache.get(cache_key)
+        if simplified_clause is None:
+            simplified_clause = _simplify_clause(clause, relevant_expressions, iterations)
+            simplification_cache.put(cache_key, simplified_clause)
+    if preprocessing_profiler.enabled:
+        preprocessing_profiler.record_step('simplify_clause', time.perf_counter() - start_time)
+    return simplified_clause
+
+
+def _simplify_clause(clause, known_expressions, iterations):
+    substitutions = create_polynomial_substitutions(known_expressions)
+    try:
+        polynomial = Polynomial.from_sympy(clause)
+    except ValueError:
+        substitutions = None
+    if substitutions is None:
+        if not preprocessing_profiler.enabled:
+            return simplify_clause_with_sympy(clause, known_expressions, iterations)
+        start_time = time.perf_counter()
+        simplified_clause = simplify_clause_with_sympy(clause, known_expressions, iterations)
+        preprocessing_profiler.record_step('simplify_clause_with_sympy', time.perf_counter() - start_time)
+        return simplified_clause
+
+    for i in range(iterations):
+        polynomial = apply_polynomial_substitutions(polynomial, substitutions)
+
+        if len(polynomial.terms) > 1:
+            # Clauses with a single variable with coefficient 1 have no common factor to divide by.
+            # Originally this check limited usage of factor(), which gave even 20x speedup for large numbers.
+            for monomial, coefficient in polynomial.terms.items():
+                if len(monomial) == 1 and coefficient == 1:
+                    break
+            else:
+                if preprocessing_profiler.enabled:
+                    start_time = time.perf_counter()
+                    polynomial = normalize_content(polynomial)
+                    preprocessing_profiler.record_step('normalize_content', time.perf_counter() - start_time)
+                else:
+                    polynomial = normalize_content(polynomial)
+
+    return polynomial.to_sympy()
+
+
+def normalize_content(polynomial):
+    """
+    Divides clause by its numeric factor.
+
+    The numeric factor is the greatest common divisor of the coefficients, 
+    with the sign of the leading coefficient (see Polynomial.leading_coefficient for the order of variables). 
+    Like with the numeric factor returned by sympy's factor(),
+    if the common divisor is 1, the sign is changed only if the clause can be factored.
+    E.g. -2*p - 2*q + 2 -> p + q - 1, -p*q + p -> p*q - p, but -p*q + 1 stays unchanged.
+
+    Args:
+        polynomial (Polynomial): clause.
+
+    Returns:
+        polynomial (Polynomial): normalized clause.
+    """
+    try:
+        content = polynomial.content()
+    except ValueError:
+        factored_clause = factor(polynomial.to_sympy())
+        if factored_clause.func == Mul and isinstance(factored_clause.args[0], Number):
+            return polynomial.divide(Polynomial.from_sympy(factored_clause.args[0]).constant_term())
+        return polynomial
+
+    if content == 0:
+        return polynomial
+    if polynomial.leading_coefficient() < 0:
+        if content != 1 or polynomial.is_reducible():
+            return polynomial.divide(-content)
+    elif content != 1:
+        return polynomial.divide(content)
+    return polynomial
+
+
+def reduce_powers(expression):
+    """
+    Simplifies x**n -> x, since the variables we use are binary.
+
+    Args:
+        expression: sympy expression.
+
+    Returns:
+        expression: sympy expression without powers of variables.
+    """
+    return expression.replace(lambda term: term.func == Pow and term.args[1].is_Integer and term.args[1] > 0,
+                              lambda term: term.args[0])
+
+
+def select_relevant_expressions(clause, known_expressions):
+    """
+    Selects known_expressions which can affect given clause during simplification.
+
+    These are expressions which share variables with the clause, but also
+    those which share variables with the values of the already selected expressions,
+    since substitutions are applied one after another.
+
+    Args:
+        clause: sympy expression representing a clause.
+        known_expressions (dict): See module documentation at the top.
+
+    Returns:
+        relevant_expressions (dict): Subset of known_expressions.
+    """
+    variables = set(sympify(clause).free_symbols)
+    remaining_keys = list(known_expressions.keys())
+    relevant_expressions = {}
+    should_continue = True
+    while should_continue:
+        should_continue = False
+        for key in remaining_keys:
+            if key in relevant_expressions:
+                continue
+            if not variables.isdisjoint(_get_free_symbols(key)):
+                value = known_expressions[key]
+                relevant_expressions[key] = value
+                new_variables = _get_free_symbols(value).difference(variables)
+                if len(new_variables) != 0:
+                    variables.update(new_variables)
+                    should_continue = True
+    return {key: known_expressions[key] for key in known_expressions if key in relevant_expressions}
+
+
+def get_simplification_cache_statistics():
+    """
+    Returns statistics of the cache used by simplify_clause.
+
+    Returns:
+        statistics (dict): See LRUCache.statistics.
+    """
+    return simplification_cache.statistics()
+
+
+def set_simplification_cache_size(max_size):
+    """
+    Sets the maximum number of entries in the cache used by simplify_clause.
+
+    Args:
+        max_size (int): Maximum number of entries. If 0, nothing is cached. If None, size is not limited.
+    """
+    simplification_cache.resize(max_size)
+
+
+def clear_simplification_cache():
+    """
+    Removes all the entries from the cache used by simplify_clause and resets its statistics.
+    Helper caches of clause shapes and substitutions are cleared as well.
+    """
+    simplification_cache.clear()
+    get_clause_shape.cache_clear()
+    _get_free_symbols.cache_clear()
+    _get_substitution_order.cache_clear()
+    _create_polynomial_substitution.cache_clear()
+
+
+def create_polynomial_substitutions(known_expressions):
+    """
+    Translates known_expressions into the substitutions which can be applied to Polynomial objects.
+
+    Substitutions are ordered the same way as sympy orders them in subs:
+    more complex expressions go first, ties are resolved with default_sort_key.
+
+    Args:
+        known_expressions (dict): See module documentation at the top.
+
+    Returns:
+        substitutions (list): List of tuples (monomial, coefficient, value), 
+            where value is a Polynomial. None if any of the expressions can't be translated.
+    """
+    substitutions = []
+    for key in sorted(known_expressions, key=_get_substitution_order):
+        substitution = _create_polynomial_substitution(key, known_expressions[key])
+        if substitution is None:
+            return None
+        substitutions.append(substitution)
+    return substitutions
+
+
+def apply_polynomial_substitutions(polynomial, substitutions):
+    """
+    Applies substitutions to the polynomial one after another.
+
+    Args:
+        polynomial (Polynomial): clause.
+        substitutions (list): See create_polynomial_substitutions.
+
+    Returns:
+        polynomial (Polynomial): clause after substitutions.
+    """
+    for monomial, coefficient, value in substitutions:
+        variables = polynomial.variables()
+        if all(var_id in variables for var_id in monomial):
+            polynomial = polynomial.substitute(monomial, value, coefficient)
+    return polynomial
+
+
+@lru_cache(maxsize=2**16)
+def _get_free_symbols(expression):
+    return frozenset(sympify(expression).free_symbols)
+
+
+@lru_cache(maxsize=2**16)
+def _get_substitution_order(key):
+    key = sympify(key)
+    number_of_nodes = sum(1 for _ in preorder_traversal(key))
+    return -number_of_nodes, default_sort_key(key)
+
+
+@lru_cache(maxsize=2**16)
+def _create_polynomial_substitution(key, value):
+    try:
+        key_polynomial = Polynomial.from_sympy(key)
+        value_polynomial = Polynomial.from_sympy(value)
+    except ValueError:
+        return None
+    if len(key_polynomial.terms) != 1:
+        return None
+    monomial, coefficient = list(key_polynomial.terms.items())[0]
+    if len(monomial) == 0 or coefficient not in [1, -1]:
+        return None
+    return monomial, coefficient, value_polynomial
+
+
+def simplify_clause_with_sympy(clause, known_expressions, iterations=2):
+    """
+    Simplifies clauses based on known_expressions and algebraic rules, using only sympy.
+
+    See simplify_clause for details.
+
     Args:
         clause: sympy expression representing a clause.
         known_expressions (dict): See module documentation at the top.
@@ -416,16 +1215,9 @@ def simplify_clause(clause, known_expressions, iterations=2):
     for i in range(iterations):
         simplified_clause = simplified_clause.subs(known_expressions).expand()
         if simplified_clause.func == Add:
-            # Simplifies x**2 -> x, since the variables we use are binary.
-            for term in simplified_clause.args:
-                if term.func == Mul and 'Pow' in srepr(term):
-                    for subterm in term.args:
-                        if subterm.func == Pow:
-                            simplified_clause = simplified_clause.subs({subterm: subterm.args[0]})
-
-                if term.func == Pow:
-                    simplified_clause = simplified_clause - term + term.args[0]
+            simplified_clause = reduce_powers(simplified_clause)
 
+        if simplified_clause.func == Add:
             # factor() is very resource-heavy - this intends to limit its usage.
             # It gives even 20x speedup for large numbers!
             for term in simplified_clause.args:
@@ -442,6 +1234,8 @@ def simplify_clause(clause, known_expressions, iterations=2):
     return simplified_clause
 
 
+@preprocessing_rule(order=0, condition=lambda shape: shape.number_of_terms > 1 and 
+                    any(coefficient < 0 for _, coefficient in shape.terms))
 def apply_z_rule(clause, known_expressions, verbose=False):
     """
     Extends known_expressions by applying "Z-rule" (see example below).
@@ -479,6 +1273,8 @@ def apply_z_rule(clause, known_expressions, verbose=False):
     return known_expressions
 
 
+@preprocessing_rule(order=60, condition=lambda shape: shape.number_of_terms > 1 and
+                    1 <= len([1 for _, coefficient in shape.terms if coefficient % 2 != 0]) + shape.constant % 2 <= 3)
 def apply_parity_rule(clause, known_expressions, verbose=False):
     """
     Extends known_expressions by applying parity rule (see example below).
@@ -534,9 +1330,13 @@ def apply_parity_rule(clause, known_expressions, verbose=False):
             if isinstance(term.args[0], Number):
                 term = term / term.args[0]
             new_known_expressions[term] = 0
+        elif isinstance(odd_terms[0], Number):
+            # All the other terms are even, so the clause can't be satisfied - there's nothing to derive.
+            # It happens only for inconsistent clauses, e.g. in the branches of backtracking_solver.
+            pass
         else:
-            print("TODO: Z rule 2: don't know this type!")
-            pdb.set_trace()
+            # Not a single variable or monomial - nothing simple to derive.
+            pass
 
     if len(odd_terms) == 2:
         non_number_index = None
@@ -562,7 +1362,7 @@ def apply_parity_rule(clause, known_expressions, verbose=False):
                 pass
 
         else:
-            if 'q' in str(odd_terms[0]):
+            if contains_q_variable(odd_terms[0]):
                 non_q_index = 1
             else:
                 non_q_index = 0
@@ -596,8 +1396,8 @@ def apply_parity_rule(clause, known_expressions, verbose=False):
                         pass
                         # pdb.set_trace()
                 else:
-                    print("TODO: Z rule 2: don't know this type!")
-                    pdb.set_trace()
+                    # Not a monomial - nothing simple to derive.
+                    pass
 
     if len(odd_terms) == 3:
         number_index = None
@@ -613,8 +1413,7 @@ def apply_parity_rule(clause, known_expressions, verbose=False):
             new_term = odd_terms[indices[0]] * odd_terms[indices[1]]
             if isinstance(new_term.args[0], Number):
                 new_term = new_term / new_term.args[0]
-            if 'Pow' in srepr(new_term):
-                new_term = simplify_clause(new_term, {})
+            new_term = reduce_powers(new_term)
             new_known_expressions[new_term] = 0
             
 
@@ -629,6 +1428,8 @@ def apply_parity_rule(clause, known_expressions, verbose=False):
     return known_expressions
 
 
+@preprocessing_rule(order=50, condition=lambda shape: shape.number_of_terms == 2 or 
+                    (shape.number_of_terms == 1 and shape.constant == 0))
 def apply_rule_of_equality(clause, known_expressions, verbose=False):
     """
     Extends known_expressions by leveraging that clause equals to 0.
@@ -651,11 +1452,12 @@ def apply_rule_of_equality(clause, known_expressions, verbose=False):
         elif isinstance(clause.args[1], Number):
             known_expressions[clause.args[0]] = -clause.args[1]
         else:
-            if 'q' in str(clause.args[0]):
+            if contains_q_variable(clause.args[0]):
                 non_q_index = 1
             else:
                 non_q_index = 0
-            if '-' in str(clause.args[1 - non_q_index]):
+            coefficient, _ = clause.args[1 - non_q_index].as_coeff_Mul()
+            if coefficient < 0:
                 known_expressions[clause.args[non_q_index]] = -clause.args[1 - non_q_index]
             else:
                 known_expressions[-clause.args[non_q_index]] = clause.args[1 - non_q_index]
@@ -672,6 +1474,7 @@ def apply_rule_of_equality(clause, known_expressions, verbose=False):
     return known_expressions
 
 
+@preprocessing_rule(order=10, condition=lambda shape: shape.constant == -1 and shape.terms == ((2, 1),))
 def apply_rule_1(clause, known_expressions, verbose=False):
     """
     Extends known_expressions by applying rule 1 from eq. (5).
@@ -688,11 +1491,7 @@ def apply_rule_1(clause, known_expressions, verbose=False):
     clause_variables = list(clause.free_symbols)
     if clause.func == Add and len(clause.args)==2:
         if len(clause_variables) == 2:
-            x = Symbol('x')
-            y = Symbol('y')
-            rule = x * y - 1
-            substitution = clause.subs({clause_variables[0]: x, clause_variables[1]: y})
-            if substitution - rule == 0:
+            if clause == clause_variables[0] * clause_variables[1] - 1:
                 if verbose:
                     print("Rule 1 applied!", clause)
                 known_expressions[clause_variables[0]] = 1
@@ -700,6 +1499,7 @@ def apply_rule_1(clause, known_expressions, verbose=False):
     return known_expressions
 
 
+@preprocessing_rule(order=20, condition=lambda shape: shape.constant == -1 and shape.terms == ((1, 1), (1, 1)))
 def apply_rule_2(clause, known_expressions, verbose=False):
     """
     Extends known_expressions by applying rule 2 from eq. (5).
@@ -712,18 +1512,13 @@ def apply_rule_2(clause, known_expressions, verbose=False):
     Returns:
         known_expressions (dict): See module documentation at the top.
     """
-    x = Symbol('x')
-    y = Symbol('y')
-
-    rule = x + y - 1
     clause_variables = list(clause.free_symbols)
     if clause.func == Add and len(clause.args) == 3 and len(clause_variables)==2:
-        substitution = clause.subs({clause_variables[0]: x, clause_variables[1]: y})
-        if substitution - rule == 0:
+        if clause == clause_variables[0] + clause_variables[1] - 1:
             if verbose:
                 print("Rule 2 applied!", clause_variables[0], "=", 1 - clause_variables[1])
             known_expressions[clause_variables[0] * clause_variables[1]] = 0
-            if 'q' in str(clause_variables[1]):
+            if contains_q_variable(clause_variables[1]):
                 known_expressions[clause_variables[0]] = 1 - clause_variables[1]
             else:
                 known_expressions[clause_variables[1]] = 1 - clause_variables[0]
@@ -731,6 +1526,7 @@ def apply_rule_2(clause, known_expressions, verbose=False):
     return known_expressions
 
 
+@preprocessing_rule(order=30, condition=lambda shape: shape.number_of_terms == 2 and shape.constant != 0)
 def apply_rule_3(clause, known_expressions, verbose=False):
     """
     Extends known_expressions by applying rule 3 from eq. (5).
@@ -756,6 +1552,8 @@ def apply_rule_3(clause, known_expressions, verbose=False):
     return known_expressions
 
 
+@preprocessing_rule(order=40, condition=lambda shape: shape.number_of_terms > 1 and 
+                    shape.constant in [0, -(shape.number_of_terms - 1)])
 def apply_rules_4_and_5(clause, known_expressions, verbose=False):
     """
     Extends known_expressions by applying rules 4 and 5 from eq. (5).
@@ -805,71 +1603,87 @@ def apply_rules_4_and_5(clause, known_expressions, verbose=False):
     return known_expressions
 
 
-def update_dictionaries(known_expressions, p_dict, q_dict, z_dict):
+class VariableValues(object):
     """
-    Updates values of p_dict, q_dict and z_dict with the values stored in known_expressions.
-        
-    Args:
-        known_expressions (dict): See module documentation at the top.
-        p_dict, q_dict, z_dict: See module documentation at the top.
+    Values of the bits of p and q and of the carry bits, kept in integer-indexed arrays.
 
-    Returns:
-        known_expressions (dict): See module documentation at the top.
+    p_values[i] and q_values[i] are the values of the i-th bits of p and q,
+    z_values[k] is the value of the carry bit z_keys[k].
+    Values are the same as in p_dict, q_dict and z_dict (see module documentation at the top),
+    which are created from the arrays only when needed (see to_dicts).
     """
 
-    all_known_expressions = {**known_expressions}
-
-    for symbol in known_expressions:
-        str_symbol = str(symbol)
-        symbol_type = str_symbol[0]
-        if '*' in str_symbol:
-            continue
-        if symbol_type == 'p':
-            symbol_number = int(str_symbol.split('_')[1])
-            p_dict[symbol_number] = known_expressions[symbol]
-        if symbol_type == 'q':
-            symbol_number = int(str_symbol.split('_')[1])
-            q_dict[symbol_number] = known_expressions[symbol]
-
-        if symbol_type == 'z':
-            symbol_number_0 = int(str_symbol.split('_')[1])
-            symbol_number_1 = int(str_symbol.split('_')[2])
-            z_dict[(symbol_number_0, symbol_number_1)] = known_expressions[symbol]
-
-
-    known_symbols = create_known_symbols_dict(p_dict, q_dict, z_dict)
-    all_known_expressions = {**all_known_expressions, **known_symbols}
-
-    for x_dict in [p_dict, q_dict, z_dict]:
-        for index, value in x_dict.items():
-            if type(value) in [Symbol, Add, Mul]:
-                x_dict[index] = x_dict[index].subs(all_known_expressions)
-
-
-    return p_dict, q_dict, z_dict
-
-
-def create_known_symbols_dict(p_dict, q_dict, z_dict):
-    """
-    Creates a dictionary of known simple symbols.
-        
-    Args:
-        p_dict, q_dict, z_dict: See module documentation at the top.
-
-    Returns:
-        known_symbols (dict): Dictionary of known symbols.
-    """
-
-    known_symbols = {}
-    for index, value in p_dict.items():
-        known_symbols[Symbol('p_' + str(index))] = value
-
-    for index, value in q_dict.items():
-        known_symbols[Symbol('q_' + str(index))] = value
-
-    for index, value in z_dict.items():
-        known_symbols[Symbol('z_' + str(index[0]) + "_" + str(index[1]))] = value
-    return known_symbols
+    def __init__(self, p_dict, q_dict, z_dict):
+        self.p_values = [p_dict[index] for index in range(len(p_dict))]
+        self.q_values = [q_dict[index] for index in range(len(q_dict))]
+        self.z_keys = list(z_dict.keys())
+        self.z_values = [z_dict[key] for key in self.z_keys]
+        # Maps symbols of the variables to their places in the arrays.
+        self.positions = {}
+        for index in range(len(self.p_values)):
+            self.positions[get_variable_symbol('p', index)] = (self.p_values, index)
+        for index in range(len(self.q_values)):
+            self.positions[get_variable_symbol('q', index)] = (self.q_values, index)
+        for index, key in enumerate(self.z_keys):
+            self.positions[get_variable_symbol('z', *key)] = (self.z_values, index)
+
+    def update(self, known_expressions):
+        """
+        Updates the values with the values stored in known_expressions.
+
+        Variables which are keys of known_expressions get their values directly.
+        Afterwards all the known expressions and known symbols are substituted,
+        but only into the values which contain any of the substituted variables.
+
+        Args:
+            known_expressions (dict): See module documentation at the top.
+        """
+        for symbol, value in known_expressions.items():
+            position = self.positions.get(symbol)
+            if position is not None:
+                values, index = position
+                values[index] = value
+
+        all_known_expressions = {**known_expressions, **self.known_symbols()}
+        substitutions = create_polynomial_substitutions(all_known_expressions)
+        substituted_symbols = set()
+        for key in all_known_expressions:
+            substituted_symbols.update(_get_free_symbols(key))
+
+        for values in [self.p_values, self.q_values, self.z_values]:
+            for index, value in enumerate(values):
+                if type(value) not in [Symbol, Add, Mul]:
+                    continue
+                if substituted_symbols.isdisjoint(_get_free_symbols(value)):
+                    continue
+                if substitutions is None:
+                    values[index] = value.subs(all_known_expressions)
+                else:
+                    polynomial = Polynomial.from_sympy(value)
+                    values[index] = apply_polynomial_substitutions(polynomial, substitutions).to_sympy()
+
+    def known_symbols(self):
+        """
+        Creates a dictionary of known simple symbols, i.e. the variables whose values are not the variables themselves.
+
+        Returns:
+            known_symbols (dict): Dictionary of known symbols.
+        """
+        known_symbols = {}
+        for symbol, (values, index) in self.positions.items():
+            if values[index] != symbol:
+                known_symbols[symbol] = values[index]
+        return known_symbols
+
+    def to_dicts(self):
+        """
+        Returns:
+            p_dict, q_dict, z_dict: See module documentation at the top.
+        """
+        p_dict = dict(enumerate(self.p_values))
+        q_dict = dict(enumerate(self.q_values))
+        z_dict = dict(zip(self.z_keys, self.z_values))
+        return p_dict, q_dict, z_dict
 
 
 def calculate_number_of_unknowns(p_dict, q_dict, z_dict):
@@ -889,12 +1703,34 @@ def calculate_number_of_unknowns(p_dict, q_dict, z_dict):
     z_unknowns = extract_unknowns(z_dict)
     all_unknowns = list(set(p_unknowns + q_unknowns + z_unknowns))
     non_carry_unknowns = p_unknowns + q_unknowns
-    carry_bits = [value for value in z_unknowns if 'z' in str(value) and value not in non_carry_unknowns]
+    carry_bits = [value for value in z_unknowns if is_carry_variable(value) and value not in non_carry_unknowns]
     number_of_unknowns = len(all_unknowns)
     number_of_carry_bits = len(carry_bits)
     return number_of_unknowns, number_of_carry_bits
 
 
+def contains_q_variable(expression):
+    """
+    Checks whether the expression contains any bit of q.
+
+    Rules which find that two variables are equal use it to keep q variables
+    and express the other variables in terms of them.
+    """
+    for symbol in expression.free_symbols:
+        variable_info = get_variable_info(symbol)
+        if variable_info is not None and variable_info[0] == 'q':
+            return True
+    return False
+
+
+def is_carry_variable(symbol):
+    """
+    Checks whether the symbol represents a carry bit.
+    """
+    variable_info = get_variable_info(symbol)
+    return variable_info is not None and variable_info[0] == 'z'
+
+
 def extract_unknowns(x_dict):
     """
     Extracts unknown variable (sympy expressions) from given dictionary
@@ -916,6 +1752,8 @@ def extract_unknowns(x_dict):
     return unknowns
 
 
+# TODO: factor_56153 and factor_291311 are clauses from the paper, hardcoded until
+# the general preprocessing rules can derive them (see factor_number in main.py).
 def factor_56153():
     clauses = []
     p_3 = Symbol('p_3')
@@ -0,0 +1,116 @@
+import numpy as np
+
+"""
+Generation of primes and biprimes, used to choose numbers for benchmarks and sweeps.
+"""
+
+
+def get_primes_lower_than_n(n):
+    """
+    Finds all the primes lower than n, using sieve of Eratosthenes.
+
+    Only odd numbers are stored in the sieve.
+
+    Args:
+        n (int): Upper bound (exclusive).
+
+    Returns:
+        primes (ndarray): Sorted array of primes.
+    """
+    if n <= 2:
+        return np.array([], dtype=np.int64)
+    # i-th element represents number 2*i + 1.
+    is_prime = np.ones(n // 2, dtype=bool)
+    is_prime[0] = False
+    for i in range(1, (int(np.sqrt(n)) + 1) // 2):
+        if is_prime[i]:
+            prime = 2 * i + 1
+            is_prime[prime * prime // 2::prime] = False
+    odd_primes = 2 * np.nonzero(is_prime)[0].astype(np.int64) + 1
+    return np.concatenate((np.array([2], dtype=np.int64), odd_primes))
+
+
+def segmented_sieve(low, high, segment_size=2**18):
+    """
+    Finds primes in range [low, high) with segmented sieve of Eratosthenes.
+
+    Only one segment is kept in the memory at a time, so it can be used for large ranges.
+
+    Args:
+        low, high (int): Range of the numbers.
+        segment_size (int, optional): Number of integers sieved at once. Default: 2**18
+
+    Yields:
+        primes (ndarray): Sorted array of primes from the next segment.
+    """
+    low = max(low, 2)
+    if high <= low:
+        return
+    base_primes = get_primes_lower_than_n(int(np.sqrt(high - 1)) + 1)
+    for start in range(low, high, segment_size):
+        end = min(start + segment_size, high)
+        is_prime = np.ones(end - start, dtype=bool)
+        for prime in base_primes:
+            prime = int(prime)
+            if prime * prime >= end:
+                break
+            first_multiple = max(prime * prime, -(-start // prime) * prime)
+            is_prime[first_multiple - start::prime] = False
+        yield start + np.nonzero(is_prime)[0].astype(np.int64)
+
+
+def get_primes_in_range(low, high, segment_size=2**18):
+    """
+    Finds primes in range [low, high), see segmented_sieve.
+
+    Returns:
+        primes (ndarray): Sorted array of primes.
+    """
+    segments = list(segmented_sieve(low, high, segment_size))
+    if len(segments) == 0:
+        return np.array([], dtype=np.int64)
+    return np.concatenate(segments)
+
+
+def generate_biprimes(max_m, min_m=0, include_even=False, window_size=2**18):
+    """
+    Generates biprimes m = p * q, with p >= q, ordered by m.
+
+    Range of m is split into windows. For every window, pairs are found with vectorized
+    search in the array of primes and sorted, so pairs outside of the window are never created.
+
+    Args:
+        max_m (int): Maximum value of m (inclusive).
+        min_m (int, optional): Minimum value of m (inclusive). Default: 0
+        include_even (bool, optional): If True, biprimes with q = 2 are included. Default: False
+        window_size (int, optional): Size of the range of m processed at once. Default: 2**18
+
+    Yields:
+        p, q, m (int)
+    """
+    smallest_prime = 2 if include_even else 3
+    primes = get_primes_in_range(smallest_prime, max_m // smallest_prime + 1)
+    small_primes = primes[primes * primes <= max_m]
+    for window_start in range(max(min_m, smallest_prime**2), max_m + 1, window_size):
+        window_end = min(window_start + window_size, max_m + 1)
+        ps = []
+        qs = []
+        for q in small_primes:
+            q = int(q)
+            if q * q >= window_end:
+                break
+            lowest_p = max(q, -(-window_start // q))
+            highest_p = (window_end - 1) // q
+            first_index = np.searchsorted(primes, lowest_p, side='left')
+            last_index = np.searchsorted(primes, highest_p, side='right')
+            if first_index < last_index:
+                ps.append(primes[first_index:last_index])
+                qs.append(np.full(last_index - first_index, q, dtype=np.int64))
+        if len(ps) == 0:
+            continue
+        ps = np.concatenate(ps)
+        qs = np.concatenate(qs)
+        ms = ps * qs
+        order = np.argsort(ms, kind='stable')
+        for p, q, m in zip(ps[order].tolist(), qs[order].tolist(), ms[order].tolist()):
+            yield p, q, m
@@ -0,0 +1,103 @@
+import json
+from collections import OrderedDict
+
+"""
+Instrumentation of the preprocessing.
+
+PreprocessingProfiler collects call counts, time, number of derived facts
+and number of eliminated variables for every preprocessing rule and other
+expensive steps, as well as for every iteration of simplify_clauses.
+It's disabled by default - see enable_profiling in preprocessing.py.
+"""
+
+
+class PreprocessingProfiler(object):
+    """
+    Collects statistics of the preprocessing steps.
+
+    Derived facts are entries of known_expressions which have been added or changed.
+    Eliminated variables are single variables which got a value or an expression.
+    Time of a step includes the time of all the steps it called (e.g. simplify_clause inside a rule).
+
+    Attributes:
+        enabled (bool): If False, nothing is recorded. Default: False
+        steps (OrderedDict): Statistics of steps, keyed by their names.
+        iterations (OrderedDict): Statistics of simplify_clauses iterations, keyed by their numbers.
+    """
+    FIELDS = ['calls', 'time', 'derived_facts', 'eliminated_variables']
+
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        """
+        Removes all the collected statistics.
+        """
+        self.steps = OrderedDict()
+        self.iterations = OrderedDict()
+
+    def record_step(self, name, time, derived_facts=0, eliminated_variables=0):
+        """
+        Records a single call of a preprocessing step.
+
+        Args:
+            name (str): Name of the step, e.g. name of the rule function.
+            time (float): Time of the call in seconds.
+            derived_facts (int, optional): See class documentation. Default: 0
+            eliminated_variables (int, optional): See class documentation. Default: 0
+        """
+        self._record(self.steps, name, time, derived_facts, eliminated_variables)
+
+    def record_iteration(self, iteration, time, derived_facts=0, eliminated_variables=0):
+        """
+        Records processing of a single clause in given iteration of simplify_clauses, see record_step.
+        """
+        self._record(self.iterations, iteration, time, derived_facts, eliminated_variables)
+
+    def statistics(self):
+        """
+        Returns collected statistics.
+
+        Returns:
+            statistics (dict): Contains 'steps' and 'iterations' - lists of dicts with
+                name or iteration, calls, time, derived_facts and eliminated_variables.
+                Steps are sorted by time, from the longest one.
+        """
+        steps = [dict(name=name, **entry) for name, entry in self.steps.items()]
+        steps.sort(key=lambda entry: entry['time'], reverse=True)
+        iterations = [dict(iteration=iteration, **entry) for iteration, entry in self.iterations.items()]
+        return {'steps': steps, 'iterations': iterations}
+
+    def to_json(self, indent=2):
+        """
+        Returns collected statistics as a JSON string, see statistics.
+        """
+        return json.dumps(self.statistics(), indent=indent)
+
+    def to_table(self):
+        """
+        Returns collected statistics as a human-readable table.
+        """
+        statistics = self.statistics()
+        lines = []
+        header = "{:<32}{:>10}{:>12}{:>16}{:>22}"
+        row = "{:<32}{:>10}{:>12.4f}{:>16}{:>22}"
+        lines.append(header.format('step', *self.FIELDS))
+        for entry in statistics['steps']:
+            lines.append(row.format(entry['name'], *[entry[field] for field in self.FIELDS]))
+        lines.append("")
+        lines.append(header.format('iteration', *self.FIELDS))
+        for entry in statistics['iterations']:
+            lines.append(row.format(entry['iteration'], *[entry[field] for field in self.FIELDS]))
+        return "\n".join(lines)
+
+    def _record(self, entries, key, time, derived_facts, eliminated_variables):
+        entry = entries.get(key)
+        if entry is None:
+            entry = {field: 0 for field in self.FIELDS}
+            entries[key] = entry
+        entry['calls'] += 1
+        entry['time'] += time
+        entry['derived_facts'] += derived_facts
+        entry['eliminated_variables'] += eliminated_variables
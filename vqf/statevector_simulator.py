@@ -0,0 +1,177 @@
+from collections import Counter, namedtuple
+
+import numpy as np
+
+from walsh_hadamard import fast_walsh_hadamard_transform, hamming_weights, DEFAULT_BLOCK_SIZE
+
+"""
+Local statevector simulator of QAOA for the VQF cost hamiltonian, using only NumPy.
+
+Cost hamiltonian is diagonal (see create_cost_diagonal in cost_hamiltonian.py),
+so the cost layer exp(-i * gamma * H) is an elementwise multiplication by phases.
+The mixer exp(-i * beta * sum(-X_i)) is diagonal in the Hadamard basis, so it's applied
+as Walsh-Hadamard transform, multiplication by phases depending on the Hamming weight
+of the basis state and the transform back (see walsh_hadamard.py), in O(n * 2**n) operations.
+It doesn't need qvm and quilc servers and there is no compilation of Quil programs.
+Phases are applied to the state in place, one block of DEFAULT_BLOCK_SIZE elements at a time,
+so apart from the state only block-sized temporary arrays are created.
+
+Conventions are the same as in Grove's QAOA used by OptimizationEngine:
+initial state is |+>^n, each step applies cost layer and then the mixer,
+parameters are stacked as [betas, gammas] and qubit i is the i-th bit of the basis state index.
+"""
+
+
+# Result of StatevectorQAOA.minimize, it has the same fields as the result of VQE used in OptimizationEngine.
+# x - best parameters found, fun - their energy.
+# iteration_params, expectation_vals - parameters and energies after every iteration.
+MinimizationResult = namedtuple('MinimizationResult', ['x', 'fun', 'iteration_params', 'expectation_vals'])
+
+
+class StatevectorQAOA(object):
+    """
+    QAOA simulated on a statevector.
+
+    Args:
+        diagonal (ndarray): Values of the cost hamiltonian for all the basis states.
+        steps (int, optional): Number of steps of QAOA. Default: 1
+        minimizer_kwargs (dict, optional): Keyword arguments of scipy.optimize.minimize. Default: None
+        rand_seed (int, optional): Seed used for the initial angles and sampling. Default: None
+        threads (int, optional): Number of threads used by the mixer. Default: 1
+
+    Attributes:
+        diagonal (ndarray): See Args.
+        number_of_qubits (int): Number of qubits.
+        qubits (list): Indices of the qubits.
+        steps (int): See Args.
+        betas, gammas (ndarray): Current angles, initialized randomly as in Grove.
+        minimizer_kwargs (dict): See Args.
+        threads (int): See Args.
+    """
+
+    def __init__(self, diagonal, steps=1, minimizer_kwargs=None, rand_seed=None, threads=1):
+        self.diagonal = np.asarray(diagonal, dtype=float)
+        self.number_of_qubits = len(self.diagonal).bit_length() - 1
+        if 2**self.number_of_qubits != len(self.diagonal):
+            raise ValueError("Length of the diagonal must be a power of 2.")
+        self.qubits = list(range(self.number_of_qubits))
+        self.steps = steps
+        self.random_state = np.random.RandomState(rand_seed)
+        self.betas = self.random_state.uniform(0, np.pi, steps)
+        self.gammas = self.random_state.uniform(0, 2*np.pi, steps)
+        if minimizer_kwargs is None:
+            minimizer_kwargs = {'method': 'BFGS', 'options': {'disp': False}}
+        self.minimizer_kwargs = minimizer_kwargs
+        self.threads = threads
+        self._hamming_weights = hamming_weights(self.number_of_qubits)
+
+    def get_state(self, params):
+        """
+        Calculates the state after all the steps of QAOA.
+
+        Args:
+            params (ndarray): Stacked betas and gammas, the number of steps is taken from its length.
+
+        Returns:
+            state (ndarray): Complex statevector.
+        """
+        steps = len(params) // 2
+        betas = params[:steps]
+        gammas = params[steps:]
+        state = np.full(len(self.diagonal), 1 / np.sqrt(len(self.diagonal)), dtype=complex)
+        for beta, gamma in zip(betas, gammas):
+            apply_cost_layer(state, gamma, self.diagonal)
+            apply_x_mixer(state, beta, self.threads, self._hamming_weights)
+        return state
+
+    def expectation(self, params):
+        """
+        Calculates expectation value of the cost hamiltonian, see get_state.
+        """
+        state = self.get_state(params)
+        energy = 0.0
+        for start in range(0, len(state), DEFAULT_BLOCK_SIZE):
+            block = state[start:start + DEFAULT_BLOCK_SIZE]
+            probabilities = block.real**2 + block.imag**2
+            energy += np.dot(probabilities, self.diagonal[start:start + DEFAULT_BLOCK_SIZE])
+        return float(energy)
+
+    def minimize(self, initial_params):
+        """
+        Minimizes expectation value of the cost hamiltonian with scipy.optimize.minimize.
+
+        Args:
+            initial_params (ndarray): Stacked betas and gammas.
+
+        Returns:
+            result (MinimizationResult)
+        """
+        import scipy.optimize
+        iteration_params = []
+        expectation_vals = []
+
+        def callback(params):
+            iteration_params.append(np.array(params))
+            expectation_vals.append(self.expectation(params))
+
+        result = scipy.optimize.minimize(self.expectation, initial_params, callback=callback, **self.minimizer_kwargs)
+        return MinimizationResult(result.x, result.fun, iteration_params, expectation_vals)
+
+    def get_string(self, betas, gammas, samples=100):
+        """
+        Samples bitstrings from the state after QAOA, like get_string from Grove's QAOA.
+
+        Args:
+            betas, gammas (ndarray): Angles of QAOA.
+            samples (int, optional): Number of samples. Default: 100
+
+        Returns:
+            most_frequent_bit_string (tuple): Bits ordered by qubits.
+            sampling_results (Counter): Maps bitstrings to the number of their occurrences.
+        """
+        state = self.get_state(np.hstack((betas, gammas)))
+        probabilities = state.real**2 + state.imag**2
+        indices = self.random_state.choice(len(probabilities), size=samples, p=probabilities / probabilities.sum())
+        sampling_results = Counter()
+        for index, count in zip(*np.unique(indices, return_counts=True)):
+            bit_string = tuple(int(index >> qubit) & 1 for qubit in self.qubits)
+            sampling_results[bit_string] = int(count)
+        most_frequent_bit_string = max(sampling_results, key=lambda x: sampling_results[x])
+        return most_frequent_bit_string, sampling_results
+
+
+def apply_x_mixer(state, beta, threads=1, weights=None):
+    """
+    Applies exp(-i * beta * sum(-X_i)) = product of exp(i * beta * X_i) to the state, in place.
+
+    X_i = H Z_i H, so the mixer is H^n exp(i * beta * sum(Z_i)) H^n, where sum(Z_i) = n - 2 * (Hamming weight).
+
+    Args:
+        state (ndarray): Complex statevector, qubit i is the i-th bit of the index.
+        beta (float): Angle of the mixer.
+        threads (int, optional): Number of threads, see fast_walsh_hadamard_transform. Default: 1
+        weights (ndarray, optional): Hamming weights of the indices, see hamming_weights.
+            If None, they are calculated. Default: None
+    """
+    number_of_qubits = len(state).bit_length() - 1
+    if weights is None:
+        weights = hamming_weights(number_of_qubits)
+    fast_walsh_hadamard_transform(state, threads=threads)
+    # Both transforms are unnormalized, hence division by 2**n.
+    phases = np.exp(1j * beta * (number_of_qubits - 2 * np.arange(number_of_qubits + 1))) / 2**number_of_qubits
+    for start in range(0, len(state), DEFAULT_BLOCK_SIZE):
+        state[start:start + DEFAULT_BLOCK_SIZE] *= phases[weights[start:start + DEFAULT_BLOCK_SIZE]]
+    fast_walsh_hadamard_transform(state, threads=threads)
+
+
+def apply_cost_layer(state, gamma, diagonal):
+    """
+    Applies exp(-i * gamma * H) to the state, in place.
+
+    Args:
+        state (ndarray): Complex statevector.
+        gamma (float): Angle of the cost layer.
+        diagonal (ndarray): Values of the cost hamiltonian H for all the basis states.
+    """
+    for start in range(0, len(state), DEFAULT_BLOCK_SIZE):
+        state[start:start + DEFAULT_BLOCK_SIZE] *= np.exp(-1j * gamma * diagonal[start:start + DEFAULT_BLOCK_SIZE])
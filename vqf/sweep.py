@@ -0,0 +1,151 @@
+import csv
+import itertools
+import json
+import os
+import warnings
+from collections import namedtuple
+
+from batch import create_clauses_batch
+from preprocessing import calculate_number_of_unknowns
+
+"""
+Resumable sweeps of the preprocessing over many (p, q) pairs.
+
+Sweeps are used to estimate how many qubits are needed to factor numbers of given size
+(see research/2019_05_04_resources_needed). run_sweep processes the pairs in blocks
+using create_clauses_batch, appends results to a CSV file as they come and saves
+a checkpoint after every block. If the sweep is interrupted, calling run_sweep again
+with the same arguments continues from the last checkpoint.
+"""
+
+
+# Result of preprocessing a single pair.
+# unknowns, carry_bits - see calculate_number_of_unknowns, -1 if preprocessing failed.
+# error - empty string if preprocessing succeeded, otherwise description of the exception.
+SweepResult = namedtuple('SweepResult', ['m', 'p', 'q', 'unknowns', 'carry_bits', 'time', 'error'])
+
+
+def run_sweep(pairs, store_path, checkpoint_path=None, block_size=1000, apply_preprocessing=True,
+              use_true_values=True, processes=None, chunksize=16, timeout=None, cache_directory=None):
+    """
+    Runs preprocessing for every pair (p, q) and stores the results.
+
+    Pairs must be generated in the same order every time, since the checkpoint
+    only records how many of them have been processed. If the store doesn't contain
+    the results recorded in the checkpoint (e.g. it has been deleted), the sweep starts
+    from the beginning and a warning is issued.
+
+    Args:
+        pairs (iterable): Pairs of integers (p, q) or (p, q, m) triples,
+            e.g. from generate_biprimes in primes.py.
+        store_path (str): Path to the CSV file with results. Rows are appended to it.
+        checkpoint_path (str, optional): Path to the checkpoint file. If None, store_path + '.checkpoint' is used.
+        block_size (int, optional): Number of pairs processed between checkpoints. Default: 1000
+        apply_preprocessing (bool, optional): See create_clauses. Default: True
+        use_true_values (bool, optional): If True, lengths of p and q are treated as known. Default: True
+        processes, chunksize, timeout, cache_directory (optional): See create_clauses_batch.
+
+    Yields:
+        result (SweepResult): Results for the pairs processed in this run, in the order of pairs.
+    """
+    if checkpoint_path is None:
+        checkpoint_path = store_path + '.checkpoint'
+    checkpoint = load_checkpoint(checkpoint_path)
+    completed = _prepare_store(store_path, checkpoint)
+
+    pairs = itertools.islice(iter(pairs), completed, None)
+    while True:
+        block = list(itertools.islice(pairs, block_size))
+        if len(block) == 0:
+            break
+        block = [(pair[0], pair[1]) for pair in block]
+        ms = [p * q for p, q in block]
+        true_ps = [p if use_true_values else None for p, _ in block]
+        true_qs = [q if use_true_values else None for _, q in block]
+        batch_results = create_clauses_batch(ms, true_ps, true_qs, apply_preprocessing=apply_preprocessing,
+                                             processes=processes, chunksize=chunksize, ordered=True,
+                                             timeout=timeout, cache_directory=cache_directory)
+        with open(store_path, 'a', newline='') as store_file:
+            writer = csv.writer(store_file)
+            for (p, q), batch_result in zip(block, batch_results):
+                result = _create_sweep_result(p, q, batch_result)
+                writer.writerow(result)
+                yield result
+            store_file.flush()
+            os.fsync(store_file.fileno())
+            store_size = store_file.tell()
+        completed += len(block)
+        save_checkpoint(checkpoint_path, completed, store_size)
+
+
+def load_checkpoint(checkpoint_path):
+    """
+    Loads checkpoint of a sweep.
+
+    Args:
+        checkpoint_path (str): Path to the checkpoint file.
+
+    Returns:
+        checkpoint (dict): Contains 'completed' - number of processed pairs and
+            'store_size' - size of the store file in bytes at the time of the checkpoint.
+            If the file doesn't exist, both are 0.
+    """
+    if not os.path.exists(checkpoint_path):
+        return {'completed': 0, 'store_size': 0}
+    with open(checkpoint_path) as checkpoint_file:
+        return json.load(checkpoint_file)
+
+
+def save_checkpoint(checkpoint_path, completed, store_size):
+    """
+    Atomically saves checkpoint of a sweep, see load_checkpoint.
+    """
+    temporary_path = checkpoint_path + '.tmp'
+    with open(temporary_path, 'w') as checkpoint_file:
+        json.dump({'completed': completed, 'store_size': store_size}, checkpoint_file)
+        checkpoint_file.flush()
+        os.fsync(checkpoint_file.fileno())
+    os.replace(temporary_path, checkpoint_path)
+
+
+def read_sweep_results(store_path):
+    """
+    Reads results stored by run_sweep.
+
+    Args:
+        store_path (str): Path to the CSV file with results.
+
+    Yields:
+        result (SweepResult)
+    """
+    with open(store_path, newline='') as store_file:
+        reader = csv.reader(store_file)
+        next(reader)
+        for row in reader:
+            m, p, q, unknowns, carry_bits = [int(value) for value in row[:5]]
+            yield SweepResult(m, p, q, unknowns, carry_bits, float(row[5]), row[6])
+
+
+def _prepare_store(store_path, checkpoint):
+    # Rows written after the last checkpoint are removed, since they will be calculated again.
+    # If the store lacks rows covered by the checkpoint (e.g. it has been deleted), the sweep starts over.
+    store_size = checkpoint['store_size']
+    if store_size != 0 and (not os.path.exists(store_path) or os.path.getsize(store_path) < store_size):
+        warnings.warn("Store " + store_path + " doesn't contain the results saved in the checkpoint, "
+                      "the sweep starts from the beginning.")
+        store_size = 0
+    if store_size == 0:
+        with open(store_path, 'w', newline='') as store_file:
+            csv.writer(store_file).writerow(SweepResult._fields)
+        return 0
+    with open(store_path, 'r+') as store_file:
+        store_file.truncate(store_size)
+    return checkpoint['completed']
+
+
+def _create_sweep_result(p, q, batch_result):
+    if batch_result.error is not None:
+        return SweepResult(batch_result.m, p, q, -1, -1, round(batch_result.time, 3), batch_result.error)
+    unknowns, carry_bits = calculate_number_of_unknowns(batch_result.p_dict, batch_result.q_dict, batch_result.z_dict)
+    return SweepResult(batch_result.m, p, q, unknowns, carry_bits, round(batch_result.time, 3), '')
+
@@ -0,0 +1,201 @@
+from sympy import Symbol, Add, Mul, Number, Integer
+
+from variables import get_variable_info
+
+"""
+Store for the equalities between binary variables found during the preprocessing.
+
+Preprocessing rules often find that two variables are equal (x = y)
+or complementary (x = 1 - y). Keeping them as substitutions leads to chains
+(x -> y, y -> 1 - z, ...), which require repeated substitutions to settle.
+ParityUnionFind keeps them in a union-find structure instead, so every variable
+can be expressed in terms of a single representative in near-constant time.
+"""
+
+
+KIND_ORDER = {'q': 0, 'p': 1, 'z': 2}
+
+
+def canonical_order(symbol):
+    """
+    Defines which variable is preferred as a representative of a group of equal variables.
+
+    q variables go first, then p, then z (carry bits). Variables of the same kind are
+    ordered by their indices. This way representatives don't depend on the order
+    in which the equalities have been found.
+
+    Args:
+        symbol: sympy Symbol.
+
+    Returns:
+        key: key which can be used for sorting.
+    """
+    name = str(symbol)
+    variable_info = get_variable_info(symbol)
+    if variable_info is not None:
+        kind, indices = variable_info
+        return KIND_ORDER[kind], kind, indices, name
+    parts = name.split('_')
+    kind_order = KIND_ORDER.get(parts[0], 3)
+    indices = tuple(int(part) if part.isdigit() else -1 for part in parts[1:])
+    return kind_order, parts[0], indices, name
+
+
+class ParityUnionFind(object):
+    """
+    Union-find structure storing equalities and complements of binary variables.
+
+    Every variable points to its parent together with a parity flag.
+    Parity 0 means that variable is equal to its parent, parity 1 means it is equal to 1 - parent.
+    Constant values are stored by connecting variables to a special node ONE:
+    x = 1 is stored as parity 0 with respect to ONE, x = 0 as parity 1.
+
+    Args:
+        order (function, optional): Key function defining which variable becomes a representative.
+            Default: canonical_order
+
+    Attributes:
+        ONE: Node representing constant 1.
+        conflicts (list): Equalities which contradicted already stored ones and have been ignored.
+            simplify_clauses in preprocessing.py treats them as a proof that the clauses are inconsistent.
+    """
+    ONE = Integer(1)
+
+    def __init__(self, order=canonical_order):
+        self.order = order
+        self.conflicts = []
+        self._parents = {}
+
+    def __contains__(self, variable):
+        return variable in self._parents
+
+    def __len__(self):
+        return len(self._parents)
+
+    def variables(self):
+        """
+        Returns list of all the variables stored in the structure.
+        """
+        return [variable for variable in self._parents if variable != self.ONE]
+
+    def find(self, variable):
+        """
+        Finds representative of the variable.
+
+        Args:
+            variable: sympy Symbol or ONE.
+
+        Returns:
+            representative: sympy Symbol or ONE.
+            parity (int): 0 if variable = representative, 1 if variable = 1 - representative.
+        """
+        if variable not in self._parents:
+            return variable, 0
+        path = []
+        parity = 0
+        node = variable
+        while True:
+            parent, edge_parity = self._parents[node]
+            if parent == node:
+                break
+            path.append((node, edge_parity))
+            parity ^= edge_parity
+            node = parent
+        # Path compression - all the nodes on the path point directly to the representative.
+        remaining_parity = parity
+        for path_node, edge_parity in path:
+            self._parents[path_node] = (node, remaining_parity)
+            remaining_parity ^= edge_parity
+        return node, parity
+
+    def union(self, variable_1, variable_2, parity):
+        """
+        Stores equality variable_1 = variable_2 (parity 0) or variable_1 = 1 - variable_2 (parity 1).
+
+        Args:
+            variable_1, variable_2: sympy Symbols or ONE.
+            parity (int): See above.
+
+        Returns:
+            success (bool): False if the equality contradicts the stored ones.
+        """
+        for variable in [variable_1, variable_2]:
+            if variable not in self._parents:
+                self._parents[variable] = (variable, 0)
+        root_1, parity_1 = self.find(variable_1)
+        root_2, parity_2 = self.find(variable_2)
+        if root_1 == root_2:
+            return parity_1 ^ parity_2 == parity
+        if self._is_preferred(root_1, root_2):
+            self._parents[root_2] = (root_1, parity_1 ^ parity_2 ^ parity)
+        else:
+            self._parents[root_1] = (root_2, parity_1 ^ parity_2 ^ parity)
+        return True
+
+    def add_equality(self, variable, value):
+        """
+        Stores equality variable = value, if it has one of the supported forms.
+
+        Supported values are 0, 1, another variable y and 1 - y.
+        Equalities contradicting the stored ones are ignored and saved in conflicts.
+
+        Args:
+            variable: sympy Symbol.
+            value: sympy expression or integer.
+
+        Returns:
+            stored (bool): True if equality has a supported form.
+        """
+        if not isinstance(variable, Symbol):
+            return False
+        parsed_value = self._parse_value(value)
+        if parsed_value is None:
+            return False
+        other, parity = parsed_value
+        if other == variable:
+            return False
+        if not self.union(variable, other, parity):
+            self.conflicts.append((variable, value))
+        return True
+
+    def resolve(self, variable):
+        """
+        Expresses variable in terms of its representative.
+
+        Args:
+            variable: sympy Symbol.
+
+        Returns:
+            expression: 0, 1, representative or 1 - representative.
+        """
+        root, parity = self.find(variable)
+        if root == self.ONE:
+            return Integer(1 - parity)
+        if parity == 0:
+            return root
+        return 1 - root
+
+    def _is_preferred(self, node_1, node_2):
+        if node_1 == self.ONE:
+            return True
+        if node_2 == self.ONE:
+            return False
+        return self.order(node_1) <= self.order(node_2)
+
+    def _parse_value(self, value):
+        if isinstance(value, int) or isinstance(value, Number):
+            if value == 1:
+                return self.ONE, 0
+            if value == 0:
+                return self.ONE, 1
+            return None
+        if isinstance(value, Symbol):
+            return value, 0
+        if value.func == Add and len(value.args) == 2:
+            constant, term = value.args
+            if isinstance(term, Number):
+                constant, term = term, constant
+            if constant == 1 and term.func == Mul and len(term.args) == 2:
+                if term.args[0] == -1 and isinstance(term.args[1], Symbol):
+                    return term.args[1], 1
+        return None
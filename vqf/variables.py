@@ -0,0 +1,80 @@
+from sympy import Symbol
+
+from polynomial import symbol_to_id, id_to_symbol
+
+"""
+Registry of the variables used in the VQF algorithm.
+
+Every variable is identified by its kind and indices:
+- ('p', (i,)) - i-th bit of p, symbol p_i,
+- ('q', (i,)) - i-th bit of q, symbol q_i,
+- ('z', (j, i)) - carry bit from j-th to i-th column, symbol z_j_i.
+Symbols are created once and share variable ids with the Polynomial class (see polynomial.py),
+so code which needs to know what a variable represents doesn't have to parse its name.
+"""
+
+
+VARIABLE_KINDS = ('p', 'q', 'z')
+
+# Maps (kind, indices) to variable ids.
+_variable_ids = {}
+
+# Maps variable ids to (kind, indices), or to None for symbols which are not VQF variables.
+_variable_info = {}
+
+
+def get_variable_id(kind, *indices):
+    """
+    Returns variable id of the given variable, creating its symbol if needed.
+
+    Args:
+        kind (str): One of 'p', 'q' and 'z'.
+        indices (int): Indices of the variable, see module documentation at the top.
+
+    Returns:
+        var_id (int): See module documentation in polynomial.py.
+    """
+    key = (kind, indices)
+    var_id = _variable_ids.get(key)
+    if var_id is None:
+        var_id = symbol_to_id(Symbol('_'.join([kind] + [str(index) for index in indices])))
+        # Same order as in symbol_to_id, so an interrupted registration is simply repeated later.
+        _variable_info[var_id] = key
+        _variable_ids[key] = var_id
+    return var_id
+
+
+def get_variable_symbol(kind, *indices):
+    """
+    Returns sympy Symbol of the given variable, see get_variable_id.
+    """
+    return id_to_symbol(get_variable_id(kind, *indices))
+
+
+def get_variable_info(variable):
+    """
+    Returns kind and indices of the variable.
+
+    Symbols which have been created outside of the registry (e.g. Symbol('p_1'))
+    are recognized by their names, which are parsed only the first time.
+
+    Args:
+        variable: sympy Symbol or variable id.
+
+    Returns:
+        info (tuple): (kind, indices) or None if the variable is not p, q or z variable.
+    """
+    var_id = variable if isinstance(variable, int) else symbol_to_id(variable)
+    if var_id in _variable_info:
+        return _variable_info[var_id]
+
+    parts = str(id_to_symbol(var_id)).split('_')
+    expected_length = 3 if parts[0] == 'z' else 2
+    if parts[0] in VARIABLE_KINDS and len(parts) == expected_length and all(part.isdigit() for part in parts[1:]):
+        info = (parts[0], tuple(int(part) for part in parts[1:]))
+    else:
+        info = None
+    _variable_info[var_id] = info
+    if info is not None:
+        _variable_ids.setdefault(info, var_id)
+    return info
@@ -0,0 +1,86 @@
+import numpy as np
+
+"""
+In-place fast Walsh-Hadamard transform (FWHT).
+
+Transform of a vector of length 2**n consists of n passes of butterflies (a, b) -> (a + b, a - b),
+one pass per bit of the index. Each butterfly is computed as a += b; b *= -2; b += a,
+so no temporary arrays are needed.
+
+Passes over the low bits only mix elements close to each other, so the vector is processed
+in blocks small enough to stay in the CPU cache, and all the low passes are applied
+to one block before moving to the next one. Passes over the high bits are applied to the
+whole vector. Both parts can be split into chunks processed by several threads,
+since NumPy releases the GIL in the arithmetic operations on large arrays.
+"""
+
+
+# Default number of elements in a block which is processed in the cache, 2**14 complex numbers take 256 kB.
+DEFAULT_BLOCK_SIZE = 2**14
+
+
+def fast_walsh_hadamard_transform(vector, block_size=DEFAULT_BLOCK_SIZE, threads=1):
+    """
+    Calculates unnormalized Walsh-Hadamard transform of the vector, in place.
+
+    Args:
+        vector (ndarray): Contiguous vector of length 2**n, float or complex.
+        block_size (int, optional): Size of the blocks, must be a power of 2. Default: DEFAULT_BLOCK_SIZE
+        threads (int, optional): Number of threads. Default: 1
+
+    Returns:
+        vector (ndarray): The same vector, transformed.
+    """
+    size = len(vector)
+    number_of_bits = size.bit_length() - 1
+    if 2**number_of_bits != size:
+        raise ValueError("Length of the vector must be a power of 2.")
+    if not vector.flags['C_CONTIGUOUS']:
+        raise ValueError("Vector must be contiguous.")
+    block_size = min(block_size, size)
+    block_bits = block_size.bit_length() - 1
+    blocks = vector.reshape(-1, block_size)
+
+    def transform_blocks(chunk):
+        start, end = chunk
+        for block in blocks[start:end]:
+            for bit in range(block_bits):
+                _butterflies(block.reshape(-1, 2, 2**bit))
+
+    _run_in_chunks(transform_blocks, len(blocks), threads)
+
+    for bit in range(block_bits, number_of_bits):
+        pairs = vector.reshape(-1, 2, 2**bit)
+        if len(pairs) >= threads:
+            _run_in_chunks(lambda chunk: _butterflies(pairs[chunk[0]:chunk[1]]), len(pairs), threads)
+        else:
+            _run_in_chunks(lambda chunk: _butterflies(pairs[:, :, chunk[0]:chunk[1]]), 2**bit, threads)
+    return vector
+
+
+def _butterflies(pairs):
+    first = pairs[:, 0]
+    second = pairs[:, 1]
+    first += second
+    second *= -2
+    second += first
+
+
+def _run_in_chunks(function, length, threads):
+    if threads <= 1 or length < 2:
+        function((0, length))
+        return
+    from concurrent.futures import ThreadPoolExecutor
+    bounds = np.linspace(0, length, min(threads, length) + 1).astype(int)
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(function, zip(bounds[:-1], bounds[1:])))
+
+
+def hamming_weights(number_of_bits):
+    """
+    Returns array with the number of ones in the binary representation of every index from 0 to 2**number_of_bits - 1.
+    """
+    weights = np.zeros(1, dtype=np.uint8)
+    for _ in range(number_of_bits):
+        weights = np.concatenate((weights, weights + 1))
+    return weights